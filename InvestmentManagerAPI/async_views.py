@@ -0,0 +1,74 @@
+from inspect import isawaitable
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+from .db_router import aread_alias
+from .sharding import sharding_enabled
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines, served on the event loop under ASGI.
+
+    Authentication and throttling run in one thread hop, since their classes
+    are synchronous. Permissions are checked on the event loop: classes that
+    query the database provide `ahas_permission(request, view)`, the others
+    must only read the request.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        """
+        Async initial(): negotiate, authenticate and check permissions and throttles.
+        """
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+
+        await sync_to_async(self.perform_authentication)(request)
+        await self.acheck_permissions(request)
+        if self.get_throttles():
+            await sync_to_async(self.check_throttles)(request)
+
+    async def acheck_permissions(self, request):
+        """
+        Async check_permissions().
+        """
+        for permission in self.get_permissions():
+            check = getattr(permission, 'ahas_permission', None)
+            allowed = await check(request, self) if check else permission.has_permission(request, self)
+            if not allowed:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None),
+                )
+
+    async def aread_alias(self, account_id=None):
+        """
+        Database to read from: the account's shard when sharding is
+        configured, otherwise a replica unless the user wrote recently.
+        """
+        if account_id is not None and sharding_enabled():
+            from accounts.permissions import aresolve_access
+            access = await aresolve_access(self.request, account_id)
+            return (await access.aget_account()).shard
+        return await aread_alias(self.request.user.pk)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends holding entries in each process, invisible to other workers
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+@register(Tags.caches, Tags.database)
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Require a cache shared between workers when read replicas or shards are
+    configured, since every worker must see the read-your-writes markers and
+    the shard map entries move_account clears.
+    """
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    hint = 'Set CACHE_BACKEND to RedisCache or FileBasedCache with a CACHE_LOCATION.'
+    errors = []
+    if settings.DATABASE_REPLICAS:
+        errors.append(Error(
+            'DATABASE_REPLICA_URLS requires a cache shared between workers.',
+            hint=hint, id='InvestmentManagerAPI.E001',
+        ))
+    if len(settings.DATABASE_SHARDS) > 1:
+        errors.append(Error(
+            'DATABASE_SHARD_URLS requires a cache shared between workers.',
+            hint=hint, id='InvestmentManagerAPI.E002',
+        ))
+    return errors
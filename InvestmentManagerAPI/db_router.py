@@ -0,0 +1,96 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+def replica_aliases():
+    """
+    Database aliases configured as read replicas.
+    """
+    return settings.DATABASE_REPLICAS
+
+def write_cache_key(user_id):
+    """
+    Cache key marking a user's recent write.
+    """
+    return f'db-write:{user_id}'
+
+def record_write(user_id):
+    """
+    Pin a user's reads to the primary for REPLICA_READ_YOUR_WRITES seconds.
+
+    The marker lives in the default cache, which must be shared between
+    workers for the next request to see it; see checks.shared_cache_check.
+    """
+    if settings.REPLICA_READ_YOUR_WRITES:
+        cache.set(write_cache_key(user_id), True, settings.REPLICA_READ_YOUR_WRITES)
+
+def recently_wrote(user_id):
+    """
+    Whether the user wrote within the read-your-writes window.
+    """
+    return cache.get(write_cache_key(user_id), False)
+
+async def aread_alias(user_id):
+    """
+    Database for a user's async reads: a random replica, or the primary
+    when none is configured or the user wrote recently.
+    """
+    replicas = replica_aliases()
+    if replicas and not await cache.aget(write_cache_key(user_id), False):
+        return random.choice(replicas)
+    return 'default'
+
+@contextmanager
+def read_from_replicas():
+    """
+    Route reads in this context to the replicas, when any are configured.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+class ReplicaRouter:
+    """
+    Send reads to a random replica inside read_from_replicas() and everything
+    else, including all writes and migrations, to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if replicas and _replica_reads.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+class ReplicaReadMixin:
+    """
+    View mixin reading from the replicas on safe requests.
+
+    Users who wrote within REPLICA_READ_YOUR_WRITES seconds keep reading
+    from the primary so they see their own changes. Authentication and
+    permission checks always read from the primary.
+    """
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not recently_wrote(request.user.pk):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = self.__dict__.pop('_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+        return super().finalize_response(request, response, *args, **kwargs)
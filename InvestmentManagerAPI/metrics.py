@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from hmac import compare_digest
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=()):
+    """
+    Render label pairs in the Prometheus text format, e.g. `{route="x",le="0.1"}`.
+    """
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+def format_value(value):
+    """
+    Render a sample value, integers without a fraction.
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """
+    Monotonic counter per label combination.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: value for labels, value in self.series.items()}
+
+    @staticmethod
+    def merge(into, labels, value):
+        into[labels] = into.get(labels, 0) + value
+
+    def samples(self, series):
+        for labels, value in sorted(series.items()):
+            yield f'{self.name}{format_labels(self.labels, labels)} {format_value(value)}'
+
+class Histogram:
+    """
+    Histogram per label combination with fixed upper bounds.
+
+    Each series stores its per-bucket counts, the +Inf overflow and the sum
+    of observed values; the text output makes the buckets cumulative.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: list(series) for labels, series in self.series.items()}
+
+    @staticmethod
+    def merge(into, labels, value):
+        if labels in into:
+            into[labels] = [mine + theirs for mine, theirs in zip(into[labels], value)]
+        else:
+            into[labels] = list(value)
+
+    def samples(self, series):
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), values):
+                cumulative += count
+                le = (('le', format_value(bound)),)
+                yield f'{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, labels)} {format_value(values[-1])}'
+            yield f'{self.name}_count{format_labels(self.labels, labels)} {cumulative}'
+
+class Registry:
+    """
+    Metrics of this process, rendered in the Prometheus text format.
+
+    With METRICS_DIR set, every process writes a snapshot of its metrics
+    there at most every METRICS_FLUSH_INTERVAL seconds, and the output sums
+    the snapshots of all processes, so any worker can answer a scrape.
+    """
+    def __init__(self):
+        self.metrics = []
+        self.flushed_at = 0.0
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, tuple(labels))
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=()):
+        metric = Histogram(name, documentation, tuple(labels), buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def snapshot_path(self, pid=None):
+        return os.path.join(settings.METRICS_DIR, f'metrics-{pid or os.getpid()}.json')
+
+    def flush(self, force=False):
+        """
+        Write this process's snapshot to METRICS_DIR when the interval passed.
+        """
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed_at = now
+        data = {
+            name: [[list(labels), value] for labels, value in series.items()]
+            for name, series in self.snapshot().items()
+        }
+        path = self.snapshot_path()
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """
+        Series of every metric, summed over the snapshots of other processes.
+        """
+        collected = self.snapshot()
+        if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+            return collected
+        own = os.path.basename(self.snapshot_path())
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith('.json') or filename == own:
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, filename), encoding='utf-8') as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for metric in self.metrics:
+                for labels, value in data.get(metric.name, ()):
+                    metric.merge(collected[metric.name], tuple(labels), value)
+        return collected
+
+    def exposition(self):
+        collected = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(collected[metric.name]))
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+def metrics_view(request):
+    """
+    Serve the metrics in the Prometheus text format.
+
+    Scrapers send METRICS_TOKEN as a bearer token; without a token only
+    staff users may read the metrics.
+    """
+    from .middleware import staff_user
+
+    token = settings.METRICS_TOKEN
+    if token and compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
+    if staff_user(request) is None:
+        return JsonResponse({'error': 'A valid metrics token or a staff user is required.'}, status=403)
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,272 @@
+import random
+import re
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from accounts.authentication import StatelessJWTAuthentication, TimedJWTAuthentication
+from transactions.captures import save_capture
+from .db_router import record_write, write_cache_key
+from .profiling import finish_profile, start_profile, start_recording, stop_profile, unprofiled
+from .sampler import sampler
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_accepts_br = re.compile(r'\bbr\b')
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+class HybridMiddleware:
+    """
+    Middleware running natively in both sync and async chains, so async
+    views are not pushed into a thread under ASGI.
+
+    Subclasses implement process_response, and aprocess_response when it
+    needs async I/O.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return await self.aprocess_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        return response
+
+    async def aprocess_response(self, request, response):
+        return self.process_response(request, response)
+
+class CompressionMiddleware(HybridMiddleware):
+    """
+    Compress response bodies of at least COMPRESSION_MIN_SIZE bytes.
+
+    Brotli is used when the module is installed and the client accepts it,
+    gzip otherwise. Streaming and already encoded responses are left alone.
+    """
+    def process_response(self, request, response):
+        if not settings.COMPRESSION_ENABLED:
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and _accepts_br.search(accept_encoding):
+            encoding, compressed = 'br', brotli.compress(response.content)
+        elif _accepts_gzip.search(accept_encoding):
+            encoding, compressed = 'gzip', compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+class ReadYourWritesMiddleware(HybridMiddleware):
+    """
+    Record successful writes so the user's next reads skip the replicas.
+    """
+    def writer(self, request, response):
+        """
+        The id of the user whose write succeeded, None for other requests.
+        """
+        user = getattr(request, 'user', None)
+        if (
+            settings.DATABASE_REPLICAS
+            and settings.REPLICA_READ_YOUR_WRITES
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            return user.pk
+        return None
+
+    def process_response(self, request, response):
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            record_write(user_id)
+        return response
+
+    async def aprocess_response(self, request, response):
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            await cache.aset(write_cache_key(user_id), True, settings.REPLICA_READ_YOUR_WRITES)
+        return response
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Time each request's auth, permission, SQL, market data and rendering
+    phases, record them in the per-route metrics served at /metrics and,
+    for staff users, add them as a Server-Timing header.
+
+    Placed first so the total covers every other middleware.
+    """
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        profile, token = start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_profile(token)
+        send_timing = settings.SERVER_TIMING_ENABLED and staff_user(request) is not None
+        return finish_profile(request, response, profile, send_timing)
+
+    async def __acall__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return await self.get_response(request)
+        profile, token = start_profile()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_profile(token)
+        send_timing = settings.SERVER_TIMING_ENABLED and await astaff_user(request) is not None
+        return finish_profile(request, response, profile, send_timing)
+
+def jwt_user(request):
+    """
+    The user of a request's bearer token, None without a valid one.
+    """
+    authentication = StatelessJWTAuthentication if settings.JWT_STATELESS else TimedJWTAuthentication
+    try:
+        authenticated = authentication().authenticate(request)
+    except APIException:
+        return None
+    return authenticated[0] if authenticated else None
+
+def staff_user(request):
+    """
+    The request's user when it is staff, from the session or a bearer token.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        user = jwt_user(request)
+    return user if user is not None and user.is_staff else None
+
+async def astaff_user(request):
+    """
+    Async staff_user().
+    """
+    user = await request.auser() if hasattr(request, 'auser') else None
+    if user is None or not user.is_authenticated:
+        user = await sync_to_async(jwt_user)(request)
+    return user if user is not None and user.is_staff else None
+
+class CaptureMiddleware(HybridMiddleware):
+    """
+    Capture requests for later analysis in the admin: staff requests
+    sending the PROFILER_HEADER, a PROFILER_SAMPLE_RATE share of all
+    requests, and any request slower than SLOW_REQUEST_THRESHOLD seconds.
+
+    Captures keep the request's SQL and phase timings, and the call stacks
+    sampled while a worker thread served it; under ASGI stacks are not
+    sampled, since the event loop thread interleaves requests. Requests
+    that trigger nothing skip all of it. A capture is profiled on its own
+    when profiling is off. The header's user is checked and the capture
+    stored outside the request's profile, so their queries do not count
+    towards the request's timings.
+    """
+    def header_sent(self, request):
+        header = settings.PROFILER_HEADER
+        return bool(header) and bool(request.META.get('HTTP_' + header.upper().replace('-', '_')))
+
+    def sampled(self):
+        return settings.PROFILER_SAMPLE_RATE > 0 and random.random() < settings.PROFILER_SAMPLE_RATE
+
+    def trigger(self, request):
+        """
+        Why the request is captured from the start, None when only its duration may capture it.
+        """
+        with unprofiled():
+            staff = self.header_sent(request) and staff_user(request) is not None
+        if staff:
+            return 'header'
+        return 'sampled' if self.sampled() else None
+
+    async def atrigger(self, request):
+        """
+        Async trigger().
+        """
+        with unprofiled():
+            staff = self.header_sent(request) and await astaff_user(request) is not None
+        if staff:
+            return 'header'
+        return 'sampled' if self.sampled() else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        reason = self.trigger(request)
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if reason is None and not threshold:
+            return self.get_response(request)
+
+        profile, token = start_recording()
+        watch = sampler.watch(0.0 if reason else threshold)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.unwatch(watch)
+            if token is not None:
+                stop_profile(token)
+        duration = perf_counter() - started
+        if reason is None and duration < threshold:
+            return response
+
+        with unprofiled():
+            capture = save_capture(request, response, reason or 'slow', duration, profile, watch)
+        if reason == 'header':
+            response['X-Profile-Id'] = str(capture.pk)
+        return response
+
+    async def __acall__(self, request):
+        reason = await self.atrigger(request)
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if reason is None and not threshold:
+            return await self.get_response(request)
+
+        profile, token = start_recording()
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                stop_profile(token)
+        duration = perf_counter() - started
+        if reason is None and duration < threshold:
+            return response
+
+        with unprofiled():
+            capture = await sync_to_async(save_capture)(request, response, reason or 'slow', duration, profile)
+        if reason == 'header':
+            response['X-Profile-Id'] = str(capture.pk)
+        return response
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+def estimated_count(queryset):
+    """
+    Planner row estimate of a table on PostgreSQL, None elsewhere or before the table is analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large admin changelists.
+
+    Unfiltered lists larger than ADMIN_EXACT_COUNT_LIMIT report the planner
+    estimate on PostgreSQL; other counts stop at that limit. Pages load the
+    primary keys of the slice first and then only those rows, so deep pages
+    skip over index entries instead of full rows.
+    """
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not self.object_list.query.has_filters():
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list.order_by()[:limit].count()
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        pks = list(self.object_list.values_list('pk', flat=True)[bottom:bottom + self.per_page])
+        rows = {obj.pk: obj for obj in self.object_list.filter(pk__in=pks)}
+        return self._get_page([rows[pk] for pk in pks if pk in rows], number, self)
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin mixin for tables with millions of rows: bounded or estimated
+    counts and no second unfiltered count query.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
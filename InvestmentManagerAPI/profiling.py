@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from .metrics import registry
+
+# Phases reported per request; db time also counts queries run inside auth and permissions
+PHASES = ('auth', 'permissions', 'db', 'market_data', 'render')
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+request_duration = registry.histogram(
+    'investmanager_request_duration_seconds', 'Time from the first middleware to the response.',
+    ('route', 'method'), DURATION_BUCKETS,
+)
+phase_duration = registry.histogram(
+    'investmanager_request_phase_seconds', 'Time spent per request phase.',
+    ('route', 'method', 'phase'), DURATION_BUCKETS,
+)
+request_queries = registry.histogram(
+    'investmanager_request_queries', 'SQL queries run per request.',
+    ('route', 'method'), QUERY_BUCKETS,
+)
+requests_total = registry.counter(
+    'investmanager_requests_total', 'Requests served.', ('route', 'method', 'status'),
+)
+cache_lookups_total = registry.counter(
+    'investmanager_cache_lookups_total', 'Response cache lookups.', ('view', 'result'),
+)
+
+_current = ContextVar('request_profile', default=None)
+
+class RequestProfile:
+    """
+    Time and number of calls per phase of one request, and its cache lookups.
+
+    `queries` holds (sql, seconds) pairs once record_queries() was called.
+    """
+    __slots__ = ('started', 'durations', 'calls', 'cache', 'queries')
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.cache = []
+        self.queries = None
+
+    def add(self, phase, elapsed):
+        self.durations[phase] += elapsed
+        self.calls[phase] += 1
+
+def timed(phase):
+    """
+    Decorator adding each call's run time to a phase of the current request.
+
+    Calls outside a profiled request only pay for one context variable read.
+    """
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                profile = _current.get()
+                if profile is None:
+                    return await func(*args, **kwargs)
+                started = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    profile.add(phase, perf_counter() - started)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.add(phase, perf_counter() - started)
+        return wrapper
+    return decorator
+
+def record_cache_lookup(name, hit):
+    """
+    Count a response cache lookup, on the current request too.
+    """
+    result = 'hit' if hit else 'miss'
+    cache_lookups_total.inc((name, result))
+    profile = _current.get()
+    if profile is not None:
+        profile.cache.append(f'{name}:{result}')
+
+def sql_timer(execute, sql, params, many, context):
+    """
+    Execute wrapper timing queries of profiled requests as the db phase.
+    """
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - started
+        profile.add('db', elapsed)
+        if profile.queries is not None:
+            profile.queries.append((sql, elapsed))
+
+def install_sql_timer(connection, **kwargs):
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+# Connections opened later, including those of sync_to_async threads
+connection_created.connect(install_sql_timer)
+
+def start_profile():
+    """
+    Begin profiling a request; returns the profile and the token to end it with.
+    """
+    for alias in connections:
+        install_sql_timer(connections[alias])
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+def record_queries():
+    """
+    Keep the SQL of the current request's queries; returns its profile,
+    None outside profiled requests.
+    """
+    profile = _current.get()
+    if profile is not None and profile.queries is None:
+        profile.queries = []
+    return profile
+
+def start_recording():
+    """
+    Keep the SQL of the current request's queries, profiling the request
+    when no profile is active, as with PROFILING_ENABLED off.
+
+    Returns the profile and the token to stop it with, None when the
+    profile was already active.
+    """
+    profile = record_queries()
+    if profile is not None:
+        return profile, None
+    profile, token = start_profile()
+    profile.queries = []
+    return profile, token
+
+def stop_profile(token):
+    """
+    Stop recording into the profile started with `token`.
+    """
+    _current.reset(token)
+
+@contextmanager
+def unprofiled():
+    """
+    Run a block without recording into the current request's profile, for
+    work done about the request rather than for it.
+    """
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+def route_of(request):
+    """
+    The URL name, or pattern, a request matched, so there is one series per endpoint.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+def server_timing(profile, total):
+    """
+    Server-Timing header value for a finished profile, durations in milliseconds.
+    """
+    entries = []
+    for phase in PHASES:
+        if profile.calls[phase]:
+            entry = f'{phase};dur={profile.durations[phase] * 1000:.2f}'
+            if phase == 'db':
+                entry += f';desc="{profile.calls[phase]} queries"'
+            elif phase == 'market_data':
+                entry += f';desc="{profile.calls[phase]} calls"'
+            entries.append(entry)
+    if profile.cache:
+        entries.append(f'cache;desc="{" ".join(profile.cache)}"')
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+def finish_profile(request, response, profile, send_timing=False):
+    """
+    Record a stopped profile's metrics and, with `send_timing`, add the
+    Server-Timing header.
+    """
+    total = perf_counter() - profile.started
+
+    labels = (route_of(request), request.method)
+    request_duration.observe(labels, total)
+    request_queries.observe(labels, profile.calls['db'])
+    requests_total.inc((*labels, str(response.status_code)))
+    for phase in PHASES:
+        if profile.calls[phase]:
+            phase_duration.observe((*labels, phase), profile.durations[phase])
+    registry.flush()
+
+    if send_timing:
+        response['Server-Timing'] = server_timing(profile, total)
+    return response
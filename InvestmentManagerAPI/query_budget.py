@@ -0,0 +1,131 @@
+import json
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """
+    Most queries one request to an endpoint may run, and the tables its main
+    queries must read through an index.
+
+    Views declare budgets per handler or viewset action in `query_budgets`,
+    e.g. `{'get': QueryBudget(3, indexed=('transactions_transaction',))}`;
+    model admins per admin view, e.g. `{'changelist': QueryBudget(8)}`.
+    """
+    max_queries: int
+    indexed: tuple = ()
+
+def budget_for(match, method):
+    """
+    The budget declared for a resolved URL and HTTP method, None when there is none.
+    """
+    func = match.func
+    model_admin = getattr(func, 'model_admin', None)
+    if model_admin is not None:
+        return getattr(model_admin, 'query_budgets', {}).get(match.url_name.rsplit('_', 1)[-1])
+
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return None
+    actions = getattr(func, 'actions', None) or {}
+    key = actions.get(method.lower(), method.lower())
+    return getattr(view_class, 'query_budgets', {}).get(key)
+
+def table_rows(connection, table):
+    """
+    Planner row estimate of a table on PostgreSQL, 0 before it is analyzed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
+
+def seq_scans(plan):
+    """
+    Tables read with a sequential scan anywhere in an EXPLAIN (FORMAT JSON) plan.
+    """
+    tables = set()
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan':
+            tables.add(node['Relation Name'])
+        nodes.extend(node.get('Plans', ()))
+    return tables
+
+def explain_violations(budget, queries, connection):
+    """
+    Sequential scans in the plans of captured SELECTs on PostgreSQL.
+
+    A scan is flagged on tables the budget lists as indexed and on any table
+    estimated at QUERY_PLAN_LARGE_TABLE_ROWS rows or more.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    violations = []
+    rows = {}
+    for query in queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        for table in sorted(seq_scans(plan[0]['Plan'])):
+            if table not in rows:
+                rows[table] = table_rows(connection, table)
+            if table in budget.indexed or rows[table] >= settings.QUERY_PLAN_LARGE_TABLE_ROWS:
+                violations.append(f'Seq Scan on {table} ({rows[table]} rows): {sql[:300]}')
+    return violations
+
+def check_request(client, method, path, data=None, using='default', **extra):
+    """
+    Send a request with a test client and check it against its endpoint's budget.
+
+    Returns:
+        tuple[HttpResponse, list[str], list[dict]]: The response, the budget
+        violations and the captured queries.
+
+    Raises:
+        LookupError: If the endpoint declares no budget for the method.
+    """
+    budget = budget_for(resolve(path.split('?')[0]), method)
+    if budget is None:
+        raise LookupError(f'No query budget declared for {method.upper()} {path}.')
+
+    connection = connections[using]
+    with CaptureQueriesContext(connection) as captured:
+        response = getattr(client, method.lower())(path, data, **extra)
+    queries = list(captured.captured_queries)
+
+    violations = []
+    if len(queries) > budget.max_queries:
+        violations.append(f'{len(queries)} queries, budget {budget.max_queries}')
+    violations.extend(explain_violations(budget, queries, connection))
+    return response, violations, queries
+
+def analyze(using='default'):
+    """
+    Refresh planner statistics after seeding, so plans reflect the data on PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+class QueryBudgetAssertions:
+    """
+    Test case mixin asserting requests stay within their endpoint's budget.
+    """
+    def assertWithinQueryBudget(self, method, path, data=None, **extra):
+        response, violations, queries = check_request(self.client, method, path, data, **extra)
+        if violations:
+            self.fail(
+                f'{method.upper()} {path} exceeded its query budget:\n  ' + '\n  '.join(violations)
+                + '\nQueries:\n  ' + '\n  '.join(query['sql'] for query in queries)
+            )
+        return response
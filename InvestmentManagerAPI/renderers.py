@@ -0,0 +1,62 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .profiling import timed
+
+_json_encoder = JSONEncoder()
+
+class OrjsonRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson, producing the same output as DRF's JSONRenderer.
+
+    Types orjson does not handle natively, such as Decimal and lazy strings,
+    fall back to DRF's encoder, so Decimals still render as numbers and UTC
+    datetimes end in Z.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = self.options
+        if accepted_media_type and 'indent' in accepted_media_type:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_json_encoder.default, option=options)
+
+def encode_msgpack(obj):
+    """
+    Encode the types MessagePack does not support natively.
+
+    Decimals become strings to keep their exact value; dates and times use
+    ISO 8601 like the JSON output.
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, datetime):
+        representation = obj.isoformat()
+        return representation[:-6] + 'Z' if representation.endswith('+00:00') else representation
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    return _json_encoder.default(obj)
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer for MessagePack, selected with `Accept: application/msgpack` or `?format=msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_msgpack, use_bin_type=True)
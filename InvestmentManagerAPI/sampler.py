@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+import time
+from time import perf_counter
+from django.conf import settings
+
+_labels = {}
+
+def frame_label(code):
+    """
+    Flame graph label of a code object, e.g. `get (transactions/views.py:210)`.
+    """
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(str(settings.BASE_DIR)):
+            filename = os.path.relpath(filename, settings.BASE_DIR)
+        elif 'site-packages' in filename:
+            filename = filename.split('site-packages' + os.sep, 1)[-1]
+        label = _labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+    return label
+
+def stack_of(frame):
+    """
+    Labels of a frame and its callers, outermost first.
+    """
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+def folded(stacks):
+    """
+    Render sampled stacks in the folded format read by flamegraph.pl and speedscope.
+    """
+    return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items()))
+
+def top_frames(folded_stacks, limit=25):
+    """
+    Frames with the most samples in a folded profile.
+
+    Returns:
+        list[tuple[str, int, int]]: Label, samples spent in the frame itself
+        and samples with the frame anywhere on the stack, by the latter.
+    """
+    own, total = {}, {}
+    for line in folded_stacks.splitlines():
+        stack, _, count = line.rpartition(' ')
+        frames = stack.split(';')
+        own[frames[-1]] = own.get(frames[-1], 0) + int(count)
+        for label in set(frames):
+            total[label] = total.get(label, 0) + int(count)
+    ranked = sorted(total, key=lambda label: (-total[label], label))[:limit]
+    return [(label, own.get(label, 0), total[label]) for label in ranked]
+
+class Watch:
+    """
+    Stacks sampled from one thread while it serves a request.
+    """
+    __slots__ = ('thread_id', 'sample_from', 'stacks', 'samples')
+
+    def __init__(self, thread_id, sample_from):
+        self.thread_id = thread_id
+        self.sample_from = sample_from
+        self.stacks = {}
+        self.samples = 0
+
+class StackSampler:
+    """
+    Statistical profiler sampling the call stacks of watched threads from a
+    daemon thread every PROFILER_INTERVAL seconds.
+
+    A watch is sampled once it is `after` seconds old, so watching for slow
+    requests costs nothing until a request turns slow. The daemon thread
+    sleeps while nothing is watched.
+    """
+    def __init__(self):
+        self.watches = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def watch(self, after=0.0):
+        """
+        Start watching the calling thread, sampling it after `after` seconds.
+        """
+        watch = Watch(threading.get_ident(), perf_counter() + after)
+        with self.lock:
+            self.watches[watch.thread_id] = watch
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return watch
+
+    def unwatch(self, watch):
+        """
+        Stop sampling a watch; its stacks are final once this returns.
+        """
+        with self.lock:
+            if self.watches.get(watch.thread_id) is watch:
+                del self.watches[watch.thread_id]
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.watches:
+                    self.wakeup.clear()
+            self.wakeup.wait()
+            time.sleep(settings.PROFILER_INTERVAL)
+            self.sample()
+
+    def sample(self):
+        """
+        Record the current stack of every watch that is due.
+        """
+        now = perf_counter()
+        with self.lock:
+            due = [watch for watch in self.watches.values() if now >= watch.sample_from]
+            if not due:
+                return
+            frames = sys._current_frames()
+            for watch in due:
+                frame = frames.get(watch.thread_id)
+                if frame is not None:
+                    stack = stack_of(frame)
+                    watch.stacks[stack] = watch.stacks.get(stack, 0) + 1
+                    watch.samples += 1
+
+sampler = StackSampler()
@@ -47,21 +47,46 @@ INSTALLED_APPS = [
     'django_filters',
 ]
 
+# Stateless JWT mode builds request.user from token claims instead of
+# querying the user table on every request. Only access tokens carry the
+# claims and a refresh reloads the user, so claims are trusted until the
+# access token expires. Full user rows are cached per process for
+# USER_CACHE_TIMEOUT seconds.
+
+JWT_STATELESS = os.getenv('JWT_STATELESS', 'False') == 'True'
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', '60'))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication'
+        if JWT_STATELESS else
+        'accounts.authentication.TimedJWTAuthentication',
     ),
      'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'InvestmentManagerAPI.renderers.OrjsonRenderer',
+        'InvestmentManagerAPI.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
 }
 
 MIDDLEWARE = [
+    'InvestmentManagerAPI.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'InvestmentManagerAPI.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'InvestmentManagerAPI.middleware.CaptureMiddleware',
+    'InvestmentManagerAPI.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,10 +115,179 @@ WSGI_APPLICATION = 'InvestmentManagerAPI.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. With DB_POOL=True on PostgreSQL, a psycopg pool (psycopg[pool]) is
+# used instead, sized by DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE; DB_POOL_TIMEOUT
+# is how long a request waits for a free connection.
+
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+
+def database_config(url):
+    config = dj_database_url.config(
+        default=url,
+        conn_max_age=0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        conn_health_checks=True,
+    )
+    if DB_POOL and 'postgresql' in config.get('ENGINE', ''):
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+    return config
+
 DATABASES = {
-        'default': dj_database_url.config(default=os.getenv('DATABASE_URL')),
+        'default': database_config(os.getenv('DATABASE_URL')),
+}
+
+# Read replicas: comma separated DATABASE_REPLICA_URLS become the aliases
+# replica_1, replica_2, ... Read-only views use them unless the user wrote
+# within the last REPLICA_READ_YOUR_WRITES seconds, which is recorded in the
+# cache, so replicas require a cache shared between workers. Tests read
+# replicas through the default connection.
+
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**database_config(url.strip()), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+# Shards: comma separated DATABASE_SHARD_URLS become the aliases shard_1,
+# shard_2, ... next to the default database. Transactions, investments, lots,
+# interest returns and NAV points live on their account's shard; create the
+# shard tables with `migrate --database shard_1`. Lookups of an account's
+# shard by id are cached for SHARD_CACHE_TIMEOUT seconds in a cache that must
+# be shared between workers, so moves reach all of them.
+
+DATABASE_SHARDS = ['default']
+for index, url in enumerate(filter(None, os.getenv('DATABASE_SHARD_URLS', '').split(',')), start=1):
+    alias = f'shard_{index}'
+    DATABASES[alias] = database_config(url.strip())
+    DATABASE_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    'InvestmentManagerAPI.sharding.ShardRouter',
+    'InvestmentManagerAPI.db_router.ReplicaRouter',
+]
+REPLICA_READ_YOUR_WRITES = int(os.getenv('REPLICA_READ_YOUR_WRITES', '10'))
+SHARD_CACHE_TIMEOUT = int(os.getenv('SHARD_CACHE_TIMEOUT', '60'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default; use FileBasedCache with a directory as CACHE_LOCATION,
+# or RedisCache with a redis:// URL to share the cache between workers, which
+# read replicas and shards require.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'investmanager'),
+    }
 }
 
+# Lifetime in seconds of cached endpoint responses and market data quotes
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+MARKET_DATA_CACHE_TIMEOUT = int(os.getenv('MARKET_DATA_CACHE_TIMEOUT', '60'))
+
+# Market data endpoint, pointed at a local stub by the API benchmark
+
+ALPHA_VANTAGE_BASE_URL = os.getenv('ALPHA_VANTAGE_BASE_URL', 'https://www.alphavantage.co/query')
+
+# Lifetime in seconds of cached account permission lookups; entries are keyed
+# on the account version, which every permission or membership change bumps
+
+PERMISSION_CACHE_TIMEOUT = int(os.getenv('PERMISSION_CACHE_TIMEOUT', '600'))
+
+# Response compression: gzip, or brotli when installed and accepted, for
+# bodies of at least COMPRESSION_MIN_SIZE bytes
+
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+# Admin changelists count rows exactly up to this limit; larger unfiltered
+# tables report the PostgreSQL planner estimate instead
+
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('ADMIN_EXACT_COUNT_LIMIT', '10000'))
+
+# Query budget checks flag sequential scans on tables of at least this many
+# estimated rows, besides the tables an endpoint declares as indexed
+
+QUERY_PLAN_LARGE_TABLE_ROWS = int(os.getenv('QUERY_PLAN_LARGE_TABLE_ROWS', '10000'))
+
+# Request profiling: per-phase timings in a Server-Timing header sent to staff
+# users and per-route histograms at /metrics, served to scrapers sending
+# METRICS_TOKEN and to staff users. With several worker processes,
+# METRICS_DIR is a directory shared by them where each writes its metrics
+# every METRICS_FLUSH_INTERVAL seconds, so one scrape reports all of them
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True') == 'True'
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', '10'))
+
+# Request captures: staff requests sending PROFILER_HEADER and a
+# PROFILER_SAMPLE_RATE share of requests are profiled by sampling their call
+# stacks every PROFILER_INTERVAL seconds; requests slower than
+# SLOW_REQUEST_THRESHOLD seconds (0 disables) are captured with their SQL and
+# sampled from the threshold on. Stacks are written to PROFILE_DIR in the
+# folded flame graph format and the newest PROFILE_MAX_CAPTURES are kept
+
+PROFILER_HEADER = os.getenv('PROFILER_HEADER', 'X-Profile')
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.005'))
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+PROFILE_MAX_CAPTURES = int(os.getenv('PROFILE_MAX_CAPTURES', '500'))
+
+
+# Bulk provisioning: password hashing processes (0 uses every core) and
+# roster rows written per bulk insert
+
+PROVISIONING_WORKERS = int(os.getenv('PROVISIONING_WORKERS', '0'))
+PROVISIONING_CHUNK_SIZE = int(os.getenv('PROVISIONING_CHUNK_SIZE', '1000'))
+
+
+# Cost basis method used when sells consume tax lots: fifo, lifo or average
+
+LOT_METHOD = os.getenv('LOT_METHOD', 'fifo')
+
+# Longest NAV series, in days, a request may ask for with start_date
+
+NAV_MAX_DAYS = int(os.getenv('NAV_MAX_DAYS', '3660'))
+
+# Symbol used as the market benchmark for beta in risk analytics
+
+BENCHMARK_SYMBOL = os.getenv('BENCHMARK_SYMBOL', 'SPY')
+
+# Worker processes for projections and backtest sweeps (0 uses every core)
+
+SIMULATION_WORKERS = int(os.getenv('SIMULATION_WORKERS', '0'))
+
+# Monte Carlo projections: path count from which chunks run in the process
+# pool, and result cache lifetime in seconds
+
+PROJECTION_PARALLEL_PATHS = int(os.getenv('PROJECTION_PARALLEL_PATHS', '50000'))
+PROJECTION_CACHE_TIMEOUT = int(os.getenv('PROJECTION_CACHE_TIMEOUT', '3600'))
+
+# Largest number of runs a single backtest parameter sweep may request
+
+BACKTEST_MAX_RUNS = int(os.getenv('BACKTEST_MAX_RUNS', '256'))
+
+# FX rates: provider class, local rates file used by the file provider,
+# currency all stored prices are quoted in, default currency of reports,
+# in-process cache lifetime and age after which stored rates are refreshed
+# (seconds, 0 never refreshes once rates are stored)
+
+FX_PROVIDER = os.getenv('FX_PROVIDER', 'transactions.fx.FileFxProvider')
+FX_RATES_FILE_PATH = os.getenv('FX_RATES_FILE_PATH', 'fx_rates.json')
+FX_BASE_CURRENCY = os.getenv('FX_BASE_CURRENCY', 'USD')
+REPORTING_CURRENCY = os.getenv('REPORTING_CURRENCY', 'USD')
+FX_CACHE_TIMEOUT = int(os.getenv('FX_CACHE_TIMEOUT', '300'))
+FX_MAX_AGE = int(os.getenv('FX_MAX_AGE', '86400'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,184 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, models
+
+# Account-scoped models stored on the shard of their account. Users,
+# accounts, memberships, permissions and market data stay on the primary.
+SHARDED_MODELS = frozenset({
+    'transactions.Transaction',
+    'transactions.SimulatedInvestment',
+    'transactions.TaxLot',
+    'transactions.InterestReturn',
+    'transactions.DailyNav',
+})
+
+_active_shard = ContextVar('active_shard', default=None)
+
+def sharding_enabled():
+    """
+    Whether more than one shard is configured.
+    """
+    return len(settings.DATABASE_SHARDS) > 1
+
+def choose_shard():
+    """
+    Shard of a new account, picked at random so accounts spread evenly.
+    """
+    return random.choice(settings.DATABASE_SHARDS)
+
+def shard_cache_key(account_id):
+    """
+    Cache key of an account's shard.
+    """
+    return f'account-shard:{account_id}'
+
+def account_shard(account):
+    """
+    Return the database alias holding the data of a loaded account.
+
+    Requests read the shard from the account their access check loaded, so
+    they follow a move as soon as it is committed.
+    """
+    if not sharding_enabled():
+        return 'default'
+    return account.shard
+
+def shard_for(account_id):
+    """
+    Return the database alias holding an account's data, by account id.
+
+    The shard map lives on Account.shard and is cached for SHARD_CACHE_TIMEOUT
+    seconds; move_account clears the entry, which only reaches other workers
+    through a shared cache.
+    """
+    if not sharding_enabled() or account_id is None:
+        return 'default'
+    key = shard_cache_key(account_id)
+    shard = cache.get(key)
+    if shard is None:
+        from accounts.models import Account
+        shard = Account.objects.filter(pk=account_id).values_list('shard', flat=True).first() or 'default'
+        cache.set(key, shard, settings.SHARD_CACHE_TIMEOUT)
+    return shard
+
+def shards_for(account_ids):
+    """
+    Return the distinct shards holding a set of accounts.
+    """
+    if not sharding_enabled():
+        return ['default']
+    return sorted({shard_for(account_id) for account_id in account_ids})
+
+def clear_shard_cache(account_id):
+    """
+    Forget the cached shard of an account after it moved.
+    """
+    cache.delete(shard_cache_key(account_id))
+
+@contextmanager
+def use_shard(alias):
+    """
+    Route account-scoped models to one shard in this context.
+    """
+    token = _active_shard.set(alias)
+    try:
+        yield
+    finally:
+        _active_shard.reset(token)
+
+def fan_out(func, aliases=None):
+    """
+    Call func(alias) on every shard in parallel threads and return the results in shard order.
+
+    Each thread closes the connections it opened. A single shard runs in this thread.
+    """
+    aliases = list(aliases or settings.DATABASE_SHARDS)
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        futures = [pool.submit(copy_context().run, run, alias) for alias in aliases]
+        return [future.result() for future in futures]
+
+class AccountScopedQuerySet(models.QuerySet):
+    """
+    QuerySet of an account-scoped model.
+    """
+    def for_account(self, account_id):
+        """
+        Rows of one account, read from and written to its shard.
+        """
+        return self.using(shard_for(account_id)).filter(account_id=account_id)
+
+AccountScopedManager = models.Manager.from_queryset(AccountScopedQuerySet)
+
+class ShardRouter:
+    """
+    Route account-scoped models to the shard of their account.
+
+    The shard comes from use_shard() when active, otherwise from the
+    instance the query is made for. Queries without either fall through to
+    the next router. Other models, and anything while a single shard is
+    configured, are left to the next router.
+    """
+    def route(self, model, hints):
+        if not sharding_enabled() or model._meta.label not in SHARDED_MODELS:
+            return None
+        active = _active_shard.get()
+        if active:
+            return active
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label == 'accounts.Account':
+            return shard_for(instance.pk)
+        if getattr(instance, 'account_id', None) is not None:
+            return shard_for(instance.account_id)
+        return instance._state.db
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default' or db not in settings.DATABASE_SHARDS:
+            return None
+        return model_name is not None and f'{app_label}.{model_name}' in {
+            label.lower() for label in SHARDED_MODELS
+        }
+
+class AccountShardMixin:
+    """
+    View mixin routing account-scoped models to the shard of the
+    `account_pk` URL argument for the rest of the request.
+
+    The shard is read from the account loaded with the request's access,
+    which the permission checks have usually resolved already.
+    """
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        account_pk = kwargs.get('account_pk')
+        if sharding_enabled() and account_pk is not None:
+            from accounts.permissions import resolve_access
+            self._shard_token = _active_shard.set(resolve_access(request, account_pk).account.shard)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = self.__dict__.pop('_shard_token', None)
+        if token is not None:
+            _active_shard.reset(token)
+        return super().finalize_response(request, response, *args, **kwargs)
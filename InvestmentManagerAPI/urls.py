@@ -19,9 +19,11 @@ from django.urls import path,include
 from rest_framework_simplejwt.views import (
     TokenRefreshView,TokenObtainPairView,
 )
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/', include('accounts.urls')),
@@ -1,11 +1,15 @@
 from django.contrib import admin
+from InvestmentManagerAPI.paginators import LargeTableAdminMixin
+from InvestmentManagerAPI.query_budget import QueryBudget
 from .models import Account,AccountPermissions
 
 # Register your models here.
-class AccountAdmin(admin.ModelAdmin):
+class AccountAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Register name and users fields to admin
     """
+    query_budgets = {'changelist': QueryBudget(4)}
+
     def get_queryset(self, request):
         """
         Method to filter staff and non-staff users
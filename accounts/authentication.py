@@ -0,0 +1,119 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from InvestmentManagerAPI.profiling import timed
+
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser', 'is_active')
+
+_user_cache = {}
+_user_lock = threading.Lock()
+
+def add_user_claims(token, user):
+    """
+    Embed the user fields read by the views into an access token.
+
+    Refresh tokens never carry the claims, so each refresh reads them from
+    the user row instead of copying them forward.
+    """
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+def tokens_for_user(user):
+    """
+    Issue a refresh token and an access token carrying the user claims.
+    """
+    refresh = RefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(add_user_claims(refresh.access_token, user)),
+    }
+
+def cached_user(user_id):
+    """
+    Return the full user row, cached in this process for USER_CACHE_TIMEOUT seconds.
+
+    Raises:
+        User.DoesNotExist: If no user has the given id.
+    """
+    now = time.monotonic()
+    cached = _user_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    user = User.objects.get(pk=user_id)
+    with _user_lock:
+        _user_cache[user_id] = (now + settings.USER_CACHE_TIMEOUT, user)
+    return user
+
+def clear_user_cache(user_id=None):
+    """
+    Drop one or every user cached in this process.
+    """
+    with _user_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(user_id, None)
+
+def full_user(user):
+    """
+    Return a user with every field loaded, for code that reads or saves the whole row.
+    """
+    if user.get_deferred_fields():
+        return cached_user(user.pk)
+    return user
+
+def user_from_claims(validated_token):
+    """
+    Build a User instance from token claims without touching the database.
+
+    Fields missing from the token are deferred and load on first access, and
+    saving the instance only writes the claim fields.
+    """
+    claims = {claim: validated_token[claim] for claim in USER_CLAIMS}
+    claims['id'] = validated_token[api_settings.USER_ID_CLAIM]
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+    return User.from_db(
+        router.db_for_read(User), field_names, [claims[name] for name in field_names]
+    )
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication timed as the auth phase of profiled requests.
+    """
+
+    @timed('auth')
+    def authenticate(self, request):
+        return super().authenticate(request)
+
+class StatelessJWTAuthentication(TimedJWTAuthentication):
+    """
+    JWT authentication that builds the user from token claims instead of a query.
+
+    Tokens issued before the claims were added fall back to the in-process
+    user cache. Claims are trusted until the access token expires.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if all(claim in validated_token for claim in USER_CLAIMS):
+            user = user_from_claims(validated_token)
+        else:
+            try:
+                user = cached_user(validated_token[api_settings.USER_ID_CLAIM])
+            except User.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,108 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+def query_list(request, param):
+    """
+    Parse a comma separated query parameter, None when it is absent.
+    """
+    if request is None or param not in request.query_params:
+        return None
+    return [name.strip() for name in request.query_params[param].split(',') if name.strip()]
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin honouring ?fields= and ?expand= on read requests.
+
+    `?fields=id,amount` keeps only the named fields. `?expand=name` swaps a
+    related field for the nested serializer declared in
+    Meta.expandable_fields as `{name: (serializer_class, options)}`.
+    Meta.field_dependencies maps computed fields to the model fields they
+    read, so querysets can be pruned with prune_queryset.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in query_list(request, 'expand') or ():
+            if name in expandable:
+                serializer_class, options = expandable[name]
+                self.fields[name] = serializer_class(read_only=True, **options)
+
+        fields = query_list(request, 'fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+def collect_fields(serializer, model, prefix, plan):
+    """
+    Add the columns, joins and prefetches a serializer reads to a query plan.
+    """
+    dependencies = getattr(getattr(serializer, 'Meta', None), 'field_dependencies', {})
+    for name, field in serializer.fields.items():
+        sources = dependencies.get(name, [field.source])
+        for source in sources:
+            if source == '*':
+                continue
+            path = source.replace('.', '__').split('__')
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                continue
+
+            lookup = prefix + path[0]
+            if model_field.many_to_many or model_field.one_to_many:
+                plan['prefetch'][lookup] = related_queryset(field, model_field.related_model)
+            elif model_field.is_relation:
+                plan['only'].add(lookup)
+                nested = getattr(field, 'child', field)
+                if isinstance(nested, serializers.BaseSerializer):
+                    plan['select'].add(lookup)
+                    collect_fields(nested, model_field.related_model, lookup + '__', plan)
+                elif len(path) > 1:
+                    plan['select'].add(lookup)
+                    plan['only'].add(prefix + '__'.join(path))
+            else:
+                plan['only'].add(lookup)
+
+def related_queryset(field, related_model):
+    """
+    Queryset loading only the columns a to-many field serializes.
+    """
+    child = getattr(field, 'child_relation', getattr(field, 'child', None))
+    pk = related_model._meta.pk.name
+    if isinstance(child, serializers.SlugRelatedField):
+        return related_model.objects.only(pk, child.slug_field)
+    if isinstance(child, serializers.BaseSerializer):
+        plan = {'only': {pk}, 'select': set(), 'prefetch': {}}
+        collect_fields(child, related_model, '', plan)
+        return related_model.objects.only(*plan['only'])
+    return related_model.objects.all()
+
+def prune_queryset(queryset, serializer_class, request):
+    """
+    Restrict a queryset to what the requested fieldset serializes.
+
+    To-many relations are always prefetched; columns are pruned with only()
+    when the client asked for specific fields.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return queryset
+
+    serializer = serializer_class(context={'request': request})
+    plan = {'only': set(), 'select': set(), 'prefetch': {}}
+    collect_fields(serializer, queryset.model, '', plan)
+
+    if plan['select']:
+        queryset = queryset.select_related(*sorted(plan['select']))
+    if plan['prefetch']:
+        queryset = queryset.prefetch_related(*(
+            Prefetch(lookup, queryset=related) for lookup, related in plan['prefetch'].items()
+        ))
+    if query_list(request, 'fields') is not None:
+        queryset = queryset.only(queryset.model._meta.pk.name, *sorted(plan['only']))
+    return queryset
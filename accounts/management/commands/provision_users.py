@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.provisioning import ROSTER_FORMATS, provision, read_roster, roster_format
+
+class Command(BaseCommand):
+    """
+    Create users, accounts and permissions in bulk from a roster file.
+    """
+    help = 'Provision users with their accounts and permissions from a CSV or NDJSON roster.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='Roster file with username, email, password, account and permission.')
+        parser.add_argument('--format', choices=ROSTER_FORMATS, help='Roster format, defaults to the file extension.')
+        parser.add_argument('--workers', type=int, help='Password hashing processes, defaults to PROVISIONING_WORKERS.')
+        parser.add_argument('--chunk-size', type=int, help='Rows per bulk insert, defaults to PROVISIONING_CHUNK_SIZE.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['roster'], encoding='utf-8-sig', newline='') as stream:
+                rows = read_roster(stream, roster_format(options['roster'], options['format']))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e)) from e
+
+        def progress(processed, total):
+            self.stdout.write(f'{processed}/{total} rows processed')
+
+        result = provision(rows, options['workers'], options['chunk_size'], progress)
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']} ({error['username']}): {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created_users']} users and {result['created_accounts']} accounts, "
+            f"{len(result['errors'])} rows skipped."
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_remove_account_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='modified_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:52
+
+import InvestmentManagerAPI.sharding
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_account_version'),
+    ]
+
+    operations = [
+        # Existing accounts keep their data on the primary database.
+        migrations.AddField(
+            model_name='account',
+            name='shard',
+            field=models.CharField(default='default', editable=False, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='shard',
+            field=models.CharField(default=InvestmentManagerAPI.sharding.choose_shard, editable=False, max_length=50),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from InvestmentManagerAPI.sharding import choose_shard
 
 # Create your models here.
 
@@ -10,6 +12,9 @@ class Account(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
     users = models.ManyToManyField(User, related_name='investor_accounts')
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    modified_at = models.DateTimeField(default=timezone.now, editable=False)
+    shard = models.CharField(max_length=50, default=choose_shard, editable=False)
     
     def __str__(self):
         return self.name
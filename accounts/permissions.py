@@ -0,0 +1,278 @@
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.utils import timezone
+from django.http import Http404
+from rest_framework import exceptions
+from rest_framework.permissions import BasePermission
+from InvestmentManagerAPI.profiling import timed
+from .models import Account, AccountPermissions
+
+@dataclass
+class AccountAccess:
+    """
+    A user's membership and permission level for one account.
+    """
+    account_id: int
+    exists: bool
+    is_member: bool
+    permission: str | None
+    _account: Account | None = field(default=None, repr=False)
+
+    @property
+    def account(self):
+        """
+        The account itself, loaded on first use when the access came from the cache.
+        """
+        if self._account is None:
+            self._account = Account.objects.filter(pk=self.account_id).first()
+            if self._account is None:
+                raise Http404('No Account matches the given query.')
+        return self._account
+
+    async def aget_account(self):
+        """
+        Async access to the account for views running on the event loop.
+        """
+        if self._account is None:
+            self._account = await Account.objects.filter(pk=self.account_id).afirst()
+            if self._account is None:
+                raise Http404('No Account matches the given query.')
+        return self._account
+
+def access_cache_key(user_id, account_id, version):
+    """
+    Cache key of the access a user has to an account at one account version.
+    """
+    return f'account-access:{user_id}:{account_id}:{version}'
+
+def access_queryset(user, account_id):
+    """
+    The account annotated with the user's membership and permission level.
+    """
+    return Account.objects.filter(pk=account_id).annotate(
+        is_member=Exists(
+            Account.users.through.objects.filter(account_id=OuterRef('pk'), user_id=user.pk)
+        ),
+        permission_level=Subquery(
+            AccountPermissions.objects.filter(account_id=OuterRef('pk'), user_id=user.pk)
+            .values('permission')[:1]
+        ),
+    )
+
+def access_from(account_id, account):
+    """
+    Build the access from an annotated account, or its absence.
+    """
+    if account is None:
+        return AccountAccess(account_id=account_id, exists=False, is_member=False, permission=None)
+    return AccountAccess(
+        account_id=account.pk,
+        exists=True,
+        is_member=account.is_member,
+        permission=account.permission_level,
+        _account=account,
+    )
+
+def load_access(user, account_id):
+    """
+    Load the account, the user's membership and permission level in one query.
+    """
+    return access_from(account_id, access_queryset(user, account_id).first())
+
+async def aload_access(user, account_id):
+    """
+    Async load_access() for views running on the event loop.
+    """
+    return access_from(account_id, await access_queryset(user, account_id).afirst())
+
+def parse_account_id(account_id):
+    """
+    The account id as an integer, 404 when it is not one.
+    """
+    try:
+        return int(account_id)
+    except (TypeError, ValueError):
+        raise Http404('No Account matches the given query.')
+
+@timed('permissions')
+def get_access(user, account_id):
+    """
+    Return a user's access to an account, cached across requests.
+
+    The account is read on every call and entries are keyed on its version,
+    which every permission and membership change bumps, so a change made in
+    any process makes older entries unreachable. Entries otherwise expire
+    after PERMISSION_CACHE_TIMEOUT seconds.
+    """
+    account_id = parse_account_id(account_id)
+    account = Account.objects.filter(pk=account_id).first()
+    if account is None:
+        return access_from(account_id, None)
+    key = access_cache_key(user.pk, account_id, account.version)
+    cached = cache.get(key)
+    if cached is not None:
+        return AccountAccess(account_id, True, *cached, _account=account)
+
+    access = load_access(user, account_id)
+    if access.exists:
+        key = access_cache_key(user.pk, account_id, access._account.version)
+    cache.set(key, (access.is_member, access.permission), settings.PERMISSION_CACHE_TIMEOUT)
+    return access
+
+@timed('permissions')
+async def aget_access(user, account_id):
+    """
+    Async get_access() sharing its cache entries.
+    """
+    account_id = parse_account_id(account_id)
+    account = await Account.objects.filter(pk=account_id).afirst()
+    if account is None:
+        return access_from(account_id, None)
+    key = access_cache_key(user.pk, account_id, account.version)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return AccountAccess(account_id, True, *cached, _account=account)
+
+    access = await aload_access(user, account_id)
+    if access.exists:
+        key = access_cache_key(user.pk, account_id, access._account.version)
+    await cache.aset(key, (access.is_member, access.permission), settings.PERMISSION_CACHE_TIMEOUT)
+    return access
+
+def resolve_access(request, account_id):
+    """
+    Return the requesting user's access to an account, memoized on the request.
+    """
+    memo = request.__dict__.setdefault('_account_access', {})
+    key = str(account_id)
+    if key not in memo:
+        memo[key] = get_access(request.user, account_id)
+    return memo[key]
+
+async def aresolve_access(request, account_id):
+    """
+    Async resolve_access() sharing its per-request memo.
+    """
+    memo = request.__dict__.setdefault('_account_access', {})
+    key = str(account_id)
+    if key not in memo:
+        memo[key] = await aget_access(request.user, account_id)
+    return memo[key]
+
+def apply_permission_matrix(entries):
+    """
+    Grant, change or revoke permissions for many (user, account) pairs at once.
+
+    Names are resolved with one IN query each, grants are upserted on the
+    (user, account) key and revocations removed with one delete. Nothing is
+    written when an entry names an unknown user or account or repeats a pair.
+
+    Args:
+        entries (list[dict]): Entries with `user` and `account` names and a
+            `permission`, where None revokes the permission.
+
+    Returns:
+        tuple[dict | None, list[dict]]: The diff summary and the entry errors.
+    """
+    users = dict(User.objects.filter(username__in={entry['user'] for entry in entries}).values_list('username', 'id'))
+    accounts = dict(Account.objects.filter(name__in={entry['account'] for entry in entries}).values_list('name', 'id'))
+
+    errors = []
+    wanted = {}
+    for index, entry in enumerate(entries):
+        if entry['user'] not in users:
+            errors.append({'entry': index, 'error': f"User '{entry['user']}' does not exist."})
+        elif entry['account'] not in accounts:
+            errors.append({'entry': index, 'error': f"Account '{entry['account']}' does not exist."})
+        elif (users[entry['user']], accounts[entry['account']]) in wanted:
+            errors.append({'entry': index, 'error': 'The user and account are listed more than once.'})
+        else:
+            wanted[(users[entry['user']], accounts[entry['account']])] = entry
+    if errors:
+        return None, errors
+
+    current = {
+        (user_id, account_id): (pk, permission)
+        for pk, user_id, account_id, permission in AccountPermissions.objects.filter(
+            user_id__in={user_id for user_id, _ in wanted},
+            account_id__in={account_id for _, account_id in wanted},
+        ).values_list('pk', 'user_id', 'account_id', 'permission')
+    }
+
+    summary = {'created': 0, 'updated': 0, 'revoked': 0, 'unchanged': 0, 'changes': []}
+    upserts = []
+    revoked_ids = []
+    for pair, entry in wanted.items():
+        pk, previous = current.get(pair, (None, None))
+        permission = entry['permission']
+        if permission == previous:
+            summary['unchanged'] += 1
+            continue
+        if permission is None:
+            revoked_ids.append(pk)
+            summary['revoked'] += 1
+        else:
+            upserts.append(AccountPermissions(user_id=pair[0], account_id=pair[1], permission=permission))
+            summary['updated' if previous else 'created'] += 1
+        summary['changes'].append({
+            'user': entry['user'], 'account': entry['account'],
+            'previous': previous, 'permission': permission,
+        })
+
+    changed = [pair for pair, entry in wanted.items() if entry['permission'] != current.get(pair, (None, None))[1]]
+    if changed:
+        with transaction.atomic():
+            AccountPermissions.objects.bulk_create(
+                upserts, update_conflicts=True,
+                unique_fields=['user', 'account'], update_fields=['permission'],
+            )
+            AccountPermissions.objects.filter(pk__in=revoked_ids).delete()
+            # Bulk upserts skip the save signals; their version bump, which
+            # also retires cached access, is applied once here.
+            Account.objects.filter(pk__in={account_id for _, account_id in changed}).update(
+                version=F('version') + 1, modified_at=timezone.now()
+            )
+    return summary, []
+
+class HasAccountPermission(BasePermission):
+    """
+    Allow requests from account members whose permission level is in `allowed`.
+
+    The account is read from the `account_pk` URL argument. Views may set
+    `account_permission_message` for the 403 error and
+    `account_membership_required = False` to accept permission holders who
+    are not account members.
+    """
+    allowed = (
+        AccountPermissions.VIEW_ONLY,
+        AccountPermissions.FULL_ACCESS,
+        AccountPermissions.POST_ONLY,
+    )
+    message = 'You do not have permission to access this account.'
+
+    def has_permission(self, request, view):
+        return self.check_access(resolve_access(request, view.kwargs.get('account_pk')), view)
+
+    async def ahas_permission(self, request, view):
+        return self.check_access(await aresolve_access(request, view.kwargs.get('account_pk')), view)
+
+    def check_access(self, access, view):
+        if not access.exists:
+            raise Http404('No Account matches the given query.')
+        if getattr(view, 'account_membership_required', True) and not access.is_member:
+            raise Http404('No Account matches the given query.')
+        if access.permission not in self.allowed:
+            message = getattr(view, 'account_permission_message', self.message)
+            raise exceptions.PermissionDenied({'error': message})
+        return True
+
+class CanViewAccount(HasAccountPermission):
+    """
+    Allow users with view or full access to read an account.
+    """
+    allowed = (AccountPermissions.VIEW_ONLY, AccountPermissions.FULL_ACCESS)
+    message = 'You do not have permission to view this account.'
@@ -0,0 +1,250 @@
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Account, AccountPermissions
+
+ROSTER_FORMATS = ('csv', 'ndjson')
+LOOKUP_CHUNK = 500
+
+def read_roster(stream, fmt):
+    """
+    Read roster rows from a text stream of CSV with a header line or NDJSON.
+
+    Raises:
+        ValueError: If the format is unknown or a line is not a JSON object.
+    """
+    if fmt == 'csv':
+        return list(csv.DictReader(stream))
+    if fmt == 'ndjson':
+        rows = []
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Line {number} is not valid JSON: {e}') from e
+            if not isinstance(row, dict):
+                raise ValueError(f'Line {number} is not a JSON object.')
+            rows.append(row)
+        return rows
+    raise ValueError(f"Unsupported roster format '{fmt}', use one of: {', '.join(ROSTER_FORMATS)}.")
+
+def roster_format(filename, fmt=None):
+    """
+    Pick the roster format from an explicit value or the file extension.
+    """
+    if fmt:
+        return fmt
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return 'ndjson' if extension in ('ndjson', 'jsonl') else 'csv'
+
+def read_uploaded_roster(upload, fmt=None):
+    """
+    Read roster rows from an uploaded file.
+    """
+    stream = io.TextIOWrapper(upload, encoding='utf-8-sig')
+    return read_roster(stream, roster_format(upload.name, fmt))
+
+def text_field(row, name):
+    """
+    A text field of a roster row, empty when missing.
+
+    NDJSON rows may hold any JSON value, so anything but a string is a row error.
+    """
+    value = row.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValidationError(f"'{name}' must be a string.")
+    return value
+
+def clean_row(row):
+    """
+    Normalize one roster row, raising ValidationError for invalid fields.
+    """
+    username = User._meta.get_field('username').clean(text_field(row, 'username').strip(), None)
+    email = User._meta.get_field('email').clean(text_field(row, 'email').strip(), None)
+    password = text_field(row, 'password')
+    if not password:
+        raise ValidationError('A password is required.')
+    permission = text_field(row, 'permission').strip() or AccountPermissions.VIEW_ONLY
+    if permission not in dict(AccountPermissions.PERMISSION_CHOICES):
+        raise ValidationError(f"Unknown permission '{permission}'.")
+    return {
+        'username': username,
+        'email': email,
+        'password': password,
+        'account': text_field(row, 'account').strip(),
+        'permission': permission,
+    }
+
+def existing_values(field, values):
+    """
+    Return which of the values are already taken in a User field, querying in chunks.
+    """
+    values = list(values)
+    taken = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[start:start + LOOKUP_CHUNK]
+        taken.update(User.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True))
+    return taken
+
+def hash_passwords(rows):
+    """
+    Validate and hash the passwords of a chunk of rows; runs in worker processes.
+
+    Returns a (hash, error) pair per row.
+    """
+    results = []
+    for username, email, password in rows:
+        try:
+            validate_password(password, User(username=username, email=email))
+        except ValidationError as e:
+            results.append((None, ' '.join(e.messages)))
+        else:
+            results.append((make_password(password), None))
+    return results
+
+def hashed_chunks(chunks, workers):
+    """
+    Hash chunks in a process pool, yielding results in order as they complete.
+
+    A single worker hashes in this process.
+    """
+    arguments = [[(row['username'], row['email'], row['password']) for _, row in chunk] for chunk in chunks]
+    if workers == 1:
+        yield from map(hash_passwords, arguments)
+        return
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        yield from pool.map(hash_passwords, arguments)
+
+def resolve_accounts(names):
+    """
+    Map account names to ids, creating the accounts that do not exist yet.
+    """
+    accounts = {}
+    names = list(names)
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        chunk = names[start:start + LOOKUP_CHUNK]
+        accounts.update(Account.objects.filter(name__in=chunk).values_list('name', 'id'))
+    existing = set(accounts.values())
+
+    missing = [name for name in names if name not in accounts]
+    if missing:
+        Account.objects.bulk_create([Account(name=name) for name in missing], batch_size=settings.PROVISIONING_CHUNK_SIZE)
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            accounts.update(Account.objects.filter(name__in=chunk).values_list('name', 'id'))
+    return accounts, existing, len(missing)
+
+def write_chunk(chunk, hashes, accounts):
+    """
+    Create the users of a chunk with their memberships and permissions.
+
+    Returns the number of users created and row errors from password validation.
+    """
+    errors = []
+    users = []
+    for (index, row), (password_hash, error) in zip(chunk, hashes):
+        if error:
+            errors.append({'row': index, 'username': row['username'], 'error': error})
+            continue
+        users.append((row, User(username=row['username'], email=row['email'], password=password_hash)))
+    if not users:
+        return 0, errors
+
+    with transaction.atomic():
+        User.objects.bulk_create([user for _, user in users])
+        ids = dict(User.objects.filter(username__in=[row['username'] for row, _ in users]).values_list('username', 'id'))
+        memberships = []
+        permissions = []
+        for row, _ in users:
+            if not row['account']:
+                continue
+            user_id, account_id = ids[row['username']], accounts[row['account']]
+            memberships.append(Account.users.through(account_id=account_id, user_id=user_id))
+            permissions.append(AccountPermissions(account_id=account_id, user_id=user_id, permission=row['permission']))
+        Account.users.through.objects.bulk_create(memberships, ignore_conflicts=True)
+        AccountPermissions.objects.bulk_create(permissions, ignore_conflicts=True)
+    return len(users), errors
+
+def provision(rows, workers=None, chunk_size=None, progress=None):
+    """
+    Create users, accounts, memberships and permissions from roster rows.
+
+    Usernames and emails are checked against the database with set-based
+    queries, passwords are validated and hashed in a process pool and rows
+    are written with bulk_create in chunks, each in its own transaction.
+    Invalid rows are skipped and reported.
+
+    Args:
+        rows (list[dict]): Rows with username, email, password, account and permission.
+        workers (int, optional): Hashing processes, defaults to PROVISIONING_WORKERS (0 uses every core).
+        chunk_size (int, optional): Rows per chunk, defaults to PROVISIONING_CHUNK_SIZE.
+        progress (Callable[[int, int], None], optional): Called with rows processed and the row count.
+
+    Returns:
+        dict: Created user and account counts and the row errors.
+    """
+    workers = settings.PROVISIONING_WORKERS if workers is None else workers
+    chunk_size = chunk_size or settings.PROVISIONING_CHUNK_SIZE
+    errors = []
+    valid = []
+    seen_usernames = set()
+    seen_emails = set()
+    for index, row in enumerate(rows, start=1):
+        try:
+            row = clean_row(row)
+        except ValidationError as e:
+            errors.append({'row': index, 'username': row.get('username'), 'error': ' '.join(e.messages)})
+            continue
+        if row['username'] in seen_usernames:
+            errors.append({'row': index, 'username': row['username'], 'error': 'Duplicate username in roster.'})
+            continue
+        if row['email'] and row['email'] in seen_emails:
+            errors.append({'row': index, 'username': row['username'], 'error': 'Duplicate email in roster.'})
+            continue
+        seen_usernames.add(row['username'])
+        if row['email']:
+            seen_emails.add(row['email'])
+        valid.append((index, row))
+
+    taken_usernames = existing_values('username', seen_usernames)
+    taken_emails = existing_values('email', seen_emails)
+    pending = []
+    for index, row in valid:
+        if row['username'] in taken_usernames:
+            errors.append({'row': index, 'username': row['username'], 'error': 'This username is already in use.'})
+        elif row['email'] in taken_emails:
+            errors.append({'row': index, 'username': row['username'], 'error': 'This email address is already registered.'})
+        else:
+            pending.append((index, row))
+
+    accounts, existing_accounts, created_accounts = resolve_accounts(
+        sorted({row['account'] for _, row in pending if row['account']})
+    )
+    chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+    created_users = 0
+    processed = len(rows) - len(pending)
+    for chunk, hashes in zip(chunks, hashed_chunks(chunks, workers)):
+        created, chunk_errors = write_chunk(chunk, hashes, accounts)
+        created_users += created
+        errors.extend(chunk_errors)
+        processed += len(chunk)
+        if progress:
+            progress(processed, len(rows))
+
+    if existing_accounts and created_users:
+        Account.objects.filter(pk__in=existing_accounts).update(version=F('version') + 1, modified_at=timezone.now())
+    errors.sort(key=lambda error: error['row'])
+    return {'created_users': created_users, 'created_accounts': created_accounts, 'errors': errors}
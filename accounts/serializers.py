@@ -3,7 +3,12 @@ from django.contrib.auth.models import User
 from accounts.models import Account,Investor, AccountPermissions
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import add_user_claims, tokens_for_user
+from .fieldsets import SparseFieldsetMixin
 
 class LoginSerializer(serializers.ModelSerializer):
     """
@@ -52,11 +57,38 @@ class LoginSerializer(serializers.ModelSerializer):
         Returns:
             dict[str, str]: A dictionary containing the refresh and access tokens.
         """
-        refresh = RefreshToken.for_user(user)
-        return {
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        }
+        return tokens_for_user(user)
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Token pair serializer embedding the user claims used by stateless authentication.
+    """
+    def validate(self, attrs):
+        """
+        Add the user claims to the access token only.
+        """
+        data = super().validate(attrs)
+        data['access'] = str(add_user_claims(AccessToken(data['access']), self.user))
+        return data
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh serializer reloading the user, so refreshed access tokens
+    carry current claims and inactive or deleted users cannot refresh.
+    """
+    def validate(self, attrs):
+        """
+        Check the user of the refresh token before issuing an access token
+        with claims read from the user row.
+        """
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[jwt_settings.USER_ID_CLAIM]).first()
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed('No active account found for this token', code='no_active_account')
+        data = super().validate(attrs)
+        data['access'] = str(add_user_claims(AccessToken(data['access']), user))
+        return data
+
 class RegisterSerializer(serializers.ModelSerializer):
     """
     Serializer for User Registration.
@@ -135,7 +167,28 @@ class UserSerializer(serializers.ModelSerializer):
     model = Investor
     fields = ['id', 'username', 'email']
         
-class AccountSerializer(serializers.ModelSerializer):
+class MemberSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the users of an account when expanded.
+    """
+    class Meta:
+        """
+        Metaclass for the member fields.
+        """
+        model = User
+        fields = ['id', 'username']
+
+class AccountSummarySerializer(serializers.Serializer):
+    """
+    Serializer for the overview figures annotated on accounts by annotate_summary.
+    """
+    member_count = serializers.IntegerField()
+    permission = serializers.CharField(source='permission_level', allow_null=True)
+    holdings_count = serializers.IntegerField()
+    market_value = serializers.DecimalField(max_digits=20, decimal_places=2)
+    last_transaction_date = serializers.DateTimeField(allow_null=True)
+
+class AccountSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Account model.
     """
@@ -147,6 +200,10 @@ class AccountSerializer(serializers.ModelSerializer):
         """
         model = Account
         fields = ['id', 'name', 'description', 'users']
+        expandable_fields = {
+            'users': (MemberSerializer, {'many': True}),
+            'summary': (AccountSummarySerializer, {'source': '*'}),
+        }
         
         def validate_name(self, value):
             """
@@ -190,6 +247,14 @@ class AccountPermissionsSerializer(serializers.ModelSerializer):
         data['account'] = account
         return data 
     
+class PermissionEntrySerializer(serializers.Serializer):
+    """
+    Serializer for one (user, account, permission) entry of a bulk permission change.
+    """
+    user = serializers.CharField()
+    account = serializers.CharField()
+    permission = serializers.ChoiceField(choices=AccountPermissions.PERMISSION_CHOICES, allow_null=True)
+
 class AccountPermissionsUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for updating only the permission field of Account Permissions.
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from .authentication import clear_user_cache
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Drop the user from this process's user cache.
+    """
+    clear_user_cache(instance.pk)
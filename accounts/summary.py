@@ -0,0 +1,49 @@
+from decimal import Decimal
+from django.db.models import (
+    Count, DecimalField, F, IntegerField, Max, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce
+from transactions.models import SimulatedInvestment, Transaction
+from .models import Account, AccountPermissions
+
+def per_account(queryset, aggregate, output_field):
+    """
+    Correlated subquery computing one aggregate over the outer account's rows.
+    """
+    return Subquery(
+        queryset.filter(account_id=OuterRef('pk'))
+        .order_by()
+        .values('account_id')
+        .annotate(value=aggregate)
+        .values('value'),
+        output_field=output_field,
+    )
+
+def annotate_summary(queryset, user):
+    """
+    Annotate accounts with their overview figures in the same statement.
+
+    Adds member_count, permission_level (the user's), holdings_count,
+    market_value (in FX_BASE_CURRENCY) and last_transaction_date.
+    """
+    value_field = DecimalField(max_digits=20, decimal_places=2)
+    return queryset.annotate(
+        member_count=Coalesce(
+            per_account(Account.users.through.objects, Count('user_id'), IntegerField()), 0
+        ),
+        permission_level=Subquery(
+            AccountPermissions.objects.filter(account_id=OuterRef('pk'), user_id=user.pk)
+            .values('permission')[:1]
+        ),
+        holdings_count=Coalesce(
+            per_account(SimulatedInvestment.objects, Count('id'), IntegerField()), 0
+        ),
+        market_value=Coalesce(
+            per_account(SimulatedInvestment.objects, Sum(F('units') * F('price_per_unit')), value_field),
+            Value(Decimal('0')),
+            output_field=value_field,
+        ),
+        last_transaction_date=per_account(
+            Transaction.objects, Max('transaction_date'), Transaction._meta.get_field('transaction_date')
+        ),
+    )
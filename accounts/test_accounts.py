@@ -3,10 +3,26 @@ from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import AccountPermissions, Account
+from .permissions import get_access
+from .provisioning import provision
+from .authentication import USER_CLAIMS, StatelessJWTAuthentication, clear_user_cache, full_user
+from InvestmentManagerAPI.middleware import jwt_user
+from rest_framework.test import APIRequestFactory
+from django.core.cache import cache
+from django.db.models import F
 from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
 from django.utils import timezone
 import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from datetime import timedelta
+from decimal import Decimal
+from transactions.models import SimulatedInvestment, Transaction
 
 transaction_date = timezone.now()
 
@@ -205,3 +221,401 @@ class PermissionTests(APITestCase):
 
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class AccessResolverTests(APITestCase):
+    """
+    Test the cached account permission resolver.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        self.permission = AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.VIEW_ONLY
+        )
+
+    def test_access_is_loaded_once(self):
+        """
+        Test that a cached access only costs the account read.
+        """
+        with self.assertNumQueries(2):
+            access = get_access(self.user, self.account.pk)
+        self.assertTrue(access.is_member)
+        self.assertEqual(access.permission, AccountPermissions.VIEW_ONLY)
+        with self.assertNumQueries(1):
+            access = get_access(self.user, self.account.pk)
+        self.assertEqual(access.permission, AccountPermissions.VIEW_ONLY)
+        with self.assertNumQueries(0):
+            self.assertEqual(access.account.pk, self.account.pk)
+
+    def test_version_change_retires_cached_access(self):
+        """
+        Test that a change seen only through the account version, as made by
+        another process, is not hidden by the cache.
+        """
+        get_access(self.user, self.account.pk)
+        AccountPermissions.objects.filter(pk=self.permission.pk).update(permission=AccountPermissions.FULL_ACCESS)
+        self.assertEqual(get_access(self.user, self.account.pk).permission, AccountPermissions.VIEW_ONLY)
+        Account.objects.filter(pk=self.account.pk).update(version=F('version') + 1)
+        self.assertEqual(get_access(self.user, self.account.pk).permission, AccountPermissions.FULL_ACCESS)
+
+    def test_cleared_accounts_lose_access(self):
+        """
+        Test that clearing a user's accounts from the user side drops the cached membership.
+        """
+        self.assertTrue(get_access(self.user, self.account.pk).is_member)
+        self.user.investor_accounts.clear()
+        self.assertFalse(get_access(self.user, self.account.pk).is_member)
+
+    def test_viewset_update_invalidates_access(self):
+        """
+        Test that updating a permission through the API drops the cached access.
+        """
+        get_access(self.user, self.account.pk)
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('account-permissions-detail', kwargs={'pk': self.permission.pk})
+        response = self.client.put(url, {'permission': AccountPermissions.FULL_ACCESS})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_access(self.user, self.account.pk).permission, AccountPermissions.FULL_ACCESS)
+
+    def test_removed_member_loses_access(self):
+        """
+        Test that removing a user from an account drops the cached membership.
+        """
+        self.assertTrue(get_access(self.user, self.account.pk).is_member)
+        self.account.users.remove(self.user)
+        self.assertFalse(get_access(self.user, self.account.pk).is_member)
+
+class StatelessAuthenticationTests(APITestCase):
+    """
+    Test authentication from token claims without a user query.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword', email='test@example.com')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'username': 'testuser', 'password': 'testpassword'
+        })
+        self.token = response.data['access']
+        self.refresh = response.data['refresh']
+        self.authentication = StatelessJWTAuthentication()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Bearer ' + token)
+        return self.authentication.authenticate(request)[0]
+
+    def test_user_built_from_claims(self):
+        """
+        Test that the user comes from the token claims and can be used in queries.
+        """
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, 'testuser')
+        self.assertFalse(user.is_staff)
+        self.assertEqual(list(Account.objects.filter(users=user)), [self.account])
+        self.assertEqual(full_user(user).email, 'test@example.com')
+
+    def test_token_without_claims_uses_user_cache(self):
+        """
+        Test that tokens issued without claims load the user once per process.
+        """
+        token = str(RefreshToken.for_user(self.user).access_token)
+        clear_user_cache()
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+            self.authenticate(token)
+
+    def test_refresh_token_carries_no_claims(self):
+        """
+        Test that the claims are only added to access tokens.
+        """
+        refresh = RefreshToken(self.refresh)
+        self.assertFalse(any(claim in refresh for claim in USER_CLAIMS))
+        self.assertEqual(self.authenticate(self.token).username, 'testuser')
+
+    def test_refresh_reloads_user_claims(self):
+        """
+        Test that a refreshed access token carries the current user fields.
+        """
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.authenticate(response.data['access']).is_staff)
+
+    def test_inactive_user_cannot_refresh(self):
+        """
+        Test that deactivating a user stops their refresh token from issuing access tokens.
+        """
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_middleware_user_follows_stateless_setting(self):
+        """
+        Test that the middleware reads bearer tokens like the configured authentication.
+        """
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Bearer ' + self.token)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        with self.settings(JWT_STATELESS=False):
+            self.assertTrue(jwt_user(request).is_staff)
+        with self.settings(JWT_STATELESS=True), self.assertNumQueries(0):
+            self.assertFalse(jwt_user(request).is_staff)
+
+class AccountFieldsetTests(APITestCase):
+    """
+    Test sparse fieldsets and expansion on the account list.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        for index in range(3):
+            account = Account.objects.create(name=f'Account {index}')
+            account.users.add(self.user)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('account-list')
+
+    def test_users_are_prefetched(self):
+        """
+        Test that member usernames are loaded with one query for every account.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data[0]['users'], ['testuser'])
+
+    def test_fields_and_expand(self):
+        """
+        Test that ?fields= prunes the output and ?expand= nests the members.
+        """
+        response = self.client.get(self.url, {'fields': 'name'})
+        self.assertEqual(set(response.data[0]), {'name'})
+
+        response = self.client.get(self.url, {'fields': 'id,users', 'expand': 'users'})
+        self.assertEqual(response.data[0]['users'], [{'id': self.user.pk, 'username': 'testuser'}])
+
+class ProvisioningTests(APITestCase):
+    """
+    Test bulk provisioning of users, accounts and permissions from a roster.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='adminpassword')
+        User.objects.create_user(username='taken', email='taken@example.com', password='testpassword')
+        self.existing = Account.objects.create(name='Existing Account')
+        self.roster = (
+            'username,email,password,account,permission\n'
+            'alice,alice@example.com,Str0ng-pass-1,Partner Fund,full\n'
+            'bob,bob@example.com,Str0ng-pass-2,Partner Fund,\n'
+            'carol,carol@example.com,Str0ng-pass-3,Existing Account,view\n'
+            'taken,new@example.com,Str0ng-pass-4,Partner Fund,view\n'
+            'dave,taken@example.com,Str0ng-pass-5,Partner Fund,view\n'
+            'erin,erin@example.com,123,Partner Fund,view\n'
+            'alice,other@example.com,Str0ng-pass-6,,view\n'
+        )
+
+    def test_endpoint_provisions_valid_rows(self):
+        """
+        Test that valid rows are created with memberships and the rest are reported.
+        """
+        self.client.force_authenticate(user=self.admin)
+        upload = SimpleUploadedFile('roster.csv', self.roster.encode(), content_type='text/csv')
+        response = self.client.post(reverse('provision'), {'roster': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created_users'], 3)
+        self.assertEqual(response.data['created_accounts'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5, 6, 7])
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('Str0ng-pass-1'))
+        fund = Account.objects.get(name='Partner Fund')
+        self.assertEqual(set(fund.users.values_list('username', flat=True)), {'alice', 'bob'})
+        self.assertEqual(get_access(alice, fund.pk).permission, AccountPermissions.FULL_ACCESS)
+        self.assertEqual(
+            AccountPermissions.objects.get(user__username='bob').permission, AccountPermissions.VIEW_ONLY
+        )
+        self.assertTrue(self.existing.users.filter(username='carol').exists())
+        self.assertGreater(Account.objects.get(pk=self.existing.pk).version, self.existing.version)
+
+    def test_non_string_fields_are_row_errors(self):
+        """
+        Test that NDJSON rows with non-string fields are reported instead of failing the upload.
+        """
+        self.client.force_authenticate(user=self.admin)
+        roster = '\n'.join(json.dumps(row) for row in (
+            {'username': 123, 'password': 'Str0ng-pass-1'},
+            {'username': 'frank', 'password': ['Str0ng-pass-2']},
+            {'username': 'grace', 'password': 'Str0ng-pass-3', 'permission': None},
+        ))
+        upload = SimpleUploadedFile('roster.ndjson', roster.encode(), content_type='application/x-ndjson')
+        with patch('accounts.views.provision', wraps=provision) as provision_mock:
+            response = self.client.post(reverse('provision'), {'roster': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created_users'], 1)
+        self.assertEqual(
+            [(error['row'], error['error']) for error in response.data['errors']],
+            [(1, "'username' must be a string."), (2, "'password' must be a string.")],
+        )
+        self.assertEqual(provision_mock.call_args.kwargs['workers'], 1)
+
+    def test_endpoint_requires_admin(self):
+        """
+        Test that only admins can provision users.
+        """
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=user)
+        upload = SimpleUploadedFile('roster.csv', self.roster.encode(), content_type='text/csv')
+        response = self.client.post(reverse('provision'), {'roster': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command_hashes_in_process_pool(self):
+        """
+        Test the command with an NDJSON roster and several hashing processes.
+        """
+        rows = [
+            {'username': f'member{index}', 'password': f'Str0ng-pass-{index}', 'account': 'Pool Account'}
+            for index in range(4)
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as roster:
+            roster.write('\n'.join(json.dumps(row) for row in rows))
+        out = StringIO()
+        try:
+            call_command('provision_users', roster.name, '--workers', '2', '--chunk-size', '2', stdout=out)
+        finally:
+            os.remove(roster.name)
+
+        self.assertIn('Created 4 users and 1 accounts, 0 rows skipped.', out.getvalue())
+        self.assertIn('4/4 rows processed', out.getvalue())
+        self.assertTrue(User.objects.get(username='member3').check_password('Str0ng-pass-3'))
+        self.assertEqual(Account.objects.get(name='Pool Account').users.count(), 4)
+
+class BulkPermissionTests(APITestCase):
+    """
+    Test granting, changing and revoking permissions in bulk.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpassword')
+        self.users = [User.objects.create_user(username=f'member{index}', password='testpassword') for index in range(3)]
+        self.accounts = [Account.objects.create(name=f'Fund {index}') for index in range(2)]
+        for account in self.accounts:
+            account.users.add(*self.users)
+        AccountPermissions.objects.create(user=self.users[0], account=self.accounts[0], permission=AccountPermissions.VIEW_ONLY)
+        AccountPermissions.objects.create(user=self.users[1], account=self.accounts[0], permission=AccountPermissions.VIEW_ONLY)
+        AccountPermissions.objects.create(user=self.users[2], account=self.accounts[0], permission=AccountPermissions.FULL_ACCESS)
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('account-permissions-bulk')
+
+    def test_matrix_is_applied_with_diff(self):
+        """
+        Test that a matrix upserts, revokes and reports a diff with a fixed number of queries.
+        """
+        self.assertEqual(get_access(self.users[1], self.accounts[0].pk).permission, AccountPermissions.VIEW_ONLY)
+        matrix = [
+            {'user': 'member0', 'account': 'Fund 0', 'permission': 'view'},
+            {'user': 'member1', 'account': 'Fund 0', 'permission': 'full'},
+            {'user': 'member2', 'account': 'Fund 0', 'permission': None},
+            {'user': 'member0', 'account': 'Fund 1', 'permission': 'post'},
+            {'user': 'member1', 'account': 'Fund 1', 'permission': 'view'},
+        ]
+        # Revoking loads the rows for the delete signals, each bumping its account
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, {'permissions': matrix}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ('created', 'updated', 'revoked', 'unchanged')},
+            {'created': 2, 'updated': 1, 'revoked': 1, 'unchanged': 1},
+        )
+        self.assertIn(
+            {'user': 'member1', 'account': 'Fund 0', 'previous': 'view', 'permission': 'full'},
+            response.data['changes'],
+        )
+        self.assertEqual(
+            set(AccountPermissions.objects.values_list('user__username', 'account__name', 'permission')),
+            {('member0', 'Fund 0', 'view'), ('member1', 'Fund 0', 'full'),
+             ('member0', 'Fund 1', 'post'), ('member1', 'Fund 1', 'view')},
+        )
+        self.assertEqual(get_access(self.users[1], self.accounts[0].pk).permission, AccountPermissions.FULL_ACCESS)
+        self.assertGreater(Account.objects.get(pk=self.accounts[1].pk).version, self.accounts[1].version)
+
+    def test_body_must_be_an_object(self):
+        """
+        Test that a bare list body is rejected.
+        """
+        response = self.client.post(self.url, [{'user': 'member0', 'account': 'Fund 0', 'permission': 'full'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_names_change_nothing(self):
+        """
+        Test that an unknown user rejects the whole matrix.
+        """
+        matrix = [
+            {'user': 'member0', 'account': 'Fund 0', 'permission': 'full'},
+            {'user': 'nobody', 'account': 'Fund 0', 'permission': 'full'},
+        ]
+        response = self.client.post(self.url, {'permissions': matrix}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], [{'entry': 1, 'error': "User 'nobody' does not exist."}])
+        self.assertEqual(AccountPermissions.objects.get(user=self.users[0]).permission, AccountPermissions.VIEW_ONLY)
+
+class AccountSummaryTests(APITestCase):
+    """
+    Test the account overview figures requested with ?expand=summary.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        other = User.objects.create_user(username='otheruser', password='testpassword')
+        self.account = Account.objects.create(name='Fund')
+        self.account.users.add(self.user, other)
+        self.empty = Account.objects.create(name='Empty Fund')
+        self.empty.users.add(self.user)
+        AccountPermissions.objects.create(user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS)
+        investments = SimulatedInvestment.objects.bulk_create([
+            SimulatedInvestment(account=self.account, name=symbol, symbol=symbol, price_per_unit=Decimal('10.00'),
+                                units=Decimal(units), transaction_type='buy')
+            for symbol, units in (('AAPL', '2.00'), ('MSFT', '3.50'))
+        ])
+        for days in (3, 1):
+            Transaction.objects.create(user=self.user, account=self.account, investment=investments[0],
+                                       amount=Decimal('20.00'), transaction_date=transaction_date - timedelta(days=days))
+        self.client.force_authenticate(user=self.user)
+
+    def test_summary_in_one_query(self):
+        """
+        Test that member, permission, holdings, value and activity figures come from one query.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('account-list'), {'fields': 'id,name,summary', 'expand': 'summary'})
+
+        summaries = {account['name']: account['summary'] for account in response.data}
+        self.assertEqual(summaries['Fund']['member_count'], 2)
+        self.assertEqual(summaries['Fund']['permission'], AccountPermissions.FULL_ACCESS)
+        self.assertEqual(summaries['Fund']['holdings_count'], 2)
+        self.assertEqual(summaries['Fund']['market_value'], '55.00')
+        self.assertEqual(
+            summaries['Fund']['last_transaction_date'],
+            (transaction_date - timedelta(days=1)).isoformat().replace('+00:00', 'Z'),
+        )
+        self.assertEqual(
+            summaries['Empty Fund'],
+            {'member_count': 1, 'permission': None, 'holdings_count': 0,
+             'market_value': '0.00', 'last_transaction_date': None},
+        )
+
+    def test_summary_is_opt_in(self):
+        """
+        Test that the plain account list has no summary.
+        """
+        response = self.client.get(reverse('account-list'))
+        self.assertNotIn('summary', response.data[0])
@@ -3,7 +3,8 @@ from .views import (
     LoginView, 
     AccountViewSet, 
     SelectAccountViewSet,
-    AccountPermissionsViewSet
+    AccountPermissionsViewSet,
+    ProvisionView
     )
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
@@ -16,5 +17,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('provision/', ProvisionView.as_view(), name='provision'),
     path('select-account/<int:pk>/', SelectAccountViewSet.as_view({'put': 'update'}), name='select-account'),
 ]
@@ -1,12 +1,21 @@
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import generics, viewsets
-from rest_framework.permissions import IsAuthenticated,AllowAny
+from rest_framework.decorators import action
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated,AllowAny,IsAdminUser
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth.models import User
 from accounts.models import Account, AccountPermissions
+from .authentication import full_user, tokens_for_user
+from .fieldsets import prune_queryset, query_list
+from .permissions import apply_permission_matrix
+from .provisioning import ROSTER_FORMATS, provision, read_uploaded_roster
+from .summary import annotate_summary
 from .serializers import *
+from InvestmentManagerAPI.query_budget import QueryBudget
+from transactions.conditional import bump_account_version
 
 # Create your views here.
 class RegisterView(generics.CreateAPIView):
@@ -26,11 +35,11 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
+        tokens = tokens_for_user(user)
 
         return Response({
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
+            'refresh': tokens['refresh'],
+            'access': tokens['access'],
             'message': 'User registered successfully.'
         }, status=status.HTTP_201_CREATED)
 
@@ -61,18 +70,21 @@ class AccountViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing Account instances.
     """
+    query_budgets = {'list': QueryBudget(3)}
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """
         This view should return a list of all the accounts
-        for the currently authenticated user.
+        for the currently authenticated user, pruned to the requested fields.
+        With ?expand=summary the overview figures are annotated in the same query.
         """
         user = self.request.user
-        if user.is_staff:
-            return Account.objects.all()
-        return Account.objects.filter(users=user)
+        queryset = Account.objects.all() if user.is_staff else Account.objects.filter(users=user)
+        if 'summary' in (query_list(self.request, 'expand') or ()):
+            queryset = annotate_summary(queryset, user)
+        return prune_queryset(queryset, self.get_serializer_class(), self.request)
    
     def perform_create(self, serializer):
         """
@@ -87,6 +99,7 @@ class AccountPermissionsViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing Account permissions.
     """
+    query_budgets = {'list': QueryBudget(4)}
     serializer_class = AccountPermissionsSerializer
     permission_classes = [IsAuthenticated]
     
@@ -118,10 +131,14 @@ class AccountPermissionsViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         """
         Allow only admin users to update permissions.
+        Cached access to the previous account is dropped when the permission moves.
         """
         if not self.request.user.is_staff:
             raise PermissionDenied("You do not have permission to update permissions.")
+        previous_account_id = serializer.instance.account_id
         serializer.save()
+        if serializer.instance.account_id != previous_account_id:
+            bump_account_version(previous_account_id)
 
     def perform_destroy(self, instance):
         """
@@ -159,6 +176,26 @@ class AccountPermissionsViewSet(viewsets.ModelViewSet):
         super().destroy(request, *args, **kwargs)
         return Response({'detail': 'Permission deleted successfully.'}, status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply a list of (user, account, permission) entries in one request.
+
+        A null permission revokes it. Returns the created, updated, revoked
+        and unchanged counts with the list of changes.
+        """
+        if not self.request.user.is_staff:
+            return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Send an object with a "permissions" list.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = PermissionEntrySerializer(data=request.data.get('permissions'), many=True)
+        serializer.is_valid(raise_exception=True)
+
+        summary, errors = apply_permission_matrix(serializer.validated_data)
+        if errors:
+            return Response({'error': 'No permissions were changed.', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_200_OK)
+
 class SelectAccountViewSet(viewsets.ViewSet):
     """
     A viewset for selecting the current account for the user.
@@ -174,11 +211,41 @@ class SelectAccountViewSet(viewsets.ViewSet):
             if not account:
                 raise Account.DoesNotExist
             
-            request.user.current_account = account
-            request.user.save()
+            user = full_user(request.user)
+            user.current_account = account
+            user.save()
 
             return Response({'status': 'account set'}, status=status.HTTP_200_OK)
 
         except Account.DoesNotExist:
             return Response({'error': 'Account not found or not accessible'}, 
                             status=status.HTTP_404_NOT_FOUND)     
+
+class ProvisionView(APIView):
+    """
+    Admin endpoint creating users, accounts and permissions from an uploaded roster.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """
+        Provision the CSV or NDJSON roster uploaded as `roster`.
+
+        The format follows the file extension unless `format` is given.
+        Large rosters are better run with the provision_users command, which
+        hashes passwords in PROVISIONING_WORKERS processes.
+        """
+        upload = request.FILES.get('roster')
+        if upload is None:
+            return Response({'error': 'Upload the roster as the "roster" file.'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format')
+        if fmt and fmt not in ROSTER_FORMATS:
+            return Response({'error': f"Unsupported roster format '{fmt}'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = read_uploaded_roster(upload, fmt)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Hash in this process; a pool per request would fork every web worker
+        return Response(provision(rows, workers=1), status=status.HTTP_201_CREATED)
@@ -1,21 +1,46 @@
+from decimal import Decimal
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch, Value
 from accounts.models import AccountPermissions
-from .models import SimulatedInvestment, Transaction
-from django.utils.html import format_html
+from InvestmentManagerAPI.paginators import LargeTableAdminMixin
+from InvestmentManagerAPI.query_budget import QueryBudget
+from .models import FxRate, RequestCapture, SimulatedInvestment, Transaction
+from .fx import rate
+from .revaluation import revalue_holdings
+from django.conf import settings
+from django.contrib import messages
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from InvestmentManagerAPI.sampler import top_frames
 
-class SimulatedInvestmentAdmin(admin.ModelAdmin):
+class SimulatedInvestmentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Admin interface for managing simulated investments in KES.
     """
+    query_budgets = {'changelist': QueryBudget(6)}
     list_display = ('users_list', 'account', 'name', 'symbol', 'price_per_unit', 'units', 'total_value_kes', 'transaction_date') 
     list_filter = (('transaction_date', admin.DateFieldListFilter),)
+    list_select_related = ('account',)
     search_fields = ('account__users__username', 'account__name', 'name')
+    actions = ('revalue',)
 
     def get_queryset(self, request):
         """
         Filter and display investments related to accounts accessible to the user.
+
+        Account members are prefetched and the KES value is computed by the database.
         """
-        qs = super().get_queryset(request)
+        kes_rate = Decimal(str(rate(settings.FX_BASE_CURRENCY, 'KES')))
+        qs = super().get_queryset(request).prefetch_related(
+            Prefetch('account__users', queryset=User.objects.only('id', 'username'))
+        ).annotate(
+            total_value_kes=ExpressionWrapper(
+                F('price_per_unit') * F('units') * Value(kes_rate),
+                output_field=DecimalField(max_digits=24, decimal_places=2),
+            )
+        )
         if request.user.is_superuser:
             return qs
         account_ids = AccountPermissions.objects.filter(user=request.user).values_list('account_id', flat=True)
@@ -23,31 +48,141 @@ class SimulatedInvestmentAdmin(admin.ModelAdmin):
 
     def total_value_kes(self, obj):
         """
-        Calculate the total value of the current investment in Kenyan Shillings (KES).
+        Total value of the current investment in Kenyan Shillings (KES).
         """
-        total_value = obj.price_per_unit * obj.units
-        kes_value = total_value * 140  
-        return format_html(f"KES {kes_value:,.2f}")
+        return format_html("KES {}", f"{obj.total_value_kes:,.2f}")
 
     total_value_kes.short_description = 'Total Value (KES)'
+    total_value_kes.admin_order_field = 'total_value_kes'
 
     def users_list(self, obj):
         """
         List all users associated with the account.
         """
-        users = obj.account.users.all()
-        user_names = ", ".join([user.username for user in users])
-        return format_html(user_names)
+        return format_html_join(", ", "{}", ((user.username,) for user in obj.account.users.all()))
 
     users_list.short_description = "Users"
+
+    @admin.action(description='Revalue selected investments at market prices')
+    def revalue(self, request, queryset):
+        """
+        Reprice the selected investments with one market data call per symbol.
+        """
+        result = revalue_holdings(SimulatedInvestment.objects.filter(pk__in=queryset.values('pk')))
+        self.message_user(
+            request,
+            f"Revalued {result['updated']} investments across {result['symbols']} symbols.",
+        )
+        for symbol, error in result['errors'].items():
+            self.message_user(request, f"{symbol}: {error}", level=messages.WARNING)
     
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Admin interface for displaying transactions.
     """
+    query_budgets = {'changelist': QueryBudget(5)}
     list_display = ('user', 'account', 'investment', 'amount', 'transaction_type', 'transaction_date')
+    list_select_related = ('user', 'account', 'investment')
     list_filter = ('transaction_type', 'transaction_date')
     search_fields = ('investment__symbol', 'user__username')
 
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    """
+    Admin interface for displaying stored FX rates.
+    """
+    list_display = ('base', 'quote', 'rate', 'as_of', 'source')
+    list_filter = ('base', 'quote', 'source')
+
+@admin.register(RequestCapture)
+class RequestCaptureAdmin(admin.ModelAdmin):
+    """
+    Admin interface for browsing captured requests, their SQL and sampled call stacks.
+    """
+    list_display = ('created_at', 'reason', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'samples', 'user')
+    list_filter = ('reason', 'method', 'route')
+    list_select_related = ('user',)
+    search_fields = ('path', 'route', 'user__username')
+    date_hierarchy = 'created_at'
+    fields = (
+        'created_at', 'reason', 'method', 'path', 'route', 'status_code', 'duration_ms', 'user',
+        'timings', 'samples', 'stacks_link', 'hot_frames', 'sql',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/stacks/', self.admin_site.admin_view(self.stacks_view),
+                name='transactions_requestcapture_stacks',
+            ),
+        ] + super().get_urls()
+
+    def stacks_view(self, request, pk):
+        """
+        Download the sampled stacks in the folded format, for flamegraph.pl or speedscope.
+        """
+        capture = self.get_object(request, str(pk))
+        if capture is None or not self.has_view_permission(request, capture):
+            raise Http404('No capture matches the given query.')
+        try:
+            stacks = open(capture.stacks_path, 'rb')
+        except (OSError, TypeError):
+            raise Http404('The capture has no sampled stacks.')
+        return FileResponse(stacks, as_attachment=True, filename=capture.stacks_file, content_type='text/plain')
+
+    def query_count(self, obj):
+        return len(obj.queries)
+
+    query_count.short_description = 'Queries'
+
+    def stacks_link(self, obj):
+        """
+        Link to the folded stacks file of the capture.
+        """
+        if not obj.stacks_file:
+            return '-'
+        url = reverse('admin:transactions_requestcapture_stacks', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.stacks_file)
+
+    stacks_link.short_description = 'Stacks'
+
+    def hot_frames(self, obj):
+        """
+        Frames with the most samples, with the samples spent in the frame itself.
+        """
+        if not obj.stacks_file:
+            return '-'
+        try:
+            with open(obj.stacks_path, encoding='utf-8') as file:
+                frames = top_frames(file.read())
+        except OSError:
+            return '-'
+        return format_html(
+            '<table><tr><th>Frame</th><th>Self</th><th>Total</th></tr>{}</table>',
+            format_html_join('', '<tr><td><code>{}</code></td><td>{}</td><td>{}</td></tr>', frames),
+        )
+
+    hot_frames.short_description = 'Hot frames'
+
+    def sql(self, obj):
+        """
+        The captured queries in order, with their duration.
+        """
+        if not obj.queries:
+            return '-'
+        return format_html(
+            '<ol>{}</ol>',
+            format_html_join('', '<li>{} ms <code>{}</code></li>', ((query['ms'], query['sql']) for query in obj.queries)),
+        )
+
+    sql.short_description = 'SQL'
+
 admin.site.register(SimulatedInvestment, SimulatedInvestmentAdmin)
@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from statistics import NormalDist
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .models import DailyPrice
+from .prices import price_matrix, price_signature
+from .simulation import max_drawdown, simple_returns
+from .valuation import load_holdings, to_decimal, value_holdings
+
+TRADING_DAYS = 252
+
+@dataclass(frozen=True)
+class UniverseStatistics:
+    """
+    Return matrix and moments for a symbol universe over a window.
+    """
+    symbols: tuple
+    dates: tuple
+    returns: np.ndarray
+    mean: np.ndarray
+    covariance: np.ndarray
+
+    @property
+    def correlation(self):
+        """
+        Correlation matrix derived from the covariance matrix.
+        """
+        deviation = np.sqrt(np.diag(self.covariance))
+        outer = np.outer(deviation, deviation)
+        return np.divide(
+            self.covariance, outer,
+            out=np.zeros_like(self.covariance), where=outer != 0
+        )
+
+def trading_dates(symbols, end, window):
+    """
+    Return the last window + 1 days with a stored close for any of the symbols.
+    """
+    dates = (
+        DailyPrice.objects.filter(symbol__in=symbols, date__lte=end)
+        .order_by('-date')
+        .values_list('date', flat=True)
+        .distinct()[:window + 1]
+    )
+    return tuple(reversed(list(dates)))
+
+@lru_cache(maxsize=64)
+def _universe_statistics(symbols, end, window, signature):
+    dates = trading_dates(symbols, end, window)
+    prices = np.nan_to_num(price_matrix(symbols, dates))
+    returns = simple_returns(prices) if len(dates) > 1 else np.zeros((0, len(symbols)))
+    returns.setflags(write=False)
+    if len(returns) > 1:
+        mean = returns.mean(axis=0)
+        covariance = np.atleast_2d(np.cov(returns, rowvar=False))
+    else:
+        mean = np.zeros(len(symbols))
+        covariance = np.zeros((len(symbols), len(symbols)))
+    return UniverseStatistics(symbols, dates, returns, mean, covariance)
+
+def universe_statistics(symbols, end=None, window=TRADING_DAYS):
+    """
+    Return cached statistics for a symbol universe, shared by every account
+    holding the same symbols over the same window until their prices change.
+    """
+    symbols, end = tuple(sorted(symbols)), end or timezone.localdate()
+    return _universe_statistics(symbols, end, window, price_signature(symbols, end))
+
+def historical_var(returns, confidence):
+    """
+    Loss not exceeded at the given confidence, as a fraction of value.
+    """
+    if not len(returns):
+        return 0.0
+    return float(max(-np.quantile(returns, 1 - confidence), 0.0))
+
+def parametric_var(mean, volatility, confidence):
+    """
+    Normal (variance-covariance) loss at the given confidence, as a fraction of value.
+    """
+    return float(max(NormalDist().inv_cdf(confidence) * volatility - mean, 0.0))
+
+def beta(returns, benchmark_returns):
+    """
+    Sensitivity of portfolio returns to benchmark returns.
+    """
+    if len(returns) < 2:
+        return None
+    variance = np.var(benchmark_returns, ddof=1)
+    if not variance:
+        return None
+    return float(np.cov(returns, benchmark_returns)[0, 1] / variance)
+
+def risk_metrics(statistics, weights, value, confidence=0.95, benchmark_returns=None):
+    """
+    Compute risk metrics for a weight vector aligned with the universe symbols.
+    """
+    portfolio_returns = statistics.returns @ weights
+    daily_volatility = float(np.sqrt(max(weights @ statistics.covariance @ weights, 0.0)))
+    daily_mean = float(statistics.mean @ weights)
+    return {
+        'observations': len(portfolio_returns),
+        'annualized_volatility': daily_volatility * np.sqrt(TRADING_DAYS),
+        'historical_var': historical_var(portfolio_returns, confidence) * value,
+        'parametric_var': parametric_var(daily_mean, daily_volatility, confidence) * value,
+        'max_drawdown': max_drawdown(portfolio_returns),
+        'beta': beta(portfolio_returns, benchmark_returns) if benchmark_returns is not None else None,
+    }
+
+def account_risk(account, window=TRADING_DAYS, confidence=0.95, benchmark=None):
+    """
+    Compute volatility, VaR, drawdown, beta and correlations for an account.
+    """
+    benchmark = benchmark or settings.BENCHMARK_SYMBOL
+    valuation = value_holdings(load_holdings(account_ids=[account.pk]))
+    holdings = valuation.holdings
+    symbol_values = np.bincount(
+        holdings.symbol_index, weights=valuation.market_value, minlength=len(holdings.symbols)
+    )
+    value = float(symbol_values.sum())
+    symbols = tuple(str(symbol) for symbol in holdings.symbols)
+
+    universe = tuple(sorted(set(symbols) | {benchmark}))
+    statistics = universe_statistics(universe, window=window)
+    column = {symbol: position for position, symbol in enumerate(statistics.symbols)}
+
+    weights = np.zeros(len(statistics.symbols))
+    if value:
+        for symbol, symbol_value in zip(symbols, symbol_values):
+            weights[column[symbol]] += symbol_value / value
+
+    benchmark_returns = None
+    if benchmark in column and len(statistics.returns):
+        benchmark_returns = statistics.returns[:, column[benchmark]]
+
+    metrics = risk_metrics(statistics, weights, value, confidence, benchmark_returns)
+    held = [column[symbol] for symbol in symbols]
+    correlation = statistics.correlation[np.ix_(held, held)]
+
+    return {
+        'account': account.name,
+        'as_of': statistics.dates[-1] if statistics.dates else None,
+        'window': window,
+        'confidence': confidence,
+        'benchmark': benchmark,
+        'market_value': to_decimal(value),
+        'observations': metrics['observations'],
+        'annualized_volatility': round(metrics['annualized_volatility'], 6),
+        'historical_var': to_decimal(metrics['historical_var']),
+        'parametric_var': to_decimal(metrics['parametric_var']),
+        'max_drawdown': round(metrics['max_drawdown'], 6),
+        'beta': round(metrics['beta'], 6) if metrics['beta'] is not None else None,
+        'symbols': list(symbols),
+        'correlation': np.round(correlation, 6).tolist(),
+    }
@@ -0,0 +1,209 @@
+from dataclasses import dataclass
+import numpy as np
+from .simulation import max_drawdown
+from .utils import apply_order
+
+TRADING_DAYS = 252
+
+@dataclass
+class Portfolio:
+    """
+    Cash and units held while replaying a strategy.
+    """
+    cash: float
+    units: np.ndarray
+    contributed: float
+    trades: int = 0
+    rejected_orders: int = 0
+
+    def deposit(self, amount):
+        """
+        Add new money to the portfolio.
+        """
+        self.cash += amount
+        self.contributed += amount
+
+    def value(self, prices):
+        """
+        Value of cash and units at the given prices.
+        """
+        return self.cash + float(self.units @ prices)
+
+def round_units(units):
+    """
+    Round units down to the two decimal places stored for live holdings.
+    """
+    return np.floor(np.asarray(units) * 100) / 100
+
+def execute(portfolio, symbol, transaction_type, units, price):
+    """
+    Apply an order with the same buy/sell rules as process_transaction.
+
+    Orders the live endpoint would reject, such as selling more units than
+    are held, are counted and skipped.
+    """
+    units = float(round_units(units))
+    if units <= 0 or price <= 0:
+        return
+    try:
+        portfolio.units[symbol] = apply_order(portfolio.units[symbol], transaction_type, units)
+    except ValueError:
+        portfolio.rejected_orders += 1
+        return
+    amount = units * price
+    portfolio.cash += -amount if transaction_type == 'buy' else amount
+    portfolio.trades += 1
+
+def target_weights(params, symbols):
+    """
+    Normalized weights from params, defaulting to equal weights.
+    """
+    weights = np.asarray(params.get('weights') or np.ones(symbols), dtype=np.float64)
+    if len(weights) != symbols or weights.sum() <= 0:
+        raise ValueError('Weights must have one positive entry per symbol')
+    return weights / weights.sum()
+
+def rebalance_to(portfolio, weights, prices):
+    """
+    Trade towards target weights, selling before buying.
+    """
+    target = round_units(np.divide(
+        portfolio.value(prices) * weights, prices,
+        out=np.zeros_like(weights), where=prices > 0
+    ))
+    difference = target - portfolio.units
+    for symbol in np.flatnonzero(difference < 0):
+        execute(portfolio, symbol, 'sell', -difference[symbol], prices[symbol])
+    for symbol in np.flatnonzero(difference > 0):
+        affordable = min(difference[symbol], portfolio.cash / prices[symbol])
+        execute(portfolio, symbol, 'buy', affordable, prices[symbol])
+
+def period(params, default):
+    """
+    Number of days between scheduled trades.
+    """
+    every = int(params.get('every', default))
+    if every < 1:
+        raise ValueError('The trading period must be at least one day')
+    return every
+
+def dollar_cost_averaging(portfolio, prices, params):
+    """
+    Invest the initial cash, then deposit and invest a fixed amount every period.
+    """
+    weights = target_weights(params, prices.shape[1])
+    amount = float(params.get('amount', 1000))
+    every = period(params, 21)
+    for day in range(len(prices)):
+        if day % every == 0:
+            if day:
+                portfolio.deposit(amount)
+            budget = portfolio.cash
+            for symbol in np.flatnonzero((weights > 0) & (prices[day] > 0)):
+                price = prices[day, symbol]
+                execute(portfolio, symbol, 'buy', budget * weights[symbol] / price, price)
+        yield day
+
+def periodic_rebalance(portfolio, prices, params):
+    """
+    Hold target weights, rebalancing every period.
+    """
+    weights = target_weights(params, prices.shape[1])
+    every = period(params, 63)
+    for day in range(len(prices)):
+        if day % every == 0:
+            rebalance_to(portfolio, weights, prices[day])
+        yield day
+
+def moving_average(prices, window):
+    """
+    Trailing moving average down each column, NaN until the window is full.
+    """
+    sums = np.cumsum(np.vstack([np.zeros(prices.shape[1]), prices]), axis=0)
+    averages = np.full(prices.shape, np.nan)
+    averages[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return averages
+
+def moving_average_crossover(portfolio, prices, params):
+    """
+    Hold a symbol while its short moving average is above the long one.
+
+    Each symbol trades an equal sleeve of the initial cash. Signals are
+    computed for every day and symbol up front.
+    """
+    short = int(params.get('short', 20))
+    long = int(params.get('long', 50))
+    if not 0 < short < long:
+        raise ValueError('Short window must be positive and shorter than the long window')
+    signal = moving_average(prices, short) > moving_average(prices, long)
+    changes = np.diff(signal.astype(np.int8), axis=0, prepend=0)
+    sleeves = np.full(prices.shape[1], portfolio.cash / prices.shape[1])
+
+    for day in range(len(prices)):
+        for symbol in np.flatnonzero(changes[day] < 0):
+            held = portfolio.units[symbol]
+            execute(portfolio, symbol, 'sell', held, prices[day, symbol])
+            sleeves[symbol] += held * prices[day, symbol]
+        for symbol in np.flatnonzero((changes[day] > 0) & (prices[day] > 0)):
+            units = round_units(sleeves[symbol] / prices[day, symbol])
+            execute(portfolio, symbol, 'buy', units, prices[day, symbol])
+            sleeves[symbol] -= units * prices[day, symbol]
+        yield day
+
+STRATEGIES = {
+    'dca': dollar_cost_averaging,
+    'rebalance': periodic_rebalance,
+    'ma_crossover': moving_average_crossover,
+}
+
+def run_backtest(strategy, prices, params=None, initial_cash=10000.0):
+    """
+    Replay a strategy over a (days x symbols) price matrix.
+
+    Strategies are generators that place orders day by day; positions are
+    recorded per day and valued against the price matrix in one step.
+    Returns are time-weighted, so deposits do not count as performance.
+
+    Returns:
+        dict: Summary metrics and the daily value series.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Use one of: {', '.join(STRATEGIES)}")
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 2 or len(prices) < 2:
+        raise ValueError('At least two days of prices are required')
+
+    params = params or {}
+    portfolio = Portfolio(
+        cash=float(initial_cash), units=np.zeros(prices.shape[1]), contributed=float(initial_cash)
+    )
+    positions = np.zeros_like(prices)
+    cash = np.zeros(len(prices))
+    contributed = np.zeros(len(prices))
+    for day in STRATEGIES[strategy](portfolio, prices, params):
+        positions[day] = portfolio.units
+        cash[day] = portfolio.cash
+        contributed[day] = portfolio.contributed
+
+    values = (positions * prices).sum(axis=1) + cash
+    flows = np.diff(contributed)
+    returns = np.divide(
+        values[1:] - flows, values[:-1],
+        out=np.ones(len(flows)), where=values[:-1] != 0
+    ) - 1
+    years = len(prices) / TRADING_DAYS
+    final_value = float(values[-1])
+    total_return = final_value / portfolio.contributed - 1 if portfolio.contributed else 0.0
+    return {
+        'strategy': strategy,
+        'params': params,
+        'final_value': final_value,
+        'contributed': portfolio.contributed,
+        'total_return': total_return,
+        'cagr': (1 + total_return) ** (1 / years) - 1 if total_return > -1 else -1.0,
+        'volatility': float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(returns) > 1 else 0.0,
+        'max_drawdown': max_drawdown(returns),
+        'trades': portfolio.trades,
+        'rejected_orders': portfolio.rejected_orders,
+        'values': values,
+    }
@@ -0,0 +1,294 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.authentication import tokens_for_user
+from accounts.models import Account, AccountPermissions
+from .models import SimulatedInvestment, Transaction
+
+PASSWORD = 'benchmark-password'
+SCENARIOS = ('login', 'simulate', 'transactions', 'transactions_filtered', 'admin_user', 'market_data')
+
+class MarketDataStub:
+    """
+    Local Alpha Vantage stand-in answering GLOBAL_QUOTE and TIME_SERIES_DAILY
+    from a price table, with an optional delay per call.
+
+    Used as a context manager; `url` is the endpoint to point
+    ALPHA_VANTAGE_BASE_URL at.
+    """
+    def __init__(self, prices, latency=0.0):
+        self.prices = prices
+        self.latency = latency
+        self.server = None
+        self.url = None
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                body = json.dumps(stub.respond(params.get('function'), params.get('symbol'))).encode()
+                if stub.latency:
+                    time.sleep(stub.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/query'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, function, symbol):
+        """
+        The Alpha Vantage payload of one call, empty for unknown symbols.
+        """
+        price = self.prices.get(symbol)
+        if price is None:
+            return {}
+        if function == 'TIME_SERIES_DAILY':
+            today = timezone.now().date()
+            return {'Time Series (Daily)': {
+                str(today - timedelta(days=day)): {'4. close': f'{price * (1 + 0.001 * (day % 7 - 3)):.4f}'}
+                for day in range(250)
+            }}
+        return {'Global Quote': {'05. price': f'{price:.4f}'}}
+
+def seed(users, accounts, transactions, symbols, rng):
+    """
+    Create benchmark users, accounts, holdings and transaction history with bulk inserts.
+
+    Every user gets full access to one account; holdings cover up to five
+    symbols per account and transactions are spread over two years.
+
+    Returns:
+        dict: The admin user, the users and the accounts with their members and holdings.
+    """
+    password = make_password(PASSWORD)
+    admin = User.objects.create_superuser('bench-admin', password=PASSWORD)
+    members = User.objects.bulk_create([
+        User(username=f'bench-user-{index}', password=password) for index in range(users)
+    ])
+    account_rows = Account.objects.bulk_create([
+        Account(name=f'Bench Account {index}') for index in range(accounts)
+    ])
+    by_account = {account.pk: [] for account in account_rows}
+    for index, user in enumerate(members):
+        by_account[account_rows[index % accounts].pk].append(user)
+
+    Account.users.through.objects.bulk_create([
+        Account.users.through(account_id=account_id, user_id=user.pk)
+        for account_id, account_users in by_account.items() for user in account_users
+    ])
+    AccountPermissions.objects.bulk_create([
+        AccountPermissions(user=user, account_id=account_id, permission=AccountPermissions.FULL_ACCESS)
+        for account_id, account_users in by_account.items() for user in account_users
+    ])
+
+    holdings = SimulatedInvestment.objects.bulk_create([
+        SimulatedInvestment(
+            account=account, name=symbol, symbol=symbol, units=Decimal(rng.randint(10, 500)),
+            price_per_unit=Decimal(str(price)).quantize(Decimal('0.01')), transaction_type='buy',
+        )
+        for account in account_rows
+        for symbol, price in rng.sample(sorted(symbols.items()), min(5, len(symbols)))
+    ])
+    by_holding_account = {}
+    for holding in holdings:
+        by_holding_account.setdefault(holding.account_id, []).append(holding)
+
+    now = timezone.now()
+    rows = []
+    for _ in range(transactions):
+        account = rng.choice(account_rows)
+        if not by_account[account.pk]:
+            continue
+        holding = rng.choice(by_holding_account[account.pk])
+        rows.append(Transaction(
+            user=rng.choice(by_account[account.pk]), account=account, investment=holding,
+            amount=Decimal(rng.randint(100, 20000)), executed_price=holding.price_per_unit,
+            transaction_type=rng.choice(('buy', 'sell')),
+            transaction_date=now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+        ))
+    Transaction.objects.bulk_create(rows, batch_size=1000)
+
+    return {
+        'admin': admin,
+        'accounts': [
+            {'account': account, 'members': by_account[account.pk], 'holdings': by_holding_account[account.pk]}
+            for account in account_rows if by_account[account.pk]
+        ],
+    }
+
+def build_requests(name, fixture, count, symbols, rng):
+    """
+    Plan the requests of one scenario as (method, path, data, user) tuples;
+    user is None for anonymous requests.
+    """
+    today = timezone.now().date()
+    requests = []
+    for index in range(count):
+        entry = rng.choice(fixture['accounts'])
+        account, user = entry['account'], rng.choice(entry['members'])
+        if name == 'login':
+            requests.append(('post', reverse('token_obtain_pair'), {'username': user.username, 'password': PASSWORD}, None))
+        elif name == 'simulate':
+            requests.append(('post', reverse('simulate-investment-transaction', kwargs={'account_pk': account.pk}), {
+                'transaction_type': 'buy' if index % 2 == 0 else 'sell',
+                'units': '1',
+                'symbol': rng.choice(entry['holdings']).symbol,
+            }, user))
+        elif name == 'transactions':
+            requests.append(('get', reverse('transactions-list', kwargs={'account_pk': account.pk}), None, user))
+        elif name == 'transactions_filtered':
+            start = today - timedelta(days=rng.randint(30, 700))
+            requests.append(('get', reverse('transactions-list', kwargs={'account_pk': account.pk}), {
+                'start_date': str(start), 'end_date': str(start + timedelta(days=90)),
+            }, user))
+        elif name == 'admin_user':
+            requests.append(('get', reverse('user-transactions-admin', kwargs={'username': user.username}), None, fixture['admin']))
+        elif name == 'market_data':
+            requests.append(('get', reverse('market-data', kwargs={'data_type': 'intraday'}), {
+                'symbol': rng.choice(sorted(symbols)),
+            }, user))
+    return requests
+
+def budget_requests(fixture):
+    """
+    One request per budgeted endpoint as (user, method, path, data) tuples,
+    covering the account, transaction, investment, analytics, market data,
+    async and admin endpoints.
+    """
+    entry = fixture['accounts'][0]
+    user, admin, holding = entry['members'][0], fixture['admin'], entry['holdings'][0]
+    account = {'account_pk': entry['account'].pk}
+    return [
+        (user, 'get', reverse('account-list'), {'expand': 'users,summary'}),
+        (user, 'get', reverse('account-permissions-list'), None),
+        (user, 'get', reverse('transactions-list', kwargs=account), {'expand': 'investment'}),
+        (user, 'get', reverse('transactions-list', kwargs=account), {'start_date': '2025-01-01'}),
+        (user, 'get', reverse('user-transactions', kwargs=account), None),
+        (admin, 'get', reverse('user-transactions-admin', kwargs={'username': user.username}), None),
+        (user, 'get', reverse('investment-list'), {'expand': 'account'}),
+        (admin, 'get', reverse('investment-list'), None),
+        (user, 'get', reverse('account-gains', kwargs=account), None),
+        (user, 'get', reverse('account-nav', kwargs=account), None),
+        (user, 'get', reverse('account-risk', kwargs=account), None),
+        (user, 'get', reverse('market-data', kwargs={'data_type': 'intraday'}), {'symbol': holding.symbol}),
+        (user, 'get', reverse('backtest-list'), None),
+        (user, 'get', reverse('async-transactions', kwargs=account), None),
+        (user, 'get', reverse('async-user-transactions', kwargs=account), None),
+        (user, 'get', reverse('async-investments'), None),
+        (user, 'get', reverse('async-market-data', kwargs={'data_type': 'intraday'}), {'symbol': holding.symbol}),
+        (user, 'post', reverse('simulate-investment-transaction', kwargs=account),
+         {'transaction_type': 'buy', 'units': '1', 'symbol': holding.symbol}),
+        (admin, 'get', reverse('admin:transactions_simulatedinvestment_changelist'), None),
+        (admin, 'get', reverse('admin:transactions_transaction_changelist'), None),
+        (admin, 'get', reverse('admin:accounts_account_changelist'), None),
+    ]
+
+def run_scenario(requests, concurrency):
+    """
+    Send planned requests from `concurrency` threads and summarise them.
+
+    Returns:
+        dict: Requests, errors, requests per second, p50/p95/p99 latency in
+        milliseconds and the mean number of queries per request.
+    """
+    tokens = {}
+    for _, _, _, user in requests:
+        if user is not None and user.pk not in tokens:
+            tokens[user.pk] = tokens_for_user(user)['access']
+    local = threading.local()
+
+    def send(request):
+        method, path, data, user = request
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = APIClient(raise_request_exception=False)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens[user.pk]}'} if user is not None else {}
+        with CaptureQueriesContext(connections['default']) as queries:
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(path, data, **headers)
+            else:
+                response = client.post(path, data, format='json', **headers)
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries), response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        results = list(pool.map(send, requests))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _, _ in results)
+    return {
+        'requests': len(results),
+        'errors': sum(status >= 400 for _, _, status in results),
+        'rps': round(len(results) / wall, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries_per_request': round(statistics.mean(count for _, count, _ in results), 2),
+    }
+
+def percentile(values, rank):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return values[max(int(len(values) * rank / 100 + 0.5) - 1, 0)]
+
+def compare(results, baseline, tolerance):
+    """
+    Compare scenario results with a baseline.
+
+    A scenario regresses when its p95 latency grows or its throughput drops
+    by more than `tolerance`, or when it runs more queries per request.
+
+    Returns:
+        dict: Per scenario ratios to the baseline and the regressions found.
+    """
+    comparison = {}
+    for name, result in results.items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        regressions = []
+        p95_ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else None
+        rps_ratio = result['rps'] / before['rps'] if before['rps'] else None
+        if p95_ratio is not None and p95_ratio > 1 + tolerance:
+            regressions.append('p95_ms')
+        if rps_ratio is not None and rps_ratio < 1 - tolerance:
+            regressions.append('rps')
+        if result['queries_per_request'] > before['queries_per_request']:
+            regressions.append('queries_per_request')
+        comparison[name] = {
+            'p95_ratio': round(p95_ratio, 3) if p95_ratio is not None else None,
+            'rps_ratio': round(rps_ratio, 3) if rps_ratio is not None else None,
+            'queries_delta': round(result['queries_per_request'] - before['queries_per_request'], 2),
+            'regressions': regressions,
+        }
+    return comparison
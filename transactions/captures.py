@@ -0,0 +1,57 @@
+import os
+import uuid
+from django.conf import settings
+from django.utils import timezone
+from InvestmentManagerAPI.profiling import route_of
+from InvestmentManagerAPI.sampler import folded
+from .models import RequestCapture
+
+def save_capture(request, response, reason, duration, profile=None, watch=None):
+    """
+    Store a captured request, writing its sampled stacks to PROFILE_DIR in
+    the folded format, and drop the oldest captures beyond PROFILE_MAX_CAPTURES.
+
+    Args:
+        reason (str): Why the request was captured, one of RequestCapture.REASON_CHOICES.
+        duration (float): Time the request took in seconds.
+        profile (RequestProfile, optional): Phase timings and recorded queries.
+        watch (Watch, optional): Stacks sampled while the request ran.
+    """
+    user = getattr(request, 'user', None)
+    capture = RequestCapture(
+        reason=reason,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        route=route_of(request)[:200],
+        status_code=response.status_code,
+        duration_ms=round(duration * 1000, 3),
+        user=user if user is not None and user.is_authenticated else None,
+    )
+    if profile is not None:
+        capture.timings = {
+            phase: round(seconds * 1000, 3) for phase, seconds in profile.durations.items() if profile.calls[phase]
+        }
+        capture.queries = [{'sql': sql, 'ms': round(seconds * 1000, 3)} for sql, seconds in profile.queries or ()]
+
+    if watch is not None and watch.samples:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        capture.stacks_file = f'{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.folded'
+        with open(capture.stacks_path, 'w', encoding='utf-8') as file:
+            file.write(folded(watch.stacks))
+        capture.samples = watch.samples
+    capture.save()
+
+    stale = RequestCapture.objects.values_list('pk', flat=True)[settings.PROFILE_MAX_CAPTURES:]
+    if stale:
+        RequestCapture.objects.filter(pk__in=list(stale)).delete()
+    return capture
+
+def delete_stacks(capture):
+    """
+    Remove the stacks file of a deleted capture.
+    """
+    if capture.stacks_file:
+        try:
+            os.remove(capture.stacks_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,107 @@
+import hashlib
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag, urlencode
+from accounts.models import Account
+
+def bump_account_version(account_id):
+    """
+    Mark an account's transactions and holdings as changed.
+    """
+    Account.objects.filter(pk=account_id).update(version=F('version') + 1, modified_at=timezone.now())
+
+def bump_account_versions(account_ids):
+    """
+    Mark several accounts as changed with one update.
+    """
+    Account.objects.filter(pk__in=account_ids).update(version=F('version') + 1, modified_at=timezone.now())
+
+def representation(request):
+    """
+    Digest of what selects a response's representation: the query parameters
+    in a normalized order, the negotiated renderer and its media type, whose
+    parameters such as indent change the rendered bytes.
+
+    Passed as an ETag part, so ?fields, ?expand or another format of the
+    same data never match each other's validators.
+    """
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    renderer = getattr(request, 'accepted_renderer', None)
+    media_type = getattr(request, 'accepted_media_type', '')
+    key = f"{query}|{renderer.format if renderer else ''}|{media_type}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def account_validators(account, *parts):
+    """
+    Build the ETag and Last-Modified timestamp of one account's data.
+
+    Extra parts, such as the requesting user and permission, are folded into
+    the ETag for responses that differ between users.
+    """
+    etag = quote_etag('-'.join(str(part) for part in (account.pk, account.version, *parts)))
+    return etag, int(account.modified_at.timestamp())
+
+VALIDATOR_AGGREGATES = {'count': Count('id'), 'version': Sum('version'), 'modified_at': Max('modified_at')}
+
+def accounts_validators(accounts, *parts):
+    """
+    Build the ETag and Last-Modified timestamp of a set of accounts with one aggregate query.
+    """
+    return summary_validators(accounts.aggregate(**VALIDATOR_AGGREGATES), parts)
+
+async def aaccounts_validators(accounts, *parts):
+    """
+    Async accounts_validators() for views running on the event loop.
+    """
+    return summary_validators(await accounts.aaggregate(**VALIDATOR_AGGREGATES), parts)
+
+def summary_validators(summary, parts):
+    """
+    Build the ETag and Last-Modified timestamp from the aggregated account counters.
+    """
+    modified_at = summary['modified_at']
+    last_modified = int(modified_at.timestamp()) if modified_at else None
+    etag = quote_etag('-'.join(
+        str(part) for part in (summary['count'], summary['version'] or 0, last_modified, *parts)
+    ))
+    return etag, last_modified
+
+def not_modified(request, etag, last_modified):
+    """
+    Return a 304 response when the client's validators still match, otherwise None.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+def set_validators(response, etag, last_modified):
+    """
+    Attach the ETag and Last-Modified headers to a response, which vary with
+    the negotiated renderer.
+    """
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+class ConditionalListMixin:
+    """
+    Answer conditional list requests with 304 before the list query runs.
+
+    Views provide get_validators() returning an ETag and Last-Modified
+    timestamp computed from account change counters and the representation.
+    """
+    def get_validators(self):
+        raise NotImplementedError
+
+    validators = None
+
+    def list(self, request, *args, **kwargs):
+        self.validators = etag, last_modified = self.get_validators()
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(super().list(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,257 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, time as time_of_day
+from decimal import Decimal
+import numpy as np
+import requests
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from requests.exceptions import HTTPError, ConnectionError, Timeout
+from .models import FxRate
+from .utils import ALPHA_VANTAGE_API_KEY
+from .valuation import to_decimal
+
+logger = logging.getLogger(__name__)
+
+_rates_cache = {}
+_refreshed_at = {}
+_rates_lock = threading.Lock()
+
+class FileFxProvider:
+    """
+    FX provider reading rates from the local JSON file.
+    """
+    source = 'file'
+
+    def __init__(self, path=None):
+        self.path = path or settings.FX_RATES_FILE_PATH
+
+    def fetch_rates(self, base):
+        """
+        Return the units of each currency per unit of the base currency.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {'error': 'FX rates file not found'}
+        except json.JSONDecodeError:
+            return {'error': 'Error decoding FX rates file'}
+
+        rates = {code.upper(): float(rate) for code, rate in data.get('rates', {}).items()}
+        file_base = data.get('base', 'USD').upper()
+        if base != file_base:
+            if base not in rates:
+                return {'error': f'No rate for {base} in FX rates file'}
+            rates = {code: rate / rates[base] for code, rate in rates.items()}
+        rates[base] = 1.0
+
+        as_of = timezone.now()
+        if 'date' in data:
+            as_of = timezone.make_aware(datetime.combine(
+                datetime.strptime(data['date'], '%Y-%m-%d').date(), time_of_day.min
+            ))
+        return {'rates': rates, 'as_of': as_of}
+
+class AlphaVantageFxProvider(FileFxProvider):
+    """
+    FX provider querying Alpha Vantage for every currency in the local file,
+    falling back to the file when the API is unavailable.
+    """
+    source = 'alpha_vantage'
+
+    def fetch_rates(self, base):
+        fallback = super().fetch_rates(base)
+        if 'error' in fallback:
+            return fallback
+
+        rates = {}
+        for quote in fallback['rates']:
+            if quote == base:
+                continue
+            params = {
+                'apikey': ALPHA_VANTAGE_API_KEY,
+                'function': 'CURRENCY_EXCHANGE_RATE',
+                'from_currency': base,
+                'to_currency': quote,
+            }
+            try:
+                response = requests.get(settings.ALPHA_VANTAGE_BASE_URL, params=params, timeout=10)
+                response.raise_for_status()
+                data = response.json().get('Realtime Currency Exchange Rate', {})
+                if '5. Exchange Rate' not in data:
+                    return fallback
+                rates[quote] = float(data['5. Exchange Rate'])
+            except (HTTPError, ConnectionError, Timeout) as e:
+                logger.warning("Alpha Vantage FX error for %s/%s: %s", base, quote, e)
+                return fallback
+        rates[base] = 1.0
+        return {'rates': rates, 'as_of': timezone.now()}
+
+def get_provider():
+    """
+    Instantiate the provider configured by the FX_PROVIDER setting.
+    """
+    return import_string(settings.FX_PROVIDER)()
+
+def refresh_rates(base=None):
+    """
+    Fetch rates from the provider and store them with their as-of time.
+
+    Raises:
+        ValueError: If the provider cannot supply rates.
+    """
+    base = (base or settings.FX_BASE_CURRENCY).upper()
+    provider = get_provider()
+    result = provider.fetch_rates(base)
+    if 'error' in result:
+        raise ValueError(f"Error fetching FX rates for {base}: {result['error']}")
+
+    FxRate.objects.bulk_create([
+        FxRate(base=base, quote=quote, rate=Decimal(repr(rate)), as_of=result['as_of'], source=provider.source)
+        for quote, rate in result['rates'].items()
+    ], ignore_conflicts=True)
+    clear_rates_cache()
+    return result['rates']
+
+def stored_rates(base):
+    """
+    Return the latest stored rate per quote currency and the oldest as-of time among them.
+    """
+    newest = FxRate.objects.filter(base=base, quote=OuterRef('quote')).order_by('-as_of').values('as_of')[:1]
+    rows = FxRate.objects.filter(base=base, as_of=Subquery(newest)).values_list('quote', 'rate', 'as_of')
+    latest = {}
+    oldest = None
+    for quote, rate, as_of in rows:
+        latest[quote] = float(rate)
+        oldest = as_of if oldest is None else min(oldest, as_of)
+    return latest, oldest
+
+def get_rates(base=None):
+    """
+    Return the units of each currency per unit of the base currency.
+
+    Rates are served from an in-process cache, then from the rate table,
+    and fetched from the provider when the table is empty or older than
+    FX_MAX_AGE seconds. Stale rates are refetched at most once per
+    FX_MAX_AGE per process, since a provider may keep returning rates as old
+    as the stored ones.
+    """
+    base = (base or settings.FX_BASE_CURRENCY).upper()
+    now = time.monotonic()
+    cached = _rates_cache.get(base)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    with _rates_lock:
+        rates, as_of = stored_rates(base)
+        max_age = settings.FX_MAX_AGE
+        stale = as_of is None or (
+            max_age
+            and (timezone.now() - as_of).total_seconds() > max_age
+            and now - _refreshed_at.get(base, -max_age) >= max_age
+        )
+        if stale:
+            try:
+                rates = refresh_rates(base)
+            except ValueError:
+                if not rates:
+                    raise
+            _refreshed_at[base] = now
+        rates = dict(rates, **{base: 1.0})
+        _rates_cache[base] = (now + settings.FX_CACHE_TIMEOUT, rates)
+    return rates
+
+def clear_rates_cache():
+    """
+    Drop rates cached in this process.
+    """
+    _rates_cache.clear()
+
+def supported_currencies():
+    """
+    Return the currency codes with a known rate.
+    """
+    return sorted(get_rates())
+
+def validate_currency(code):
+    """
+    Normalize a currency code and check that a rate exists for it.
+
+    Raises:
+        ValueError: If the currency is unknown.
+    """
+    code = (code or '').upper()
+    if code not in get_rates():
+        raise ValueError(f"Unsupported currency '{code}'. Use one of: {', '.join(supported_currencies())}")
+    return code
+
+def rate(from_currency, to_currency):
+    """
+    Return the units of to_currency per unit of from_currency.
+    """
+    rates = get_rates()
+    return rates[to_currency.upper()] / rates[from_currency.upper()]
+
+def convert_many(amounts, from_currencies, to_currency):
+    """
+    Convert an array of amounts, each in its own currency, into one currency.
+
+    Args:
+        amounts (Sequence[float]): The amounts to convert.
+        from_currencies (str | Sequence[str]): One currency for every amount,
+            or a currency per amount.
+        to_currency (str): The currency to convert into.
+
+    Returns:
+        np.ndarray: The converted amounts as float64.
+    """
+    rates = get_rates()
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if isinstance(from_currencies, str):
+        factor = rates[to_currency.upper()] / rates[from_currencies.upper()]
+        return amounts * factor
+
+    codes, index = np.unique(np.char.upper(np.asarray(from_currencies, dtype=str)), return_inverse=True)
+    factors = rates[to_currency.upper()] / np.array([rates[code] for code in codes])
+    return amounts * factors[index]
+
+def convert(amount, from_currency, to_currency):
+    """
+    Convert a single Decimal amount between currencies.
+    """
+    return to_decimal(convert_many([amount], from_currency, to_currency)[0])
+
+def convert_fields(records, fields, to_currency, from_currency=None):
+    """
+    Convert the named money fields of a list of dicts in place.
+
+    Every value is gathered into one array and converted in a single call,
+    so reports are converted without a rate lookup per row.
+    """
+    from_currency = (from_currency or settings.FX_BASE_CURRENCY).upper()
+    if to_currency.upper() == from_currency:
+        return records
+    positions = [
+        (record, field)
+        for record in records
+        for field in fields
+        if record.get(field) is not None
+    ]
+    converted = convert_many([record[field] for record, field in positions], from_currency, to_currency)
+    for (record, field), value in zip(positions, converted):
+        record[field] = to_decimal(value)
+    return records
+
+def reporting_currency(request):
+    """
+    Return the currency requested by the client, or the default reporting currency.
+
+    Raises:
+        ValueError: If the requested currency is unknown.
+    """
+    return validate_currency(request.GET.get('currency') or settings.REPORTING_CURRENCY)
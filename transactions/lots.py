@@ -0,0 +1,236 @@
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from InvestmentManagerAPI.sharding import shard_for
+from .conditional import bump_account_version
+from .models import SimulatedInvestment, TaxLot, Transaction
+
+FIFO = 'fifo'
+LIFO = 'lifo'
+AVERAGE = 'average'
+LOT_METHODS = (FIFO, LIFO, AVERAGE)
+
+CENTS = Decimal('0.01')
+PRICE_PLACES = Decimal('0.0001')
+
+def get_lot_method(method=None):
+    """
+    Return the cost basis method to use, defaulting to the LOT_METHOD setting.
+    """
+    method = (method or getattr(settings, 'LOT_METHOD', FIFO)).lower()
+    if method not in LOT_METHODS:
+        raise ValueError(f"Unknown lot method '{method}'. Use one of: {', '.join(LOT_METHODS)}")
+    return method
+
+def consume_lots(open_lots, units, method, cost_basis):
+    """
+    Consume units from open lots ordered by acquisition date.
+
+    Units not covered by any lot (holdings created before lot tracking)
+    are treated as having no cost until the lots are rebuilt.
+
+    Args:
+        open_lots (list[TaxLot]): Lots with remaining units, oldest first.
+        units (Decimal): The number of units sold.
+        method (str): One of FIFO, LIFO or AVERAGE.
+        cost_basis (Decimal): Current cost basis of the holding.
+
+    Returns:
+        tuple[Decimal, list[TaxLot]]: The cost removed and the lots that changed.
+    """
+    open_units = sum((lot.remaining_units for lot in open_lots), Decimal(0))
+    remaining = Decimal(units)
+    cost_removed = Decimal(0)
+    touched = []
+
+    ordered = reversed(open_lots) if method == LIFO else open_lots
+    for lot in ordered:
+        if remaining <= 0:
+            break
+        taken = min(lot.remaining_units, remaining)
+        lot.remaining_units -= taken
+        remaining -= taken
+        cost_removed += taken * lot.cost_per_unit
+        touched.append(lot)
+
+    if method == AVERAGE and open_units:
+        average = (Decimal(cost_basis) / open_units).quantize(PRICE_PLACES, rounding=ROUND_HALF_UP)
+        cost_removed = (Decimal(units) - remaining) * average
+        for lot in open_lots:
+            lot.cost_per_unit = average
+        touched = list(open_lots)
+
+    return cost_removed.quantize(CENTS, rounding=ROUND_HALF_UP), touched
+
+def open_lot(investment, units, price, transaction_record=None):
+    """
+    Record a new lot for a buy and add its cost to the holding's cost basis.
+
+    The investment is updated in memory; the caller is expected to save it.
+    """
+    units = Decimal(units)
+    price = Decimal(price)
+    lot = TaxLot.objects.create(
+        account_id=investment.account_id,
+        investment=investment,
+        transaction=transaction_record,
+        units=units,
+        remaining_units=units,
+        cost_per_unit=price,
+        acquired_at=(
+            transaction_record.transaction_date if transaction_record
+            else investment.transaction_date
+        ),
+    )
+    investment.cost_basis = Decimal(investment.cost_basis) + (units * price).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return lot
+
+def lots_database(investment):
+    """
+    The database holding a holding's lots: the one the holding was read
+    from, or its account's shard.
+    """
+    return investment._state.db or shard_for(investment.account_id)
+
+def close_lots(investment, units, price, method=None):
+    """
+    Consume lots for a sell and add the resulting gain to the running total.
+
+    Only the open lots of the holding are read, so the cost of a sell does
+    not grow with the number of past transactions. The investment is
+    updated in memory; the caller is expected to save it.
+
+    Returns:
+        Decimal: The realized gain of this sell.
+    """
+    method = get_lot_method(method)
+    units = Decimal(units)
+    using = lots_database(investment)
+    with transaction.atomic(using=using):
+        open_lots = list(
+            TaxLot.objects.using(using).select_for_update()
+            .filter(investment=investment, remaining_units__gt=0)
+            .order_by('acquired_at', 'id')
+        )
+        cost_removed, touched = consume_lots(open_lots, units, method, investment.cost_basis)
+        TaxLot.objects.using(using).bulk_update(touched, ['remaining_units', 'cost_per_unit'])
+
+    realized = (units * Decimal(price)).quantize(CENTS, rounding=ROUND_HALF_UP) - cost_removed
+    investment.cost_basis = max(Decimal(investment.cost_basis) - cost_removed, Decimal(0))
+    investment.realized_gain = Decimal(investment.realized_gain) + realized
+    return realized
+
+def rebuild_lots(investment, method=None):
+    """
+    Replay every transaction of a holding to recreate its lots and gain totals.
+
+    Returns:
+        int: The number of lots created.
+    """
+    method = get_lot_method(method)
+    with transaction.atomic(using=lots_database(investment)):
+        count = replay_lots(investment, method)
+    bump_account_version(investment.account_id)
+    return count
+
+def replay_lots(investment, method):
+    """
+    Recreate a holding's lots and gain totals on its database; returns the lots created.
+    """
+    using = lots_database(investment)
+    TaxLot.objects.using(using).filter(investment=investment).delete()
+
+    open_lots = []
+    all_lots = []
+    cost_basis = Decimal(0)
+    realized_gain = Decimal(0)
+    transactions = (
+        Transaction.objects.using(using).filter(investment=investment)
+        .order_by('transaction_date', 'id')
+    )
+    for transaction_record in transactions.iterator():
+        price = transaction_record.executed_price or investment.price_per_unit
+        if not price:
+            continue
+        units = (transaction_record.amount / price).quantize(CENTS, rounding=ROUND_HALF_UP)
+        if transaction_record.transaction_type == 'buy':
+            lot = TaxLot(
+                account_id=investment.account_id,
+                investment=investment,
+                transaction=transaction_record,
+                units=units,
+                remaining_units=units,
+                cost_per_unit=price,
+                acquired_at=transaction_record.transaction_date,
+            )
+            open_lots.append(lot)
+            all_lots.append(lot)
+            cost_basis += transaction_record.amount
+        else:
+            cost_removed, _ = consume_lots(open_lots, units, method, cost_basis)
+            open_lots = [lot for lot in open_lots if lot.remaining_units > 0]
+            cost_basis = max(cost_basis - cost_removed, Decimal(0))
+            realized_gain += transaction_record.amount - cost_removed
+
+    TaxLot.objects.using(using).bulk_create(all_lots, batch_size=1000)
+    SimulatedInvestment.objects.using(using).filter(pk=investment.pk).update(
+        cost_basis=cost_basis, realized_gain=realized_gain
+    )
+    return len(all_lots)
+
+def gains_report(account):
+    """
+    Summarize realized and unrealized gains per holding of an account.
+
+    Unrealized gains are aggregated from open lots only.
+    """
+    open_value = ExpressionWrapper(
+        F('remaining_units') * F('investment__price_per_unit'),
+        output_field=DecimalField(max_digits=20, decimal_places=4),
+    )
+    open_cost = ExpressionWrapper(
+        F('remaining_units') * F('cost_per_unit'),
+        output_field=DecimalField(max_digits=20, decimal_places=4),
+    )
+    open_positions = {
+        row['investment']: row
+        for row in TaxLot.objects.filter(account=account, remaining_units__gt=0)
+        .values('investment')
+        .annotate(
+            open_units=Sum('remaining_units'),
+            open_cost=Sum(open_cost),
+            market_value=Sum(open_value),
+        )
+        .order_by()
+    }
+
+    holdings = []
+    total_realized = Decimal(0)
+    total_unrealized = Decimal(0)
+    investments = SimulatedInvestment.objects.filter(account=account).values(
+        'id', 'symbol', 'price_per_unit', 'realized_gain'
+    )
+    for investment in investments:
+        position = open_positions.get(investment['id'], {})
+        market_value = Decimal(position.get('market_value') or 0).quantize(CENTS, rounding=ROUND_HALF_UP)
+        open_cost_value = Decimal(position.get('open_cost') or 0).quantize(CENTS, rounding=ROUND_HALF_UP)
+        unrealized = market_value - open_cost_value
+        total_realized += investment['realized_gain']
+        total_unrealized += unrealized
+        holdings.append({
+            'symbol': investment['symbol'],
+            'open_units': position.get('open_units') or Decimal('0.00'),
+            'price_per_unit': investment['price_per_unit'],
+            'cost_basis': open_cost_value,
+            'market_value': market_value,
+            'unrealized_gain': unrealized,
+            'realized_gain': investment['realized_gain'],
+        })
+
+    return {
+        'method': get_lot_method(),
+        'realized_gain': total_realized,
+        'unrealized_gain': total_unrealized,
+        'holdings': holdings,
+    }
@@ -0,0 +1,102 @@
+import json
+import random
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from transactions.benchmarking import SCENARIOS, MarketDataStub, build_requests, compare, run_scenario, seed
+
+class Command(BaseCommand):
+    """
+    Benchmark the key API endpoints end to end against seeded test databases.
+    """
+    help = (
+        'Seed test databases, drive login, simulated trades, transaction listing, the admin user '
+        'view and market data with concurrent clients, and report latency percentiles, '
+        'throughput and queries per request as JSON, compared with a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=SCENARIOS,
+                            help='Only run this scenario (repeatable).')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients.')
+        parser.add_argument('--users', type=int, default=200, help='Seeded users.')
+        parser.add_argument('--accounts', type=int, default=50, help='Seeded accounts.')
+        parser.add_argument('--transactions', type=int, default=20000, help='Seeded transactions.')
+        parser.add_argument('--market-latency', type=float, default=0.0,
+                            help='Seconds the market data stub waits per call.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the data and request mix.')
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'benchmark_baseline.json'),
+                            help='Baseline JSON file to compare with.')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 and throughput change before a regression is reported.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions.')
+        parser.add_argument('--output', help='Also write the JSON report to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test databases between runs.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with open(settings.BASE_DIR / 'stock_prices.json', encoding='utf-8') as file:
+            symbols = json.load(file)['stocks']
+
+        for connection in connections.all():
+            test = connection.settings_dict['TEST']
+            if connection.vendor == 'sqlite':
+                # A file database with writers queueing for the lock, since
+                # concurrent writes fail on SQLite's shared in-memory test
+                # database and on lock upgrades inside deferred transactions.
+                test['NAME'] = test['NAME'] or str(Path(tempfile.gettempdir()) / f'benchmark_{connection.alias}.sqlite3')
+                connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            with MarketDataStub(symbols, options['market_latency']) as stub, \
+                    override_settings(ALPHA_VANTAGE_BASE_URL=stub.url):
+                cache.clear()
+                fixture = seed(options['users'], options['accounts'], options['transactions'], symbols, rng)
+                results = {}
+                for name in options['scenarios'] or SCENARIOS:
+                    requests = build_requests(name, fixture, options['requests'], symbols, rng)
+                    results[name] = run_scenario(requests, options['concurrency'])
+                    self.stderr.write(f"{name}: {results[name]['p95_ms']} ms p95, {results[name]['rps']} req/s")
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'environment': {
+                'database': settings.DATABASES['default']['ENGINE'],
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'users': options['users'],
+                'accounts': options['accounts'],
+                'transactions': options['transactions'],
+            },
+            'scenarios': results,
+        }
+        baseline_path = Path(options['baseline'])
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+            report['comparison'] = compare(results, baseline, options['tolerance'])
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            Path(options['output']).write_text(output + '\n', encoding='utf-8')
+        if options['save_baseline']:
+            baseline_path.write_text(json.dumps({
+                'environment': report['environment'], 'scenarios': results,
+            }, indent=2) + '\n', encoding='utf-8')
+
+        regressed = {
+            name: entry['regressions'] for name, entry in report.get('comparison', {}).items() if entry['regressions']
+        }
+        if regressed and options['fail_on_regression']:
+            raise CommandError(f'Regressions against {baseline_path}: {json.dumps(regressed)}')
@@ -0,0 +1,135 @@
+import asyncio
+import random
+import statistics
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+from accounts.authentication import tokens_for_user
+
+class Command(BaseCommand):
+    """
+    Compare the sync and async read views under a mixed ASGI load.
+    """
+    help = (
+        'Drive the ASGI application with concurrent reads and writes, once against the sync '
+        'read views and once against their async versions, and report throughput and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User whose token and first account are used.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per run.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight.')
+        parser.add_argument('--write-ratio', type=float, default=0.1, help='Share of requests that write.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the request mix.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist as e:
+            raise CommandError(f"User '{options['username']}' does not exist.") from e
+        account = user.investor_accounts.order_by('pk').first()
+        if account is None:
+            raise CommandError(f"User '{user.username}' has no account.")
+
+        headers = [
+            (b'host', settings.ALLOWED_HOSTS[0].encode()),
+            (b'authorization', f"Bearer {tokens_for_user(user)['access']}".encode()),
+        ]
+        reads = {
+            'sync': [
+                reverse('user-transactions', kwargs={'account_pk': account.pk}),
+                reverse('transactions-list', kwargs={'account_pk': account.pk}),
+                reverse('investment-list'),
+                reverse('market-data', kwargs={'data_type': 'intraday'}) + '?symbol=AAPL',
+            ],
+            'async': [
+                reverse('async-user-transactions', kwargs={'account_pk': account.pk}),
+                reverse('async-transactions', kwargs={'account_pk': account.pk}),
+                reverse('async-investments'),
+                reverse('async-market-data', kwargs={'data_type': 'intraday'}) + '?symbol=AAPL',
+            ],
+        }
+        write = ('PUT', reverse('select-account', kwargs={'pk': account.pk}))
+
+        mix = random.Random(options['seed'])
+        plan = [
+            None if mix.random() < options['write_ratio'] else mix.randrange(len(reads['sync']))
+            for _ in range(options['requests'])
+        ]
+        application = get_asgi_application()
+        for mode, paths in reads.items():
+            requests = [write if index is None else ('GET', paths[index]) for index in plan]
+            latencies, errors, elapsed = asyncio.run(
+                self.run(application, requests, headers, options['concurrency'])
+            )
+            latencies.sort()
+            self.stdout.write(
+                f'{mode:<6} {len(requests) / elapsed:>9,.0f} req/s'
+                f'  p50 {statistics.median(latencies) * 1000:>7.1f} ms'
+                f'  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:>7.1f} ms'
+                f'  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:>7.1f} ms'
+                f'  errors {errors}'
+            )
+
+    async def run(self, application, requests, headers, concurrency):
+        """
+        Send the requests with at most `concurrency` in flight.
+
+        Returns:
+            tuple[list[float], int, float]: Latencies, failed requests and the wall time.
+        """
+        queue = asyncio.Queue()
+        for request in requests:
+            queue.put_nowait(request)
+        latencies = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                method, path = queue.get_nowait()
+                started = time.perf_counter()
+                status = await self.request(application, method, path, headers)
+                latencies.append(time.perf_counter() - started)
+                errors += status >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+        elapsed = time.perf_counter() - started
+        await sync_to_async(connections.close_all)()
+        return latencies, errors, elapsed
+
+    async def request(self, application, method, path, headers):
+        """
+        Send one request through the ASGI application and return its status code.
+        """
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '', 'headers': headers,
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+        }
+        body_sent = False
+        status = 500
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects; Django cancels this wait once it responded.
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        return status
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from InvestmentManagerAPI.renderers import MessagePackRenderer, OrjsonRenderer
+
+class Command(BaseCommand):
+    """
+    Compare the throughput and output size of the response renderers.
+    """
+    help = 'Render a synthetic transaction list with each renderer and report rows per second and bytes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows in the rendered list.')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders per renderer, the best is reported.')
+
+    def handle(self, *args, **options):
+        rows = self.build_rows(options['rows'])
+        renderers = (
+            ('drf-json', JSONRenderer()),
+            ('orjson', OrjsonRenderer()),
+            ('msgpack', MessagePackRenderer()),
+        )
+        for name, renderer in renderers:
+            best = None
+            for _ in range(max(options['repeat'], 1)):
+                started = time.perf_counter()
+                body = renderer.render(rows, renderer.media_type)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(
+                f'{name:<10} {len(rows) / best:>12,.0f} rows/s {len(body):>12,} bytes'
+            )
+
+    def build_rows(self, count):
+        """
+        Build rows shaped like serialized transactions.
+        """
+        now = timezone.now()
+        return [
+            {
+                'id': i,
+                'account': i % 50,
+                'investment': i % 200,
+                'transaction_type': 'buy' if i % 3 else 'sell',
+                'amount': Decimal('1000.00') + i,
+                'units': Decimal('10.5000') + i % 7,
+                'price_per_unit': Decimal('95.2381'),
+                'transaction_date': (now - timedelta(minutes=i)).isoformat(),
+                'created_at': now - timedelta(minutes=i),
+            }
+            for i in range(count)
+        ]
@@ -0,0 +1,69 @@
+import json
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from rest_framework.test import APIClient
+from InvestmentManagerAPI.query_budget import analyze, check_request
+from transactions.benchmarking import MarketDataStub, budget_requests, seed
+
+class Command(BaseCommand):
+    """
+    Check every budgeted endpoint against its query budget on a seeded dataset.
+    """
+    help = (
+        'Seed test databases with a realistic dataset, request every budgeted endpoint and report '
+        'query budget overruns and, on PostgreSQL, sequential scans in the query plans.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Seeded users.')
+        parser.add_argument('--accounts', type=int, default=50, help='Seeded accounts.')
+        parser.add_argument('--transactions', type=int, default=20000, help='Seeded transactions.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the dataset.')
+        parser.add_argument('--verbose-queries', action='store_true', help='Print the SQL of failing requests.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test databases between runs.')
+
+    def handle(self, *args, **options):
+        with open(settings.BASE_DIR / 'stock_prices.json', encoding='utf-8') as file:
+            symbols = json.load(file)['stocks']
+
+        failures = 0
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            with MarketDataStub(symbols) as stub, override_settings(ALPHA_VANTAGE_BASE_URL=stub.url):
+                fixture = seed(
+                    options['users'], options['accounts'], options['transactions'],
+                    symbols, random.Random(options['seed']),
+                )
+                analyze()
+                cache.clear()
+                client = APIClient()
+                for user, method, path, data in budget_requests(fixture):
+                    client.force_authenticate(user=user)
+                    client.force_login(user)
+                    response, violations, queries = check_request(client, method, path, data)
+                    if response.status_code >= 400:
+                        violations.append(f'status {response.status_code}')
+                    label = f'{method.upper()} {path} {data or ""}'.strip()
+                    if not violations:
+                        self.stdout.write(f'ok    {label}: {len(queries)} queries')
+                        continue
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'FAIL  {label}'))
+                    for violation in violations:
+                        self.stdout.write(f'      {violation}')
+                    if options['verbose_queries']:
+                        for query in queries:
+                            self.stdout.write(f"        {query['sql']}")
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f'{failures} endpoint(s) exceeded their query budget.')
+        self.stdout.write(self.style.SUCCESS('All endpoints are within their query budgets.'))
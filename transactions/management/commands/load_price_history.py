@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from transactions.models import SimulatedInvestment
+from transactions.nav import invalidate_nav
+from transactions.prices import load_price_history
+
+class Command(BaseCommand):
+    """
+    Load daily closing prices used by NAV series and analytics.
+    """
+    help = 'Fetch and store daily price history for the given symbols or every held symbol.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to load, defaults to every held symbol.')
+
+    def handle(self, *args, **options):
+        symbols = options['symbols'] or sorted(
+            SimulatedInvestment.objects.values_list('symbol', flat=True).distinct()
+        )
+        if not symbols:
+            raise CommandError('No symbols to load.')
+
+        for symbol in symbols:
+            try:
+                earliest = load_price_history(symbol)
+            except ValueError as e:
+                self.stderr.write(str(e))
+                continue
+            if earliest is None:
+                continue
+            account_ids = SimulatedInvestment.objects.filter(symbol=symbol).values_list('account_id', flat=True)
+            for account_id in set(account_ids):
+                invalidate_nav(account_id, earliest)
+            self.stdout.write(f'{symbol}: history loaded from {earliest}')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import Account
+from transactions.rebalance import move_account
+
+class Command(BaseCommand):
+    """
+    Move accounts and their account-scoped rows to another shard.
+    """
+    help = 'Move the transactions, holdings, lots, interest returns and NAV points of accounts to another shard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('accounts', type=int, nargs='+', help='Account ids to move.')
+        parser.add_argument('--to', required=True, dest='target', help='Target shard alias, e.g. default or shard_1.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per bulk insert.')
+
+    def handle(self, *args, **options):
+        for account_id in options['accounts']:
+            try:
+                counts = move_account(account_id, options['target'], options['chunk_size'])
+            except ValueError as e:
+                raise CommandError(str(e)) from e
+            except Account.DoesNotExist as e:
+                raise CommandError(f'Account {account_id} does not exist.') from e
+
+            if not counts:
+                self.stdout.write(f"Account {account_id} is already on {options['target']}.")
+                continue
+            moved = ', '.join(f'{count} {name}' for name, count in counts.items())
+            self.stdout.write(self.style.SUCCESS(f"Moved account {account_id} to {options['target']}: {moved}."))
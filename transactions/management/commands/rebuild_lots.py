@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from InvestmentManagerAPI.sharding import use_shard
+from transactions.lots import LOT_METHODS, get_lot_method, rebuild_lots
+from transactions.models import SimulatedInvestment
+
+class Command(BaseCommand):
+    """
+    Rebuild tax lots and gain totals by replaying existing transactions.
+    """
+    help = 'Rebuild tax lots, cost basis and realized gains from transaction history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help='Only rebuild holdings of this account id (repeatable).')
+        parser.add_argument('--method', choices=LOT_METHODS,
+                            help='Cost basis method, defaults to the LOT_METHOD setting.')
+
+    def handle(self, *args, **options):
+        try:
+            method = get_lot_method(options['method'])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        investments = SimulatedInvestment.objects.order_by('pk')
+        if options['accounts']:
+            investments = investments.filter(account_id__in=options['accounts'])
+
+        total = 0
+        lots = 0
+        for alias in settings.DATABASE_SHARDS:
+            with use_shard(alias):
+                count = investments.count()
+                for position, investment in enumerate(investments.iterator(chunk_size=500), start=1):
+                    lots += rebuild_lots(investment, method)
+                    if position % 500 == 0:
+                        self.stdout.write(f'{alias}: {position}/{count} holdings rebuilt')
+            total += count
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {lots} lots for {total} holdings using {method}.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from transactions.fx import refresh_rates
+
+class Command(BaseCommand):
+    """
+    Fetch the latest FX rates from the configured provider.
+    """
+    help = 'Fetch and store FX rates for the base currency from the FX_PROVIDER.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', help='Base currency, defaults to FX_BASE_CURRENCY.')
+
+    def handle(self, *args, **options):
+        try:
+            rates = refresh_rates(options['base'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'{len(rates)} rates stored')
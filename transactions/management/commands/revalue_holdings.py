@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from InvestmentManagerAPI.sharding import use_shard
+from transactions.models import SimulatedInvestment
+from transactions.revaluation import revalue_holdings
+
+class Command(BaseCommand):
+    """
+    Reprice holdings at current market prices, one fetch and update per symbol.
+    """
+    help = 'Revalue holdings at current market prices with one market data call per distinct symbol.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help='Only revalue holdings of this account id (repeatable).')
+        parser.add_argument('--symbol', action='append', dest='symbols',
+                            help='Only revalue holdings of this symbol (repeatable).')
+
+    def handle(self, *args, **options):
+        holdings = SimulatedInvestment.objects.all()
+        if options['accounts']:
+            holdings = holdings.filter(account_id__in=options['accounts'])
+        if options['symbols']:
+            holdings = holdings.filter(symbol__in=options['symbols'])
+
+        def progress(position, total, symbol, count):
+            self.stdout.write(f'{position}/{total} {symbol}: {count} holdings updated')
+
+        for alias in settings.DATABASE_SHARDS:
+            with use_shard(alias):
+                result = revalue_holdings(holdings, progress)
+            for symbol, error in result['errors'].items():
+                self.stderr.write(f'{symbol}: {error}')
+            self.stdout.write(self.style.SUCCESS(
+                f"Revalued {result['updated']} holdings across {result['symbols']} symbols"
+                + (f' on {alias}.' if len(settings.DATABASE_SHARDS) > 1 else '.')
+            ))
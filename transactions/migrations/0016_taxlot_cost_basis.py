@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_remove_account_balance'),
+        ('transactions', '0015_alter_simulatedinvestment_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulatedinvestment',
+            name='cost_basis',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='simulatedinvestment',
+            name='realized_gain',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='executed_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='TaxLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('remaining_units', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cost_per_unit', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_lots', to='accounts.account')),
+                ('investment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='transactions.simulatedinvestment')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lots', to='transactions.transaction')),
+            ],
+            options={
+                'ordering': ['acquired_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('remaining_units__gt', 0)), fields=['investment', 'acquired_at'], name='taxlot_open_idx')],
+            },
+        ),
+    ]
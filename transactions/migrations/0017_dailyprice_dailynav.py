@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_remove_account_balance'),
+        ('transactions', '0016_taxlot_cost_basis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('close', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'ordering': ['symbol', 'date'],
+                'unique_together': {('symbol', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyNav',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('nav', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_navs', to='accounts.account')),
+            ],
+            options={
+                'ordering': ['account', 'date'],
+                'unique_together': {('account', 'date')},
+            },
+        ),
+    ]
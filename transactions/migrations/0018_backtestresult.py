@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0017_dailyprice_dailynav'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strategy', models.CharField(choices=[('dca', 'Dollar Cost Averaging'), ('rebalance', 'Periodic Rebalance'), ('ma_crossover', 'Moving Average Crossover')], max_length=20)),
+                ('symbols', models.JSONField()),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('initial_cash', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('contributed', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('final_value', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('total_return', models.FloatField()),
+                ('cagr', models.FloatField()),
+                ('volatility', models.FloatField()),
+                ('max_drawdown', models.FloatField()),
+                ('trades', models.PositiveIntegerField()),
+                ('rejected_orders', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backtests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+    ]
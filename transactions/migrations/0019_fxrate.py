@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0018_backtestresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(default='USD', max_length=3)),
+                ('quote', models.CharField(max_length=3)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('as_of', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(blank=True, max_length=50)),
+            ],
+            options={
+                'verbose_name': 'FX rate',
+                'ordering': ['base', 'quote', '-as_of'],
+                'unique_together': {('base', 'quote', 'as_of')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0019_fxrate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simulatedinvestment',
+            name='transaction_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,9 +1,12 @@
+import os
+from django.conf import settings
 from django.db import models
 from accounts.models import User, Account
 from decimal import Decimal
 from django.utils import timezone
 from .utils import fetch_market_data
 import django_filters
+from InvestmentManagerAPI.sharding import AccountScopedManager
 
 class SimulatedInvestment(models.Model):
     """
@@ -12,14 +15,20 @@ class SimulatedInvestment(models.Model):
     account = models.ForeignKey(
         Account,
         on_delete=models.CASCADE,
-        related_name='simulated_investments'
+        related_name='simulated_investments',
+        db_constraint=False
         )
     name = models.CharField(max_length=100)
     symbol = models.CharField(max_length=10)
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     units = models.DecimalField(max_digits=10, decimal_places=2)
+    cost_basis = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    realized_gain = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
     transaction_type = models.CharField(max_length=10, choices=[('buy', 'Buy'), ('sell', 'Sell')])
-    transaction_date = models.DateTimeField(auto_now_add=True)
+    transaction_date = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = AccountScopedManager()
+
     @property
     def total_value(self):
         """
@@ -51,11 +60,12 @@ class Transaction(models.Model):
     """
     Model representing a transaction for buying or selling investments.
     """
-    user = models.ForeignKey(User, related_name='transactions', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='transactions', on_delete=models.CASCADE, db_constraint=False)
     account = models.ForeignKey(
         Account, default=0,
         on_delete=models.CASCADE,
-        related_name='transactions'
+        related_name='transactions',
+        db_constraint=False
         )
     investment = models.ForeignKey(
         SimulatedInvestment, null=True,
@@ -63,20 +73,26 @@ class Transaction(models.Model):
         related_name='transactions'
         )
     amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    transaction_date = models.DateTimeField(default=timezone.now)
+    executed_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    transaction_date = models.DateTimeField(default=timezone.now, db_index=True)
     transaction_type = models.CharField(
         max_length=10,
         default='buy',
         choices=[('buy', 'Buy'), ('sell', 'Sell')]
         )
 
+    objects = AccountScopedManager()
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} ({self.transaction_type})"
     @property
     def price_per_unit(self):
         """
-        Fetches and returns the price per unit of the investment at the time of transaction.
+        Returns the price per unit at the time of transaction, falling back
+        to the current price of the investment for older transactions.
         """
+        if self.executed_price is not None:
+            return self.executed_price
         return self.investment.price_per_unit
 
     @property
@@ -86,13 +102,186 @@ class Transaction(models.Model):
         """
         return self.amount / self.price_per_unit
         
+class TaxLot(models.Model):
+    """
+    Model representing units acquired by a single buy and not yet fully sold.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='tax_lots', db_constraint=False)
+    investment = models.ForeignKey(
+        SimulatedInvestment,
+        on_delete=models.CASCADE,
+        related_name='lots'
+        )
+    transaction = models.ForeignKey(
+        Transaction, null=True,
+        blank=True, on_delete=models.SET_NULL,
+        related_name='lots'
+        )
+    units = models.DecimalField(max_digits=10, decimal_places=2)
+    remaining_units = models.DecimalField(max_digits=10, decimal_places=2)
+    cost_per_unit = models.DecimalField(max_digits=14, decimal_places=4)
+    acquired_at = models.DateTimeField(default=timezone.now)
+
+    objects = AccountScopedManager()
+
+    class Meta:
+        """
+        Metaclass for ordering lots and indexing the open ones.
+        """
+        ordering = ['acquired_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['investment', 'acquired_at'],
+                condition=models.Q(remaining_units__gt=0),
+                name='taxlot_open_idx'
+                ),
+        ]
+
+    def __str__(self):
+        return f"{self.investment.symbol} - {self.remaining_units}/{self.units} @ {self.cost_per_unit}"
+
 class InterestReturn(models.Model):
     """
     Model representing interest or returns for an investment.
     """
-    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='interest_returns')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='interest_returns', db_constraint=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField(default=timezone.now)
 
+    objects = AccountScopedManager()
+
     def __str__(self):
         return f"{self.account.name} - {self.amount}"
+
+class DailyPrice(models.Model):
+    """
+    Model representing the closing price of a symbol on a given day.
+    """
+    symbol = models.CharField(max_length=10)
+    date = models.DateField()
+    close = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        """
+        Metaclass for the daily price constraints.
+        """
+        unique_together = ('symbol', 'date')
+        ordering = ['symbol', 'date']
+
+    def __str__(self):
+        return f"{self.symbol} {self.date} - {self.close}"
+
+class DailyNav(models.Model):
+    """
+    Model storing the net asset value of an account for a closed day.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_navs', db_constraint=False)
+    date = models.DateField()
+    nav = models.DecimalField(max_digits=16, decimal_places=2)
+
+    objects = AccountScopedManager()
+
+    class Meta:
+        """
+        Metaclass for the daily NAV constraints.
+        """
+        unique_together = ('account', 'date')
+        ordering = ['account', 'date']
+
+    def __str__(self):
+        return f"{self.account.name} {self.date} - {self.nav}"
+
+class BacktestResult(models.Model):
+    """
+    Model storing the summary of a strategy replayed over historical prices.
+    """
+    STRATEGY_CHOICES = [
+        ('dca', 'Dollar Cost Averaging'),
+        ('rebalance', 'Periodic Rebalance'),
+        ('ma_crossover', 'Moving Average Crossover'),
+    ]
+
+    user = models.ForeignKey(User, related_name='backtests', on_delete=models.CASCADE)
+    strategy = models.CharField(max_length=20, choices=STRATEGY_CHOICES)
+    symbols = models.JSONField()
+    params = models.JSONField(default=dict, blank=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    initial_cash = models.DecimalField(max_digits=14, decimal_places=2)
+    contributed = models.DecimalField(max_digits=14, decimal_places=2)
+    final_value = models.DecimalField(max_digits=16, decimal_places=2)
+    total_return = models.FloatField()
+    cagr = models.FloatField()
+    volatility = models.FloatField()
+    max_drawdown = models.FloatField()
+    trades = models.PositiveIntegerField()
+    rejected_orders = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """
+        Metaclass for ordering backtests newest first.
+        """
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.strategy} {self.start_date}..{self.end_date}"
+
+class FxRate(models.Model):
+    """
+    Model representing the units of a quote currency per unit of a base currency.
+    """
+    base = models.CharField(max_length=3, default='USD')
+    quote = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    as_of = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        """
+        Metaclass for the FX rate constraints; the unique index also serves
+        lookups of the latest rate per currency pair.
+        """
+        verbose_name = "FX rate"
+        ordering = ['base', 'quote', '-as_of']
+        unique_together = ('base', 'quote', 'as_of')
+
+    def __str__(self):
+        return f"{self.base}/{self.quote} {self.rate} ({self.as_of:%Y-%m-%d %H:%M})"
+
+class RequestCapture(models.Model):
+    """
+    Model recording a profiled or slow request: its SQL, phase timings and
+    the file of its sampled call stacks under PROFILE_DIR.
+    """
+    REASON_CHOICES = [
+        ('header', 'Requested by staff'),
+        ('sampled', 'Sampled'),
+        ('slow', 'Slow request'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    route = models.CharField(max_length=200)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    user = models.ForeignKey(User, related_name='request_captures', null=True, blank=True, on_delete=models.SET_NULL)
+    timings = models.JSONField(default=dict, blank=True)
+    queries = models.JSONField(default=list, blank=True)
+    samples = models.PositiveIntegerField(default=0)
+    stacks_file = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        """
+        Metaclass for ordering captures newest first.
+        """
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} - {self.duration_ms:.0f} ms"
+
+    @property
+    def stacks_path(self):
+        return os.path.join(settings.PROFILE_DIR, self.stacks_file) if self.stacks_file else None
@@ -0,0 +1,126 @@
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.utils import timezone
+from .models import DailyNav, SimulatedInvestment, Transaction
+from .prices import price_matrix
+from .valuation import load_holdings, to_decimal, value_holdings
+
+def date_range(start, end):
+    """
+    Return every calendar day from start to end inclusive.
+    """
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+def end_of_day(day):
+    """
+    Return the first instant after the given local day.
+    """
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+def position_matrix(account, dates):
+    """
+    Build a (days x symbols) matrix of units held at the close of each day.
+
+    Transactions are bucketed into days and turned into unit deltas, which
+    are accumulated with a cumulative sum down each symbol column.
+    """
+    rows = list(
+        Transaction.objects.filter(
+            account=account,
+            investment__isnull=False,
+            transaction_date__lt=end_of_day(dates[-1]),
+        )
+        .order_by()
+        .values_list(
+            'transaction_date', 'investment__symbol', 'transaction_type',
+            'amount', 'executed_price', 'investment__price_per_unit'
+        )
+    )
+    if not rows:
+        return [], np.zeros((len(dates), 0))
+
+    when, row_symbols, types, amounts, executed, current = zip(*rows)
+    symbols, columns = np.unique(np.array(row_symbols, dtype=str), return_inverse=True)
+
+    prices = np.array(
+        [float(price if price is not None else fallback) for price, fallback in zip(executed, current)]
+    )
+    amounts = np.array(amounts, dtype=np.float64)
+    units = np.divide(amounts, prices, out=np.zeros_like(amounts), where=prices != 0)
+    units = np.where(np.array(types) == 'sell', -units, units)
+
+    day_numbers = np.array([day.toordinal() for day in dates])
+    ordinals = np.array([timezone.localdate(moment).toordinal() for moment in when])
+    days = np.searchsorted(day_numbers, ordinals, side='left')
+
+    deltas = np.zeros((len(dates), len(symbols)))
+    np.add.at(deltas, (days, columns), units)
+    return list(symbols), np.cumsum(deltas, axis=0)
+
+def compute_nav(account, dates):
+    """
+    Compute the net asset value of an account at the close of each day.
+    """
+    symbols, positions = position_matrix(account, dates)
+    if not symbols:
+        return np.zeros(len(dates))
+
+    current_prices = dict(
+        SimulatedInvestment.objects.filter(account=account, symbol__in=symbols)
+        .values_list('symbol', 'price_per_unit')
+    )
+    fallback = np.array([float(current_prices.get(symbol) or np.nan) for symbol in symbols])
+    prices = np.nan_to_num(price_matrix(symbols, dates, fallback))
+    return (positions * prices).sum(axis=1)
+
+def nav_series(account, start=None, end=None):
+    """
+    Return the daily NAV of an account from start to end.
+
+    The series starts no earlier than the account's first transaction, so no
+    zero points are computed or stored for the days before it. Closed days
+    are stored in DailyNav the first time they are computed and read back
+    afterwards, so only today's value is recomputed per request.
+    """
+    today = timezone.localdate()
+    end = min(end or today, today)
+    first = (
+        Transaction.objects.filter(account=account)
+        .order_by('transaction_date')
+        .values_list('transaction_date', flat=True)
+        .first()
+    )
+    first_day = timezone.localdate(first) if first else end
+    start = max(start or first_day, first_day)
+    if start > end:
+        return []
+
+    closed_days = date_range(start, min(end, today - timedelta(days=1))) if start < today else []
+    stored = dict(
+        DailyNav.objects.filter(account=account, date__range=(start, end))
+        .values_list('date', 'nav')
+    )
+    missing = [day for day in closed_days if day not in stored]
+    if missing:
+        dates = date_range(missing[0], missing[-1])
+        values = compute_nav(account, dates)
+        wanted = set(missing)
+        new_points = [
+            DailyNav(account=account, date=day, nav=to_decimal(value))
+            for day, value in zip(dates, values)
+            if day in wanted
+        ]
+        DailyNav.objects.bulk_create(new_points, batch_size=1000, ignore_conflicts=True)
+        stored.update((point.date, point.nav) for point in new_points)
+
+    series = [{'date': day, 'nav': stored[day]} for day in closed_days]
+    if end == today:
+        valuation = value_holdings(load_holdings(account_ids=[account.pk]))
+        series.append({'date': today, 'nav': valuation.total_value})
+    return series
+
+def invalidate_nav(account_id, since):
+    """
+    Drop stored NAV points from the given day onwards.
+    """
+    DailyNav.objects.for_account(account_id).filter(date__gte=since).delete()
@@ -0,0 +1,125 @@
+from datetime import date as date_cls
+from decimal import Decimal
+import numpy as np
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from .models import DailyPrice
+from .utils import fetch_price_history
+
+def price_signature(symbols, end=None):
+    """
+    Summarize the stored closes of the symbols up to end, so cached statistics
+    derived from them change only when their own prices do.
+
+    Returns:
+        tuple: (symbol, latest date, number of closes, sum of closes) per symbol.
+    """
+    prices = DailyPrice.objects.filter(symbol__in=symbols)
+    if end is not None:
+        prices = prices.filter(date__lte=end)
+    rows = (
+        prices.values('symbol')
+        .annotate(latest=Max('date'), closes=Count('id'), total=Sum('close'))
+        .order_by('symbol')
+    )
+    return tuple((row['symbol'], row['latest'], row['closes'], row['total']) for row in rows)
+
+def record_daily_price(symbol, price, day=None):
+    """
+    Store the latest known price of a symbol as its close for the day.
+    """
+    DailyPrice.objects.update_or_create(
+        symbol=symbol,
+        date=day or timezone.localdate(),
+        defaults={'close': Decimal(price)},
+    )
+
+def store_price_history(symbol, prices):
+    """
+    Upsert a mapping of ISO dates to closing prices for a symbol.
+
+    Returns:
+        date | None: The earliest stored date, or None if nothing was stored.
+    """
+    rows = [
+        DailyPrice(symbol=symbol, date=date_cls.fromisoformat(day), close=Decimal(str(close)))
+        for day, close in prices.items()
+    ]
+    if not rows:
+        return None
+    DailyPrice.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['symbol', 'date'],
+        update_fields=['close'],
+    )
+    return min(row.date for row in rows)
+
+def load_price_history(symbol):
+    """
+    Fetch the price history of a symbol and store it.
+
+    Raises:
+        ValueError: If no history is available for the symbol.
+    """
+    history = fetch_price_history(symbol)
+    if 'error' in history:
+        raise ValueError(f"Error fetching price history for symbol {symbol}: {history['error']}")
+    return store_price_history(symbol, history['prices'])
+
+def forward_fill(matrix, fallback=None):
+    """
+    Carry the last known price forward down each column of a price matrix.
+
+    Leading gaps take the first known price of the column, or the fallback
+    price when a column has no prices at all.
+    """
+    rows, columns = matrix.shape
+    if not rows or not columns:
+        return matrix
+    known = ~np.isnan(matrix)
+    last_known = np.where(known, np.arange(rows)[:, None], 0)
+    np.maximum.accumulate(last_known, axis=0, out=last_known)
+    filled = matrix[last_known, np.arange(columns)]
+
+    first_known = matrix[known.argmax(axis=0), np.arange(columns)]
+    if fallback is not None:
+        first_known = np.where(np.isnan(first_known), fallback, first_known)
+    return np.where(np.isnan(filled), first_known[None, :], filled)
+
+def price_matrix(symbols, dates, fallback=None):
+    """
+    Build a (days x symbols) matrix of closing prices from stored history.
+
+    Args:
+        symbols (Sequence[str]): Column order of the matrix.
+        dates (Sequence[date]): Sorted row order of the matrix.
+        fallback (np.ndarray, optional): Price per symbol used when no history exists.
+
+    Returns:
+        np.ndarray: Forward-filled prices as float64.
+    """
+    symbols = list(symbols)
+    dates = list(dates)
+    matrix = np.full((len(dates), len(symbols)), np.nan)
+    if not dates or not symbols:
+        return matrix
+
+    day_numbers = np.array([day.toordinal() for day in dates])
+    column = {symbol: position for position, symbol in enumerate(symbols)}
+    rows = list(
+        DailyPrice.objects.filter(symbol__in=symbols, date__lte=dates[-1])
+        .order_by('date')
+        .values_list('symbol', 'date', 'close')
+    )
+    if rows:
+        row_symbols, row_dates, row_closes = zip(*rows)
+        ordinals = np.fromiter((day.toordinal() for day in row_dates), dtype=np.int64, count=len(rows))
+        # Each close applies from the first row on or after its date.
+        positions = np.searchsorted(day_numbers, ordinals, side='left')
+        columns = np.fromiter((column[symbol] for symbol in row_symbols), dtype=np.intp, count=len(rows))
+        # Rows are ordered by date, so the latest close for a row wins.
+        matrix[positions, columns] = np.array(row_closes, dtype=np.float64)
+
+    return forward_fill(matrix, fallback)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from .analytics import TRADING_DAYS, universe_statistics
+from .prices import price_signature
+from .simulation import correlation_factor, get_executor, simulate_paths
+from .valuation import load_holdings, to_decimal, value_holdings
+
+STEPS_PER_YEAR = 12
+PERCENTILES = (5, 25, 50, 75, 95)
+CHUNK_PATHS = 10000
+
+def holdings_hash(holdings):
+    """
+    Hash the symbols, units and prices of a set of holdings.
+    """
+    rows = sorted(
+        (str(holdings.symbols[symbol]), round(float(units), 4), round(float(price), 4))
+        for symbol, units, price in zip(holdings.symbol_index, holdings.units, holdings.stored_prices)
+    )
+    return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+
+def run_simulation(paths, years, seed, drift, factor, weights, start_value, target):
+    """
+    Simulate paths in fixed-size chunks, spread across the process pool when large.
+
+    Chunk boundaries and seeds depend only on the inputs, so a seeded run
+    gives the same result whether or not it runs in parallel.
+    """
+    steps = years * STEPS_PER_YEAR
+    sizes = [min(CHUNK_PATHS, paths - start) for start in range(0, paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [
+        (chunk_seed, size, steps, STEPS_PER_YEAR, drift, factor, weights, start_value, target)
+        for chunk_seed, size in zip(seeds, sizes)
+    ]
+
+    if paths >= settings.PROJECTION_PARALLEL_PATHS and len(arguments) > 1:
+        results = list(get_executor(settings.SIMULATION_WORKERS).map(simulate_paths, *zip(*arguments)))
+    else:
+        results = [simulate_paths(*chunk) for chunk in arguments]
+
+    recorded = np.concatenate([values for values, _ in results])
+    touched = np.concatenate([hits for _, hits in results])
+    return recorded, touched
+
+def project_account(account, paths=10000, years=10, seed=None, target=None, window=TRADING_DAYS):
+    """
+    Project the value of an account's holdings with a Monte Carlo simulation.
+
+    Results are memoized by a hash of the holdings, the prices of the held
+    symbols and the parameters, so repeated requests for the same portfolio
+    do not resimulate until one of its symbols gets a new price.
+    """
+    holdings = load_holdings(account_ids=[account.pk])
+    cache_key = 'projection:' + hashlib.sha256(json.dumps([
+        holdings_hash(holdings), paths, years, seed,
+        float(target) if target is not None else None, window,
+        price_signature([str(symbol) for symbol in holdings.symbols]),
+    ], default=str).encode()).hexdigest()
+    result = cache.get(cache_key)
+    if result is not None:
+        return {**result, 'cached': True}
+
+    valuation = value_holdings(holdings)
+    symbols = tuple(str(symbol) for symbol in holdings.symbols)
+    symbol_values = np.bincount(
+        holdings.symbol_index, weights=valuation.market_value, minlength=len(symbols)
+    )
+    start_value = float(symbol_values.sum())
+
+    statistics = universe_statistics(symbols, window=window)
+    days_per_step = TRADING_DAYS / STEPS_PER_YEAR
+    order = [statistics.symbols.index(symbol) for symbol in symbols]
+    mean = statistics.mean[order]
+    covariance = statistics.covariance[np.ix_(order, order)]
+    drift = (mean - np.diag(covariance) / 2) * days_per_step
+    factor = correlation_factor(covariance * days_per_step)
+    weights = symbol_values / start_value if start_value else np.zeros(len(symbols))
+    target_value = float(target) if target is not None else None
+
+    recorded, touched = run_simulation(
+        paths, years, seed, drift, factor, weights, start_value, target_value
+    )
+    bands = np.percentile(recorded, PERCENTILES, axis=0)
+    result = {
+        'account': account.name,
+        'paths': paths,
+        'years': years,
+        'seed': seed,
+        'window': window,
+        'start_value': to_decimal(start_value),
+        'percentiles': {
+            str(percentile): [to_decimal(value) for value in band]
+            for percentile, band in zip(PERCENTILES, bands)
+        },
+        'target': to_decimal(target) if target is not None else None,
+        'probability_at_horizon': float((recorded[:, -1] >= target_value).mean()) if target is not None else None,
+        'probability_touched': float(touched.mean()) if target is not None else None,
+    }
+    cache.set(cache_key, result, settings.PROJECTION_CACHE_TIMEOUT)
+    return {**result, 'cached': False}
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from accounts.models import Account
+from InvestmentManagerAPI.sharding import clear_shard_cache
+from .models import DailyNav, InterestReturn, SimulatedInvestment, TaxLot, Transaction
+
+# Copy order, parents before the rows referencing them on the same shard
+MOVE_ORDER = (SimulatedInvestment, Transaction, TaxLot, InterestReturn, DailyNav)
+SHARD_REFERENCES = {
+    Transaction: {'investment_id': SimulatedInvestment},
+    TaxLot: {'investment_id': SimulatedInvestment, 'transaction_id': Transaction},
+}
+
+def copy_rows(model, account_id, source, target, new_ids, chunk_size):
+    """
+    Copy an account's rows of one model to the target shard, remapping
+    references to rows copied before. Returns the number of rows copied.
+    """
+    rows = list(model.objects.using(source).filter(account_id=account_id).order_by('pk'))
+    old_pks = [row.pk for row in rows]
+    preserved = [row.transaction_date for row in rows] if model is SimulatedInvestment else None
+    for row in rows:
+        row.pk = None
+        row._state.adding = True
+        for field, related in SHARD_REFERENCES.get(model, {}).items():
+            value = getattr(row, field)
+            if value is not None:
+                setattr(row, field, new_ids[related][value])
+
+    created = model.objects.using(target).bulk_create(rows, batch_size=chunk_size)
+    if preserved is not None:
+        # auto_now_add stamps the copies; keep the original dates.
+        for row, value in zip(created, preserved):
+            row.transaction_date = value
+        model.objects.using(target).bulk_update(created, ['transaction_date'], batch_size=chunk_size)
+    new_ids[model] = dict(zip(old_pks, (row.pk for row in created)))
+    return len(created)
+
+def move_account(account_id, target, chunk_size=1000):
+    """
+    Move an account's transactions, holdings, lots, interest returns and NAV
+    points to another shard.
+
+    Rows are copied with bulk inserts in one transaction on the target, then
+    the shard map is switched and the originals deleted. Copied rows get new
+    primary keys on the target. Writes to the account should be paused while
+    it moves.
+
+    Returns:
+        dict: Rows moved per model, empty when the account is already on the target.
+
+    Raises:
+        ValueError: If the target is not a configured shard.
+        Account.DoesNotExist: If the account does not exist.
+    """
+    if target not in settings.DATABASE_SHARDS:
+        raise ValueError(f"Unknown shard '{target}', use one of: {', '.join(settings.DATABASE_SHARDS)}.")
+    source = Account.objects.values_list('shard', flat=True).get(pk=account_id)
+    if source == target:
+        return {}
+
+    new_ids = {}
+    counts = {}
+    with transaction.atomic(using=target):
+        for model in MOVE_ORDER:
+            counts[model._meta.model_name] = copy_rows(model, account_id, source, target, new_ids, chunk_size)
+
+    Account.objects.filter(pk=account_id).update(
+        shard=target, version=F('version') + 1, modified_at=timezone.now()
+    )
+    clear_shard_cache(account_id)
+
+    with transaction.atomic(using=source):
+        for model in reversed(MOVE_ORDER):
+            model.objects.using(source).filter(account_id=account_id).delete()
+    return counts
@@ -0,0 +1,113 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from InvestmentManagerAPI.profiling import record_cache_lookup
+
+CACHED_VIEWS = ('market-data', 'admin-transactions', 'investments')
+_MISSING = object()
+
+def cache_key(name, *parts):
+    """
+    Build the cache key of a response from the view name and its varying parts.
+
+    Parts include account change counters, so writes that bump an account
+    make its old entries unreachable and they simply expire.
+    """
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+    return f'response:{name}:{digest}'
+
+def record_lookup(name, hit):
+    """
+    Count a cache hit or miss for a view.
+    """
+    record_cache_lookup(name, hit)
+    key = f'response-stats:{name}:{"hits" if hit else "misses"}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+async def arecord_lookup(name, hit):
+    """
+    Async record_lookup().
+    """
+    record_cache_lookup(name, hit)
+    key = f'response-stats:{name}:{"hits" if hit else "misses"}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+def cached_response(name, parts, compute, timeout=None, cache_if=None):
+    """
+    Return the cached data for a view, computing and storing it on a miss.
+
+    Args:
+        name (str): The view name, one of CACHED_VIEWS.
+        parts (list): Values the response depends on.
+        compute (Callable[[], Any]): Produces the data on a miss.
+        timeout (int, optional): Lifetime in seconds, defaults to RESPONSE_CACHE_TIMEOUT.
+        cache_if (Callable[[Any], bool], optional): Whether computed data may be stored.
+    """
+    key = cache_key(name, *parts)
+    data = cache.get(key, _MISSING)
+    record_lookup(name, data is not _MISSING)
+    if data is not _MISSING:
+        return data
+
+    data = compute()
+    if cache_if is None or cache_if(data):
+        cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout)
+    return data
+
+async def acached_response(name, parts, compute, timeout=None, cache_if=None):
+    """
+    Async cached_response(), where compute returns an awaitable.
+    """
+    key = cache_key(name, *parts)
+    data = await cache.aget(key, _MISSING)
+    await arecord_lookup(name, data is not _MISSING)
+    if data is not _MISSING:
+        return data
+
+    data = await compute()
+    if cache_if is None or cache_if(data):
+        await cache.aset(key, data, settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout)
+    return data
+
+def hit_ratios():
+    """
+    Report hits, misses and the hit ratio of every cached view.
+    """
+    counts = cache.get_many([
+        f'response-stats:{name}:{kind}' for name in CACHED_VIEWS for kind in ('hits', 'misses')
+    ])
+    stats = {}
+    for name in CACHED_VIEWS:
+        hits = counts.get(f'response-stats:{name}:hits', 0)
+        misses = counts.get(f'response-stats:{name}:misses', 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+class CachedListMixin:
+    """
+    Serve list data from the response cache, keyed by the view's ETag.
+
+    Used after ConditionalListMixin, which computes the validators once per request.
+    """
+    cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        etag, _ = self.validators
+        data = cached_response(
+            self.cache_name,
+            [etag, request.get_full_path()],
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
@@ -0,0 +1,47 @@
+from decimal import Decimal, ROUND_HALF_UP
+from .conditional import bump_account_versions
+from .prices import record_daily_price
+from .utils import fetch_market_data
+
+CENT = Decimal('0.01')
+
+def revalue_holdings(holdings, progress=None):
+    """
+    Reprice holdings at current market prices.
+
+    Each distinct symbol is fetched once and applied with one UPDATE, so the
+    cost grows with the number of symbols rather than holdings.
+
+    Args:
+        holdings (QuerySet): SimulatedInvestment rows to revalue.
+        progress (Callable[[int, int, str, int], None], optional): Called after
+            each symbol with its position, the symbol count, the symbol and
+            the number of holdings updated.
+
+    Returns:
+        dict: Updated holding and symbol counts and errors by symbol.
+    """
+    holdings = holdings.order_by()
+    symbols = sorted(set(holdings.values_list('symbol', flat=True)))
+    updated = 0
+    errors = {}
+    account_ids = set()
+
+    for position, symbol in enumerate(symbols, start=1):
+        market_data = fetch_market_data(symbol)
+        if 'error' in market_data:
+            errors[symbol] = market_data['error']
+            count = 0
+        else:
+            price = Decimal(str(market_data['price'])).quantize(CENT, rounding=ROUND_HALF_UP)
+            rows = holdings.filter(symbol=symbol)
+            account_ids.update(rows.values_list('account_id', flat=True).distinct())
+            count = rows.update(price_per_unit=price)
+            record_daily_price(symbol, price)
+            updated += count
+        if progress:
+            progress(position, len(symbols), symbol, count)
+
+    if account_ids:
+        bump_account_versions(account_ids)
+    return {'updated': updated, 'symbols': len(symbols) - len(errors), 'errors': errors}
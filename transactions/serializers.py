@@ -1,8 +1,10 @@
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from rest_framework import serializers
-from transactions.models import Transaction, InterestReturn,SimulatedInvestment
+from accounts.fieldsets import SparseFieldsetMixin
+from accounts.serializers import AccountSerializer
+from transactions.models import Transaction, InterestReturn,SimulatedInvestment, BacktestResult
 
-class InvestmentSerializer(serializers.ModelSerializer):
+class InvestmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Investment model.
     """
@@ -11,13 +13,15 @@ class InvestmentSerializer(serializers.ModelSerializer):
         Metaclass for the Simulated investments contraints.
         """
         model = SimulatedInvestment
-        fields = (['account', 'name',
+        expandable_fields = {'account': (AccountSerializer, {})}
+        fields = (['id', 'account', 'name',
                    'symbol', 'price_per_unit', 
-                   'units', 'transaction_type', 
+                   'units', 'cost_basis',
+                   'realized_gain', 'transaction_type', 
                    'transaction_date']
                   )
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Transaction model.
     """
@@ -30,7 +34,12 @@ class TransactionSerializer(serializers.ModelSerializer):
         Metaclass for the Simulated Transaction contraints.
         """
         model = Transaction
-        fields = (['user', 'account',
+        expandable_fields = {'investment': (InvestmentSerializer, {})}
+        field_dependencies = {
+            'price_per_unit': ['executed_price', 'investment__price_per_unit'],
+            'units': ['amount', 'executed_price', 'investment__price_per_unit'],
+        }
+        fields = (['id', 'user', 'account',
                    'investment', 'amount', 
                    'transaction_date', 
                    'transaction_type', 
@@ -54,4 +63,91 @@ class InterestReturnSerializer(serializers.ModelSerializer):
         """
         model = InterestReturn
         fields = '__all__'
-        
\ No newline at end of file
+
+# Strategy parameters read as whole numbers of days, and their upper bound
+INTEGER_PARAMS = ('every', 'short', 'long')
+MAX_PARAM_DAYS = 10000
+# Strategy parameters read as amounts, weights as a list of them, and their upper bound
+AMOUNT_PARAMS = ('amount',)
+MAX_PARAM_AMOUNT = Decimal('1e12')
+
+def parse_number(name, value, integer=False):
+    """
+    Parse a strategy parameter given as a JSON number or a numeric string.
+
+    Returns:
+        int | float: A day count between 1 and MAX_PARAM_DAYS when integer is
+        set, otherwise a finite amount between 0 and MAX_PARAM_AMOUNT.
+
+    Raises:
+        ValidationError: If the value is not a number, or is out of range.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise serializers.ValidationError(f"{name} must be a number")
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise serializers.ValidationError(f"{name} must be a number")
+    if not number.is_finite():
+        raise serializers.ValidationError(f"{name} must be a finite number")
+    if integer:
+        if number != number.to_integral_value() or not 1 <= number <= MAX_PARAM_DAYS:
+            raise serializers.ValidationError(f"{name} must be a whole number between 1 and {MAX_PARAM_DAYS}")
+        return int(number)
+    if not 0 <= number <= MAX_PARAM_AMOUNT:
+        raise serializers.ValidationError(f"{name} must be between 0 and {MAX_PARAM_AMOUNT:f}")
+    return float(number)
+
+def check_param(name, value):
+    """
+    Return a strategy parameter parsed to the number the strategies expect.
+
+    Raises:
+        ValidationError: If a numeric parameter is not a number in range.
+    """
+    if name == 'weights':
+        if not isinstance(value, list):
+            raise serializers.ValidationError(f"{name} must be a list of numbers")
+        return [parse_number(name, weight) for weight in value]
+    if name in INTEGER_PARAMS:
+        return parse_number(name, value, integer=True)
+    if name in AMOUNT_PARAMS:
+        return parse_number(name, value)
+    return value
+
+class BacktestRequestSerializer(serializers.Serializer):
+    """
+    Serializer for the parameters of a backtest or parameter sweep.
+    """
+    strategy = serializers.ChoiceField(choices=BacktestResult.STRATEGY_CHOICES)
+    symbols = serializers.ListField(child=serializers.CharField(max_length=10), min_length=1, max_length=50)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    initial_cash = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=Decimal('0.01'), default=Decimal('10000.00'))
+    params = serializers.DictField(required=False, default=dict)
+    sweep = serializers.DictField(child=serializers.ListField(), required=False, default=dict)
+
+    def validate(self, data):
+        """
+        Check that the date range is ordered and parse strategy parameters.
+        """
+        if data['start_date'] >= data['end_date']:
+            raise serializers.ValidationError("start_date must be before end_date")
+        data['params'] = {name: check_param(name, value) for name, value in data['params'].items()}
+        data['sweep'] = {
+            name: [check_param(name, value) for value in values]
+            for name, values in data['sweep'].items()
+        }
+        return data
+
+class BacktestResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for stored backtest summaries.
+    """
+    class Meta:
+        """
+        Metaclass for the backtest result constraints.
+        """
+        model = BacktestResult
+        exclude = ['user']
+        read_only_fields = [field.name for field in BacktestResult._meta.fields]
@@ -0,0 +1,73 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from accounts.models import Account, AccountPermissions
+from InvestmentManagerAPI.sharding import shard_for
+from .captures import delete_stacks
+from .conditional import bump_account_version, bump_account_versions
+from .models import RequestCapture, SimulatedInvestment, Transaction
+from .nav import invalidate_nav
+
+def left_shard(instance, using):
+    """
+    Whether a row was written on a shard its account has moved away from,
+    as when move_account deletes the originals.
+    """
+    return using != shard_for(instance.account_id)
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def transaction_changed(sender, instance, using, **kwargs):
+    """
+    Invalidate stored NAV points affected by a new, edited or removed transaction
+    and bump the account's change counter.
+    """
+    if left_shard(instance, using):
+        return
+    invalidate_nav(instance.account_id, timezone.localdate(instance.transaction_date))
+    bump_account_version(instance.account_id)
+
+@receiver(post_save, sender=SimulatedInvestment)
+@receiver(post_delete, sender=SimulatedInvestment)
+def investment_changed(sender, instance, using, **kwargs):
+    """
+    Bump the account's change counter when a holding changes.
+    """
+    if left_shard(instance, using):
+        return
+    bump_account_version(instance.account_id)
+
+@receiver(post_save, sender=AccountPermissions)
+@receiver(post_delete, sender=AccountPermissions)
+def permission_changed(sender, instance, **kwargs):
+    """
+    Bump the account's change counter when a user's permission changes,
+    so cached responses and access built under the old permission are not served.
+    """
+    bump_account_version(instance.account_id)
+
+@receiver(m2m_changed, sender=Account.users.through)
+def account_users_changed(sender, instance, action, pk_set, **kwargs):
+    """
+    Bump the change counter of accounts gaining or losing users, which also
+    retires the users' cached access to them.
+    """
+    if action == 'pre_clear' and not isinstance(instance, Account):
+        instance._cleared_account_ids = set(instance.investor_accounts.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Account):
+        bump_account_version(instance.pk)
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_account_ids', set())
+    if pk_set:
+        bump_account_versions(pk_set)
+
+@receiver(post_delete, sender=RequestCapture)
+def capture_deleted(sender, instance, **kwargs):
+    """
+    Remove the sampled stacks file of a deleted request capture.
+    """
+    delete_stacks(instance)
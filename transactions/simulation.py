@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+_executor = None
+
+def get_executor(max_workers=None):
+    """
+    Return the process pool shared by projections and backtests in this process.
+
+    The pool is created on first use; max_workers of 0 or None uses every core.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max_workers or None)
+    return _executor
+
+def simple_returns(prices):
+    """
+    Convert a (days x symbols) price matrix into daily simple returns.
+    """
+    previous = prices[:-1]
+    return np.divide(
+        prices[1:] - previous, previous,
+        out=np.zeros_like(previous), where=previous != 0
+    )
+
+def max_drawdown(returns):
+    """
+    Largest peak-to-trough fall of the value implied by a return series.
+    """
+    if not len(returns):
+        return 0.0
+    values = np.cumprod(1 + returns)
+    peaks = np.maximum.accumulate(np.concatenate(([1.0], values)))[1:]
+    return float((1 - values / peaks).max())
+
+def correlation_factor(covariance):
+    """
+    Return a matrix L with L @ L.T equal to the covariance matrix.
+
+    Falls back to an eigen decomposition when the matrix is only positive
+    semi-definite, as happens with short windows or duplicated symbols.
+    """
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+def simulate_paths(seed, paths, steps, record_every, drift, factor, weights, start_value, target=None):
+    """
+    Simulate portfolio values over correlated log-normal asset returns.
+
+    Each step draws a (paths x assets) block of correlated shocks, so
+    memory is bounded by one step regardless of the horizon. The portfolio
+    is rebalanced to the given weights at every step.
+
+    Args:
+        seed (np.random.SeedSequence | int | None): Seed for this chunk of paths.
+        paths (int): The number of paths to simulate.
+        steps (int): The number of steps in the horizon.
+        record_every (int): Record portfolio values every this many steps.
+        drift (np.ndarray): Mean log return per asset and step.
+        factor (np.ndarray): Correlation factor of the per-step covariance.
+        weights (np.ndarray): Portfolio weight per asset.
+        start_value (float): Portfolio value at the start of every path.
+        target (float, optional): Value whose crossing is tracked per path.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Recorded values (paths x points) and
+        whether each path reached the target at any step.
+    """
+    rng = np.random.default_rng(seed)
+    values = np.full(paths, float(start_value))
+    recorded = np.empty((paths, steps // record_every + 1))
+    recorded[:, 0] = values
+    touched = values >= target if target is not None else np.zeros(paths, dtype=bool)
+
+    for step in range(1, steps + 1):
+        shocks = rng.standard_normal((paths, len(drift))) @ factor.T + drift
+        values *= 1 + np.expm1(shocks) @ weights
+        if target is not None:
+            touched |= values >= target
+        if step % record_every == 0:
+            recorded[:, step // record_every] = values
+
+    return recorded, touched
@@ -1,19 +1,69 @@
 from django.core.exceptions import PermissionDenied
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from decimal import Decimal
 import json
 from django.utils import timezone
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Transaction, Account, SimulatedInvestment
+from .models import Transaction, Account, SimulatedInvestment, DailyPrice, DailyNav, BacktestResult, FxRate
 from accounts.models import AccountPermissions
-from .utils_permissions import create_transaction
+from .utils_permissions import create_transaction, process_transaction
+from .valuation import load_holdings, value_holdings
+from .nav import nav_series
+from .analytics import max_drawdown, universe_statistics
+from .prices import record_daily_price
+from .projections import run_simulation
+from .simulation import correlation_factor
+from .backtest import Portfolio, execute, run_backtest
+from .fx import AlphaVantageFxProvider, clear_rates_cache, convert_many, get_rates
+from django.core.cache import cache
+import numpy as np
 from unittest.mock import patch
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from InvestmentManagerAPI.renderers import MessagePackRenderer, OrjsonRenderer
+import gzip
+import msgpack
+from django.conf import settings
+from django.contrib import admin
+from django.db import IntegrityError, connection, connections
+from unittest import skipUnless
+from InvestmentManagerAPI.db_router import ReplicaRouter, read_from_replicas, recently_wrote
+from InvestmentManagerAPI.checks import shared_cache_check
+from django.test.utils import CaptureQueriesContext
+from InvestmentManagerAPI.sharding import ShardRouter, clear_shard_cache, shard_cache_key, use_shard
+from .models import TaxLot
+from .lots import close_lots, consume_lots, rebuild_lots
+from .rebalance import move_account
+from .benchmarking import MarketDataStub, budget_requests, compare, seed
+from InvestmentManagerAPI.query_budget import QueryBudget, QueryBudgetAssertions, analyze, check_request, seq_scans
+from .views import UserTransactionsView
+import random
+import re
+from .utils import fetch_market_data, fetch_price_history
+from accounts.authentication import tokens_for_user
+from InvestmentManagerAPI.metrics import registry
+import os
+import tempfile
+import time
+from django.http import HttpResponse
+from InvestmentManagerAPI.sampler import folded, sampler, top_frames
+from .captures import save_capture
+from .models import RequestCapture
 
-class UserTransactionsAdminTests(APITestCase):
+@override_settings(DATABASE_REPLICAS=[], DATABASE_SHARDS=['default'])
+class SingleDatabaseTestCase(APITestCase):
+    """
+    Test case using only the default database even when replicas or shards
+    are configured: their connections cannot see the rows of the test's
+    transaction.
+    """
+
+class UserTransactionsAdminTests(SingleDatabaseTestCase):
     """
     Test the ability of an admin user to retrieve and filter transactions of a user.
     """
@@ -117,7 +167,7 @@ class UserTransactionsAdminTests(APITestCase):
         response = self.client.get(invalid_url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
-class SimulatedInvestmentTransactionTest(APITestCase):
+class SimulatedInvestmentTransactionTest(SingleDatabaseTestCase):
     """
     Test suite for simulating buy/sell transactions for a user's account.
     """
@@ -131,7 +181,7 @@ class SimulatedInvestmentTransactionTest(APITestCase):
             'simulate-investment-transaction', 
             kwargs={'account_pk': self.account.pk})
 
-class CreateTransactionTest(APITestCase):
+class CreateTransactionTest(SingleDatabaseTestCase):
     """
     Test suite for the create_transaction utility function.
     """
@@ -152,4 +202,1497 @@ class CreateTransactionTest(APITestCase):
             permission=AccountPermissions.FULL_ACCESS
             )
 
-   
+    def test_failed_lot_write_rolls_back_the_transaction(self):
+        """
+        Test that the transaction row is not kept when writing its lot fails.
+        """
+        with patch('transactions.utils_permissions.open_lot', side_effect=IntegrityError), \
+                self.assertRaises(IntegrityError):
+            create_transaction(self.user, self.account, self.investment, Decimal('500'), 'buy')
+        self.assertFalse(Transaction.objects.exists())
+        self.investment.refresh_from_db()
+        self.assertEqual(self.investment.units, Decimal('10.00'))
+
+class ValuationEngineTest(SingleDatabaseTestCase):
+    """
+    Test suite for the vectorized holdings valuation engine.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        self.other_account = Account.objects.create(name='Other Account')
+        self.apple = SimulatedInvestment.objects.create(
+            account=self.account, name='Apple', symbol='AAPL', units=Decimal('10.00')
+        )
+        self.tesla = SimulatedInvestment.objects.create(
+            account=self.account, name='Tesla', symbol='TSLA', units=Decimal('5.00')
+        )
+        SimulatedInvestment.objects.create(
+            account=self.other_account, name='Apple', symbol='AAPL', units=Decimal('1.00')
+        )
+        SimulatedInvestment.objects.filter(pk=self.apple.pk).update(cost_basis=Decimal('1000.00'))
+
+    def test_value_holdings_for_accounts(self):
+        """
+        Test market value, unrealized P&L, weights and conversion for one account.
+        """
+        holdings = load_holdings(account_ids=[self.account.pk])
+        valuation = value_holdings(holdings, prices={'AAPL': 150, 'TSLA': 200}, fx_rate=Decimal('140.00'))
+        rows = {row['symbol']: row for row in valuation.rows()}
+
+        self.assertEqual(len(holdings), 2)
+        self.assertEqual(valuation.total_value, Decimal('2500.00'))
+        self.assertEqual(valuation.total_converted_value, Decimal('350000.00'))
+        self.assertEqual(rows['AAPL']['total_value'], Decimal('1500.00'))
+        self.assertEqual(rows['AAPL']['unrealized_pnl'], Decimal('500.00'))
+        self.assertEqual(rows['AAPL']['weight'], Decimal('0.6000'))
+        self.assertEqual(rows['TSLA']['cost'], Decimal('0.00'))
+
+    def test_weights_are_per_account(self):
+        """
+        Test that weights sum to one within each account.
+        """
+        valuation = value_holdings(load_holdings(), prices={'AAPL': 150, 'TSLA': 200})
+        for position in range(len(valuation.holdings.accounts)):
+            mask = valuation.holdings.account_index == position
+            self.assertAlmostEqual(valuation.weights[mask].sum(), 1.0)
+
+    def test_empty_holdings(self):
+        """
+        Test that valuing no holdings returns zero totals.
+        """
+        valuation = value_holdings(load_holdings(account_ids=[]))
+        self.assertEqual(valuation.total_value, Decimal('0.00'))
+        self.assertEqual(list(valuation.rows()), [])
+
+class TaxLotTest(SingleDatabaseTestCase):
+    """
+    Test suite for tax lot tracking and realized gains.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user,
+            account=self.account,
+            permission=AccountPermissions.FULL_ACCESS
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def trade(self, transaction_type, units, price):
+        """
+        Process a transaction with the market price patched to the given value.
+        """
+        with patch('transactions.utils_permissions.fetch_market_data', return_value={'price': price}), \
+                patch('transactions.models.fetch_market_data', return_value={'price': price}):
+            return process_transaction(self.user, self.account.pk, transaction_type, Decimal(units), 'AAPL')
+
+    def test_fifo_sell_realizes_gain_against_oldest_lot(self):
+        """
+        Test that a FIFO sell consumes the oldest lot first.
+        """
+        self.trade('buy', '10', 100)
+        self.trade('buy', '10', 200)
+        investment = self.trade('sell', '15', 300)['investment']
+
+        investment.refresh_from_db()
+        self.assertEqual(investment.realized_gain, Decimal('2500.00'))
+        self.assertEqual(investment.cost_basis, Decimal('1000.00'))
+        self.assertEqual(
+            list(investment.lots.filter(remaining_units__gt=0).values_list('remaining_units', flat=True)),
+            [Decimal('5.00')]
+        )
+
+    @override_settings(LOT_METHOD='lifo')
+    def test_lifo_sell_realizes_gain_against_newest_lot(self):
+        """
+        Test that a LIFO sell consumes the newest lot first.
+        """
+        self.trade('buy', '10', 100)
+        self.trade('buy', '10', 200)
+        investment = self.trade('sell', '15', 300)['investment']
+        self.assertEqual(investment.realized_gain, Decimal('2000.00'))
+        self.assertEqual(investment.cost_basis, Decimal('500.00'))
+
+    @override_settings(LOT_METHOD='average')
+    def test_average_cost_sell(self):
+        """
+        Test that an average cost sell uses the pooled cost per unit.
+        """
+        self.trade('buy', '10', 100)
+        self.trade('buy', '10', 200)
+        investment = self.trade('sell', '15', 300)['investment']
+        self.assertEqual(investment.realized_gain, Decimal('2250.00'))
+        self.assertEqual(investment.cost_basis, Decimal('750.00'))
+
+    def test_rebuild_matches_incremental_totals(self):
+        """
+        Test that replaying the history gives the same totals as the order path.
+        """
+        self.trade('buy', '10', 100)
+        self.trade('buy', '10', 200)
+        investment = self.trade('sell', '15', 300)['investment']
+        call_command('rebuild_lots', stdout=StringIO())
+
+        investment.refresh_from_db()
+        self.assertEqual(investment.realized_gain, Decimal('2500.00'))
+        self.assertEqual(investment.cost_basis, Decimal('1000.00'))
+        self.assertEqual(investment.lots.count(), 2)
+
+    def test_gains_endpoint(self):
+        """
+        Test that the gains endpoint reports realized and unrealized totals.
+        """
+        self.trade('buy', '10', 100)
+        self.trade('sell', '4', 150)
+        response = self.client.get(reverse('account-gains', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['realized_gain'], Decimal('200.00'))
+        self.assertEqual(response.data['unrealized_gain'], Decimal('300.00'))
+
+class NavSeriesTest(SingleDatabaseTestCase):
+    """
+    Test suite for the daily NAV series.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user,
+            account=self.account,
+            permission=AccountPermissions.VIEW_ONLY
+            )
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+        self.start = self.today - timedelta(days=3)
+        self.investment = SimulatedInvestment.objects.create(
+            account=self.account, name='Apple', symbol='AAPL', units=Decimal('15.00')
+        )
+        SimulatedInvestment.objects.filter(pk=self.investment.pk).update(price_per_unit=Decimal('130.00'))
+        for offset, close in enumerate([100, 110, 120]):
+            DailyPrice.objects.create(symbol='AAPL', date=self.start + timedelta(days=offset), close=close)
+        self.buy(self.start, '10', '100.00')
+        self.buy(self.start + timedelta(days=2), '5', '120.00')
+
+    def buy(self, day, units, price):
+        """
+        Record a buy transaction at noon on the given day.
+        """
+        moment = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=12))
+        Transaction.objects.create(
+            user=self.user, account=self.account, investment=self.investment,
+            amount=Decimal(units) * Decimal(price), executed_price=Decimal(price),
+            transaction_date=moment, transaction_type='buy'
+        )
+
+    def test_nav_series_from_cumulative_positions(self):
+        """
+        Test that each closed day values the cumulative units at that day's close.
+        """
+        response = self.client.get(reverse('account-nav', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        navs = [point['nav'] for point in response.data['series']]
+        self.assertEqual(navs, [Decimal('1000.00'), Decimal('1100.00'), Decimal('1800.00'), Decimal('1950.00')])
+        self.assertEqual(DailyNav.objects.filter(account=self.account).count(), 3)
+
+    def test_closed_days_are_served_from_storage(self):
+        """
+        Test that stored closed days are reused and invalidated by new transactions.
+        """
+        nav_series(self.account)
+        DailyNav.objects.filter(account=self.account, date=self.start).update(nav=Decimal('1.00'))
+        self.assertEqual(nav_series(self.account)[0]['nav'], Decimal('1.00'))
+
+        self.buy(self.start, '1', '100.00')
+        self.assertEqual(nav_series(self.account)[0]['nav'], Decimal('1100.00'))
+
+    def test_invalid_date(self):
+        """
+        Test that an invalid date returns a 400 response.
+        """
+        url = reverse('account-nav', kwargs={'account_pk': self.account.pk})
+        response = self.client.get(url, {'start_date': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'start_date': '2024-02-30'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_start_is_clamped_to_first_transaction(self):
+        """
+        Test that days before the first transaction are neither returned nor stored.
+        """
+        url = reverse('account-nav', kwargs={'account_pk': self.account.pk})
+        response = self.client.get(url, {'start_date': (self.start - timedelta(days=30)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['series'][0]['date'], self.start)
+        self.assertFalse(DailyNav.objects.filter(account=self.account, date__lt=self.start).exists())
+
+    @override_settings(NAV_MAX_DAYS=30)
+    def test_long_ranges_are_rejected(self):
+        """
+        Test that a range longer than NAV_MAX_DAYS returns a 400 without storing anything.
+        """
+        url = reverse('account-nav', kwargs={'account_pk': self.account.pk})
+        response = self.client.get(url, {'start_date': '1000-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DailyNav.objects.exists())
+
+class RiskAnalyticsTest(SingleDatabaseTestCase):
+    """
+    Test suite for account risk analytics.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user,
+            account=self.account,
+            permission=AccountPermissions.FULL_ACCESS
+            )
+        self.client.force_authenticate(user=self.user)
+        investment = SimulatedInvestment.objects.create(
+            account=self.account, name='Apple', symbol='AAPL', units=Decimal('10.00')
+        )
+        SimulatedInvestment.objects.filter(pk=investment.pk).update(price_per_unit=Decimal('100.00'))
+        start = timezone.localdate() - timedelta(days=5)
+        closes = [100, 110, 99, 108.9, 98.01]
+        for offset, close in enumerate(closes):
+            day = start + timedelta(days=offset)
+            DailyPrice.objects.create(symbol='AAPL', date=day, close=close)
+            DailyPrice.objects.create(symbol='SPY', date=day, close=close / 2)
+
+    def test_max_drawdown(self):
+        """
+        Test that the drawdown is measured from the running peak.
+        """
+        self.assertAlmostEqual(max_drawdown(np.array([0.1, -0.5, 0.2])), 0.5)
+
+    def test_risk_endpoint(self):
+        """
+        Test volatility, drawdown and beta for a single-holding account.
+        """
+        response = self.client.get(reverse('account-risk', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['observations'], 4)
+        self.assertAlmostEqual(response.data['max_drawdown'], 0.109, places=6)
+        self.assertAlmostEqual(response.data['beta'], 1.0, places=3)
+        self.assertEqual(response.data['correlation'], [[1.0]])
+        self.assertEqual(response.data['historical_var'], Decimal('100.00'))
+        self.assertGreater(response.data['annualized_volatility'], 0)
+
+    def test_statistics_are_shared_and_invalidated(self):
+        """
+        Test that statistics are cached per universe and refreshed only on new
+        prices for its symbols.
+        """
+        first = universe_statistics(('AAPL', 'SPY'))
+        self.assertIs(universe_statistics(('SPY', 'AAPL')), first)
+        record_daily_price('MSFT', 300)
+        self.assertIs(universe_statistics(('AAPL', 'SPY')), first)
+        record_daily_price('AAPL', 97)
+        self.assertIsNot(universe_statistics(('AAPL', 'SPY')), first)
+
+    def test_invalid_confidence(self):
+        """
+        Test that an out of range confidence returns a 400 response.
+        """
+        url = reverse('account-risk', kwargs={'account_pk': self.account.pk})
+        response = self.client.get(url, {'confidence': '1.5'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProjectionTest(SingleDatabaseTestCase):
+    """
+    Test suite for Monte Carlo projections.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user,
+            account=self.account,
+            permission=AccountPermissions.FULL_ACCESS
+            )
+        self.client.force_authenticate(user=self.user)
+        for symbol in ('AAPL', 'MSFT'):
+            investment = SimulatedInvestment.objects.create(
+                account=self.account, name=symbol, symbol=symbol, units=Decimal('10.00')
+            )
+            SimulatedInvestment.objects.filter(pk=investment.pk).update(price_per_unit=Decimal('100.00'))
+        start = timezone.localdate() - timedelta(days=10)
+        for offset in range(10):
+            day = start + timedelta(days=offset)
+            DailyPrice.objects.create(symbol='AAPL', date=day, close=100 + offset)
+            DailyPrice.objects.create(symbol='MSFT', date=day, close=100 + (offset % 3))
+        self.url = reverse('account-projection', kwargs={'account_pk': self.account.pk})
+
+    def test_projection_is_seeded_and_memoized(self):
+        """
+        Test that a seeded projection returns bands and is served from cache on repeat.
+        """
+        params = {'paths': 500, 'years': 2, 'seed': 7, 'target': 2500}
+        first = self.client.get(self.url, params)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(first.data['cached'])
+        self.assertEqual(first.data['start_value'], Decimal('2000.00'))
+        self.assertEqual(len(first.data['percentiles']['50']), 3)
+        self.assertLessEqual(first.data['percentiles']['5'][-1], first.data['percentiles']['95'][-1])
+        self.assertLessEqual(first.data['probability_at_horizon'], first.data['probability_touched'])
+
+        second = self.client.get(self.url, params)
+        self.assertTrue(second.data['cached'])
+        self.assertEqual(second.data['percentiles'], first.data['percentiles'])
+
+    def test_projection_is_refreshed_only_by_held_prices(self):
+        """
+        Test that a new price for another symbol keeps the memoized projection
+        while a new price for a held symbol recomputes it.
+        """
+        params = {'paths': 500, 'years': 2, 'seed': 7}
+        self.client.get(self.url, params)
+        record_daily_price('SPY', 400)
+        self.assertTrue(self.client.get(self.url, params).data['cached'])
+        record_daily_price('AAPL', 120)
+        self.assertFalse(self.client.get(self.url, params).data['cached'])
+
+    def test_chunked_run_is_deterministic(self):
+        """
+        Test that chunking paths does not change a seeded result.
+        """
+        drift = np.array([0.001, 0.002])
+        factor = correlation_factor(np.array([[0.0004, 0.0001], [0.0001, 0.0009]]))
+        weights = np.array([0.5, 0.5])
+        first, _ = run_simulation(25000, 1, 3, drift, factor, weights, 100.0, None)
+        second, _ = run_simulation(25000, 1, 3, drift, factor, weights, 100.0, None)
+        self.assertEqual(first.shape, (25000, 2))
+        np.testing.assert_array_equal(first, second)
+
+    def test_invalid_paths(self):
+        """
+        Test that too many paths returns a 400 response.
+        """
+        response = self.client.get(self.url, {'paths': 10 ** 7})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_finite_target(self):
+        """
+        Test that NaN and infinite targets return a 400 response.
+        """
+        for target in ('NaN', 'Infinity', '-inf'):
+            response = self.client.get(self.url, {'target': target})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class BacktestTest(SingleDatabaseTestCase):
+    """
+    Test suite for strategy backtesting.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.start = date(2024, 1, 1)
+        for offset in range(60):
+            day = self.start + timedelta(days=offset)
+            DailyPrice.objects.create(symbol='AAPL', date=day, close=100 + offset)
+            DailyPrice.objects.create(symbol='MSFT', date=day, close=200 - offset)
+        self.url = reverse('backtest-list')
+
+    def test_sell_without_units_is_rejected(self):
+        """
+        Test that the engine applies the insufficient units rule.
+        """
+        portfolio = Portfolio(cash=0.0, units=np.zeros(1), contributed=0.0)
+        execute(portfolio, 0, 'sell', 5, 100.0)
+        self.assertEqual(portfolio.rejected_orders, 1)
+        self.assertEqual(portfolio.trades, 0)
+
+    def test_dca_accounts_for_deposits(self):
+        """
+        Test that dollar cost averaging deposits each period and buys whole cents of units.
+        """
+        prices = np.full((10, 1), 100.0)
+        summary = run_backtest('dca', prices, {'amount': 500, 'every': 5}, initial_cash=1000)
+        self.assertEqual(summary['contributed'], 1500.0)
+        self.assertAlmostEqual(summary['final_value'], 1500.0)
+        self.assertAlmostEqual(summary['total_return'], 0.0)
+        self.assertEqual(summary['trades'], 2)
+
+    def test_sweep_runs_and_persists_results(self):
+        """
+        Test that a parameter sweep stores one result per combination.
+        """
+        response = self.client.post(self.url, {
+            'strategy': 'ma_crossover',
+            'symbols': ['AAPL', 'MSFT'],
+            'start_date': '2024-01-01',
+            'end_date': '2024-02-29',
+            'sweep': {'short': [3, 5], 'long': [10, 20]},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(BacktestResult.objects.filter(user=self.user).count(), 4)
+        self.assertFalse(Transaction.objects.exists())
+        best = max(response.data, key=lambda result: result['final_value'])
+        self.assertGreater(Decimal(best['final_value']), Decimal('10000.00'))
+
+        listing = self.client.get(self.url, {'strategy': 'ma_crossover'})
+        self.assertEqual(len(listing.data), 4)
+
+    def test_invalid_params(self):
+        """
+        Test that invalid strategy params return a 400 response.
+        """
+        response = self.client.post(self.url, {
+            'strategy': 'ma_crossover',
+            'symbols': ['AAPL'],
+            'start_date': '2024-01-01',
+            'end_date': '2024-02-29',
+            'params': {'short': 30, 'long': 10},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_numeric_string_params(self):
+        """
+        Test that numeric string params are parsed to numbers before they are run and stored.
+        """
+        response = self.client.post(self.url, {
+            'strategy': 'dca',
+            'symbols': ['AAPL'],
+            'start_date': '2024-01-01',
+            'end_date': '2024-02-29',
+            'params': {'amount': '250.5', 'every': '5'},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BacktestResult.objects.get().params, {'amount': 250.5, 'every': 5})
+
+    def test_non_numeric_params(self):
+        """
+        Test that null, non-numeric, non-finite or out of range params and sweep
+        values return a 400 response.
+        """
+        for extra in (
+            {'params': {'every': None}},
+            {'params': {'weights': [1, None]}},
+            {'sweep': {'amount': [100, {}]}},
+            {'params': {'amount': 'inf', 'every': 1}},
+            {'params': {'amount': 'nan', 'every': 1}},
+            {'params': {'amount': '1e999', 'every': 1}},
+            {'params': {'amount': 'ten', 'every': 1}},
+            {'params': {'amount': 100, 'every': True}},
+            {'params': {'every': 2.5}},
+            {'params': {'every': 0}},
+            {'params': {'weights': [1, 'nan']}},
+            {'params': {'weights': [False]}},
+        ):
+            response = self.client.post(self.url, {
+                'strategy': 'dca',
+                'symbols': ['AAPL'],
+                'start_date': '2024-01-01',
+                'end_date': '2024-02-29',
+                **extra,
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class FxRateTest(SingleDatabaseTestCase):
+    """
+    Test suite for FX rates and currency conversion of reports.
+    """
+    def setUp(self):
+        clear_rates_cache()
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass')
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        apple = SimulatedInvestment.objects.create(
+            account=self.account, name='Apple', symbol='AAPL', units=Decimal('10.00')
+        )
+        SimulatedInvestment.objects.filter(pk=apple.pk).update(price_per_unit=Decimal('100.00'))
+
+    def test_rates_are_stored_and_cached(self):
+        """
+        Test that rates are fetched once from the provider and then served from the cache.
+        """
+        rates = get_rates()
+        self.assertEqual(rates['KES'], 140.0)
+        self.assertEqual(FxRate.objects.filter(base='USD', quote='KES').count(), 1)
+        with self.assertNumQueries(0):
+            get_rates()
+
+    def test_stale_rates_are_not_refetched_every_expiry(self):
+        """
+        Test that rates older than FX_MAX_AGE are served from the table after
+        one refresh, with the latest rate per currency.
+        """
+        get_rates()
+        FxRate.objects.create(base='USD', quote='KES', rate=Decimal('130'), as_of=timezone.now() - timedelta(days=3650))
+        clear_rates_cache()
+        with patch('transactions.fx.refresh_rates') as refresh:
+            rates = get_rates()
+        refresh.assert_not_called()
+        self.assertEqual(rates['KES'], 140.0)
+
+    @override_settings(ALPHA_VANTAGE_BASE_URL='http://market-data.test/query')
+    def test_alpha_vantage_provider_uses_configured_url(self):
+        """
+        Test that the Alpha Vantage FX provider queries ALPHA_VANTAGE_BASE_URL.
+        """
+        quote = {'Realtime Currency Exchange Rate': {'5. Exchange Rate': '2.0'}}
+        with patch('transactions.fx.requests.get') as get:
+            get.return_value.json.return_value = quote
+            rates = AlphaVantageFxProvider().fetch_rates('USD')
+        self.assertEqual(rates['rates']['KES'], 2.0)
+        self.assertEqual({call.args[0] for call in get.call_args_list}, {'http://market-data.test/query'})
+
+    def test_convert_many_across_currencies(self):
+        """
+        Test converting amounts in several currencies in one call.
+        """
+        converted = convert_many([140, 90, 10], ['KES', 'EUR', 'usd'], 'USD')
+        np.testing.assert_allclose(converted, [1.0, 100.0, 10.0])
+
+    def test_admin_view_reports_requested_currency(self):
+        """
+        Test that the admin report converts investments into the requested currency.
+        """
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('user-transactions-admin', args=[self.user.username])
+        response = self.client.get(url, {'currency': 'EUR'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['currency'], 'EUR')
+        self.assertEqual(response.data['total_investments_converted'], Decimal('900.00'))
+        self.assertEqual(response.data['total_investments_in_kes'], Decimal('140000.00'))
+
+    def test_gains_view_invalid_currency(self):
+        """
+        Test that an unknown currency returns a 400 response.
+        """
+        self.client.force_authenticate(user=self.user)
+        url = reverse('account-gains', args=[self.account.pk])
+        response = self.client.get(url, {'currency': 'XYZ'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+class ConditionalGetTest(SingleDatabaseTestCase):
+    """
+    Test suite for ETag and Last-Modified validators on polled endpoints.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transactions-list', kwargs={'account_pk': self.account.pk})
+
+    def test_unchanged_list_returns_not_modified(self):
+        """
+        Test that a matching If-None-Match returns 304 without running the list query.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_order_changes_validators(self):
+        """
+        Test that a simulated order invalidates the ETag of transactions and investments.
+        """
+        investments_url = reverse('investment-list')
+        etag = self.client.get(self.url)['ETag']
+        investments_etag = self.client.get(investments_url)['ETag']
+
+        process_transaction(self.user, self.account.pk, 'buy', Decimal('2'), 'AAPL')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get(investments_url, HTTP_IF_NONE_MATCH=investments_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_validators_follow_the_representation(self):
+        """
+        Test that fields, expansion and the renderer change the ETag while the
+        order of query parameters does not.
+        """
+        etag = self.client.get(self.url)['ETag']
+        fields = self.client.get(self.url + '?fields=id,amount&expand=investment')
+        self.assertNotEqual(fields['ETag'], etag)
+        self.assertIn('Accept', fields['Vary'])
+        reordered = self.client.get(self.url + '?expand=investment&fields=id,amount')
+        self.assertEqual(reordered['ETag'], fields['ETag'])
+
+        response = self.client.get(self.url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+class ResponseCacheTest(SingleDatabaseTestCase):
+    """
+    Test suite for cached responses and their invalidation.
+    """
+    def setUp(self):
+        cache.clear()
+        clear_rates_cache()
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass')
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        self.permission = AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse('user-transactions-admin', args=[self.user.username])
+
+    def test_admin_report_is_cached_until_an_order(self):
+        """
+        Test that the admin report is served from the cache and refreshed after an order.
+        """
+        self.assertEqual(self.client.get(self.url).data['investments'], [])
+        self.assertEqual(self.client.get(self.url).data['investments'], [])
+
+        process_transaction(self.user, self.account.pk, 'buy', Decimal('2'), 'AAPL')
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['investments']), 1)
+
+        stats = self.client.get(reverse('cache-stats')).data['views']['admin-transactions']
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_permission_change_invalidates_investments(self):
+        """
+        Test that changing a permission bumps the account's cache version.
+        """
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(reverse('investment-list'))['ETag']
+        self.permission.permission = AccountPermissions.VIEW_ONLY
+        self.permission.save()
+        self.assertNotEqual(self.client.get(reverse('investment-list'))['ETag'], etag)
+
+    def test_market_data_is_cached(self):
+        """
+        Test that repeated quotes for a symbol fetch market data once.
+        """
+        url = reverse('market-data', args=['quote'])
+        with patch('transactions.views.fetch_market_data', return_value={'symbol': 'AAPL', 'price': 150.0}) as fetch:
+            self.client.get(url, {'symbol': 'AAPL'})
+            response = self.client.get(url, {'symbol': 'aapl'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(fetch.call_count, 1)
+
+class SparseFieldsetTest(SingleDatabaseTestCase):
+    """
+    Test suite for ?fields= and ?expand= on transaction and investment lists.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        for _ in range(3):
+            process_transaction(self.user, self.account.pk, 'buy', Decimal('1'), 'AAPL')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transactions-list', kwargs={'account_pk': self.account.pk})
+
+    def test_fields_limit_output(self):
+        """
+        Test that only the requested fields are serialized.
+        """
+        response = self.client.get(self.url, {'fields': 'id,amount,transaction_date'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(set(response.data[0]), {'id', 'amount', 'transaction_date'})
+
+    def test_expand_investment_without_extra_queries(self):
+        """
+        Test that expanding the investment joins it instead of querying per row.
+        """
+        response = self.client.get(self.url, {'fields': 'id,units,investment', 'expand': 'investment'})
+        self.assertEqual(response.data[0]['investment']['symbol'], 'AAPL')
+        self.assertEqual(set(response.data[0]), {'id', 'units', 'investment'})
+
+        cache.clear()
+        # The account, the uncached access and the joined transactions
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'fields': 'id,units,investment', 'expand': 'investment'})
+
+    def test_investment_list_fields(self):
+        """
+        Test sparse fields on the investment list.
+        """
+        response = self.client.get(reverse('investment-list'), {'fields': 'symbol,units'})
+        self.assertEqual(response.data, [{'symbol': 'AAPL', 'units': '3.00'}])
+
+class RendererTest(SingleDatabaseTestCase):
+    """
+    Test suite for the orjson and MessagePack renderers and response compression.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        for _ in range(3):
+            process_transaction(self.user, self.account.pk, 'buy', Decimal('1'), 'AAPL')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transactions-list', kwargs={'account_pk': self.account.pk})
+
+    def test_encodes_decimal_and_datetime(self):
+        """
+        Test that both renderers encode Decimals and aware datetimes.
+        """
+        data = {'amount': Decimal('10.50'), 'at': datetime.fromisoformat('2024-09-17T08:30:00+00:00')}
+        self.assertEqual(
+            json.loads(OrjsonRenderer().render(data)),
+            {'amount': 10.5, 'at': '2024-09-17T08:30:00Z'},
+        )
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data)),
+            {'amount': '10.50', 'at': '2024-09-17T08:30:00Z'},
+        )
+
+    def test_renderer_selected_by_accept(self):
+        """
+        Test that the Accept header selects MessagePack and JSON stays the default.
+        """
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(len(msgpack.unpackb(response.content)), 3)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(json.loads(response.content)), 3)
+
+    @override_settings(COMPRESSION_MIN_SIZE=100)
+    def test_large_bodies_are_gzipped(self):
+        """
+        Test that bodies above COMPRESSION_MIN_SIZE are gzipped for clients accepting it.
+        """
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 3)
+
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+class AdminChangelistTest(SingleDatabaseTestCase):
+    """
+    Test suite for the admin changelists on large tables.
+    """
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        """
+        Create accounts with members, investments and transactions without fetching prices.
+        """
+        for i in range(count):
+            user = User.objects.create_user(username=f'member{User.objects.count()}', password='testpass')
+            account = Account.objects.create(name=f'Account {Account.objects.count()}')
+            account.users.add(user, self.admin)
+            investment = SimulatedInvestment.objects.bulk_create([SimulatedInvestment(
+                account=account, name='Apple', symbol='AAPL', price_per_unit=Decimal('10.00'),
+                units=Decimal('2.00'), transaction_type='buy',
+            )])[0]
+            Transaction.objects.create(user=user, account=account, investment=investment, amount=Decimal('20.00'))
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_fixed_queries_per_page(self):
+        """
+        Test that changelist pages run the same number of queries as the tables grow.
+        """
+        for name in ('simulatedinvestment', 'transaction'):
+            url = reverse(f'admin:transactions_{name}_changelist')
+            self.add_rows(3)
+            self.client.get(url)
+            small, _ = self.changelist_queries(url)
+            self.add_rows(12)
+            large, _ = self.changelist_queries(url)
+            self.assertEqual(small, large, name)
+
+    def test_total_value_kes_computed_in_database(self):
+        """
+        Test that the KES value is annotated and paginated pages keep their order.
+        """
+        self.add_rows(12)
+        kes_rate = get_rates(settings.FX_BASE_CURRENCY)['KES']
+        with patch.object(admin.site._registry[SimulatedInvestment], 'list_per_page', 5):
+            _, response = self.changelist_queries(reverse('admin:transactions_simulatedinvestment_changelist') + '?p=2')
+        self.assertContains(response, f'KES {20 * kes_rate:,.2f}')
+        self.assertEqual(response.context['cl'].result_count, 12)
+        self.assertEqual(
+            [obj.pk for obj in response.context['cl'].result_list],
+            list(SimulatedInvestment.objects.order_by('-pk').values_list('pk', flat=True)[5:10]),
+        )
+
+class RevaluationTest(SingleDatabaseTestCase):
+    """
+    Test suite for bulk revaluation of holdings.
+    """
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.investments = SimulatedInvestment.objects.bulk_create([
+            SimulatedInvestment(
+                account=self.account, name=symbol, symbol=symbol, price_per_unit=Decimal('1.00'),
+                units=Decimal('1.00'), transaction_type='buy',
+            )
+            for symbol in ('AAPL', 'AAPL', 'AAPL', 'MSFT', 'MSFT', 'NOPE')
+        ])
+        self.prices = {'AAPL': {'price': 150.456}, 'MSFT': {'price': 300.0}, 'NOPE': {'error': 'Price data not found in JSON file'}}
+
+    def test_command_fetches_each_symbol_once(self):
+        """
+        Test that revaluation fetches one price per symbol and updates every holding.
+        """
+        out = StringIO()
+        with patch('transactions.revaluation.fetch_market_data', side_effect=self.prices.get) as fetch:
+            call_command('revalue_holdings', stdout=out, stderr=StringIO())
+        self.assertEqual(sorted(call.args[0] for call in fetch.call_args_list), ['AAPL', 'MSFT', 'NOPE'])
+        self.assertEqual(
+            list(SimulatedInvestment.objects.order_by('pk').values_list('price_per_unit', flat=True)),
+            [Decimal('150.46')] * 3 + [Decimal('300.00')] * 2 + [Decimal('1.00')],
+        )
+        self.assertIn('Revalued 5 holdings across 2 symbols.', out.getvalue())
+        self.assertEqual(Account.objects.get(pk=self.account.pk).version, self.account.version + 1)
+
+    def test_admin_action_revalues_selection(self):
+        """
+        Test that the admin action only revalues the selected holdings.
+        """
+        self.client.force_login(self.admin)
+        selected = [self.investments[0].pk, self.investments[3].pk]
+        with patch('transactions.revaluation.fetch_market_data', side_effect=self.prices.get) as fetch:
+            response = self.client.post(
+                reverse('admin:transactions_simulatedinvestment_changelist'),
+                {'action': 'revalue', '_selected_action': selected},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(
+            set(SimulatedInvestment.objects.filter(price_per_unit=Decimal('1.00')).values_list('pk', flat=True)),
+            {investment.pk for investment in self.investments} - set(selected),
+        )
+
+class ReplicaRoutingTest(SingleDatabaseTestCase):
+    """
+    Test suite for read replica routing with read-your-writes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transactions-list', kwargs={'account_pk': self.account.pk})
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_router(self):
+        """
+        Test that only reads inside read_from_replicas() leave the primary.
+        """
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Transaction), 'default')
+        with read_from_replicas():
+            self.assertEqual(router.db_for_read(Transaction), 'replica_1')
+            self.assertEqual(router.db_for_write(Transaction), 'default')
+        self.assertFalse(router.allow_migrate('replica_1', 'transactions'))
+
+    def test_replicas_require_shared_cache(self):
+        """
+        Test that replicas with a per-process cache fail the system checks.
+        """
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(DATABASE_REPLICAS=['replica_1'], CACHES=locmem):
+            self.assertEqual([error.id for error in shared_cache_check(None)], ['InvestmentManagerAPI.E001'])
+        with override_settings(DATABASE_REPLICAS=['replica_1'], CACHES=redis):
+            self.assertEqual(shared_cache_check(None), [])
+        with override_settings(CACHES=locmem):
+            self.assertEqual(shared_cache_check(None), [])
+
+    @override_settings(DATABASE_REPLICAS=['missing_replica'])
+    def test_reads_after_own_write_use_primary(self):
+        """
+        Test that a user's reads stay on the primary right after a write.
+        """
+        response = self.client.put(reverse('select-account', kwargs={'pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(recently_wrote(self.user.pk))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Set DATABASE_REPLICA_URLS to run against a replica alias.')
+class ReplicaReadTest(APITransactionTestCase):
+    """
+    Test suite reading through a configured replica alias, which tests mirror
+    to the default database; data is committed so the replica connection sees it.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account', shard='default')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transactions-list', kwargs={'account_pk': self.account.pk})
+
+    def test_list_reads_from_replica(self):
+        """
+        Test that list queries run on the replica until the user writes.
+        """
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with CaptureQueriesContext(replica) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(queries)
+
+        self.client.put(reverse('select-account', kwargs={'pk': self.account.pk}))
+        with CaptureQueriesContext(replica) as queries:
+            self.client.get(self.url)
+        self.assertFalse(queries)
+
+class ShardRoutingTest(SingleDatabaseTestCase):
+    """
+    Test suite for routing account-scoped models to account shards.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.account = Account.objects.create(name='Test Account')
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard_1'])
+    def test_router(self):
+        """
+        Test that account-scoped models follow the account's shard and global models stay put.
+        """
+        Account.objects.filter(pk=self.account.pk).update(shard='shard_1')
+        clear_shard_cache(self.account.pk)
+        router = ShardRouter()
+        self.assertEqual(router.db_for_read(Transaction, instance=self.account), 'shard_1')
+        self.assertEqual(router.db_for_write(Transaction, instance=Transaction(account=self.account)), 'shard_1')
+        self.assertIsNone(router.db_for_read(Transaction))
+        self.assertIsNone(router.db_for_read(Account, instance=self.account))
+        with use_shard('default'):
+            self.assertEqual(router.db_for_read(SimulatedInvestment), 'default')
+        self.assertTrue(router.allow_migrate('shard_1', 'transactions', 'taxlot'))
+        self.assertFalse(router.allow_migrate('shard_1', 'transactions', 'dailyprice'))
+        self.assertIsNone(router.allow_migrate('default', 'transactions', 'dailyprice'))
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard_1'])
+    def test_requests_ignore_stale_shard_cache(self):
+        """
+        Test that requests route by the account they loaded, not a shard
+        cached before the account moved in another process.
+        """
+        user = User.objects.create_user(username='testuser', password='testpass')
+        self.account.users.add(user)
+        AccountPermissions.objects.create(user=user, account=self.account, permission=AccountPermissions.FULL_ACCESS)
+        Account.objects.filter(pk=self.account.pk).update(shard='default')
+        cache.set(shard_cache_key(self.account.pk), 'shard_1')
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(reverse('transactions-list', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('account-gains', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_shards_require_shared_cache(self):
+        """
+        Test that shards with a per-process cache fail the system checks.
+        """
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(DATABASE_SHARDS=['default', 'shard_1'], CACHES=locmem):
+            self.assertEqual([error.id for error in shared_cache_check(None)], ['InvestmentManagerAPI.E002'])
+
+    @override_settings(DATABASE_SHARDS=['default'])
+    def test_single_shard_is_transparent(self):
+        """
+        Test that routing is off and moves are no-ops with one shard.
+        """
+        self.assertIsNone(ShardRouter().db_for_read(Transaction, instance=self.account))
+        self.assertEqual(move_account(self.account.pk, 'default'), {})
+        with self.assertRaises(ValueError):
+            move_account(self.account.pk, 'shard_9')
+
+@skipUnless(len(settings.DATABASE_SHARDS) > 1, 'Set DATABASE_SHARD_URLS to run against a second shard.')
+class ShardedAccountTest(APITransactionTestCase):
+    """
+    Test suite trading on and moving an account between configured shards;
+    data is committed so each shard connection sees it.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.shard = settings.DATABASE_SHARDS[1]
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account', shard=self.shard)
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('transactions-list', kwargs={'account_pk': self.account.pk})
+
+    def test_trades_stay_on_account_shard_and_move(self):
+        """
+        Test that trades land on the account's shard and move with it.
+        """
+        with patch('transactions.utils_permissions.fetch_market_data', return_value={'price': 100}), \
+                patch('transactions.models.fetch_market_data', return_value={'price': 100}):
+            process_transaction(self.user, self.account.pk, 'buy', Decimal('10'), 'AAPL')
+            process_transaction(self.user, self.account.pk, 'sell', Decimal('4'), 'AAPL')
+        self.assertEqual(Transaction.objects.using(self.shard).count(), 2)
+        self.assertFalse(Transaction.objects.using('default').exists())
+        self.assertEqual(len(self.client.get(self.url).data), 2)
+        DailyNav.objects.using(self.shard).create(
+            account=self.account, date=timezone.localdate() + timedelta(days=1), nav=Decimal('600')
+        )
+
+        counts = move_account(self.account.pk, 'default')
+        self.assertEqual(counts['transaction'], 2)
+        self.assertFalse(Transaction.objects.using(self.shard).exists())
+        # Deleting the originals must not invalidate the copied NAV points
+        self.assertTrue(DailyNav.objects.using('default').filter(account=self.account).exists())
+        investment = SimulatedInvestment.objects.using('default').get(account=self.account)
+        self.assertEqual(investment.units, Decimal('6'))
+        self.assertTrue(TaxLot.objects.using('default').filter(investment=investment).exists())
+        self.assertEqual(len(self.client.get(self.url).data), 2)
+
+    def test_lot_writes_run_in_a_shard_transaction(self):
+        """
+        Test that closing and rebuilding lots open their transaction on the account's shard.
+        """
+        with patch('transactions.utils_permissions.fetch_market_data', return_value={'price': 100}), \
+                patch('transactions.models.fetch_market_data', return_value={'price': 100}):
+            process_transaction(self.user, self.account.pk, 'buy', Decimal('10'), 'AAPL')
+            process_transaction(self.user, self.account.pk, 'sell', Decimal('4'), 'AAPL')
+        investment = SimulatedInvestment.objects.using(self.shard).get(account=self.account)
+
+        def in_shard_transaction(*args):
+            self.assertTrue(connections[self.shard].in_atomic_block)
+            return consume_lots(*args)
+
+        with patch('transactions.lots.consume_lots', side_effect=in_shard_transaction) as consume:
+            rebuild_lots(investment)
+            close_lots(investment, Decimal('2'), Decimal('110'))
+        self.assertEqual(consume.call_count, 2)
+        self.assertEqual(TaxLot.objects.using(self.shard).filter(investment=investment).count(), 1)
+
+class AsyncViewTest(SingleDatabaseTestCase):
+    """
+    Test suite for the async read views.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.other = User.objects.create_user(username='otheruser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user, self.other)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        AccountPermissions.objects.create(
+            user=self.other, account=self.account, permission=AccountPermissions.POST_ONLY
+        )
+        investment = SimulatedInvestment.objects.create(
+            account=self.account, name='Apple', symbol='AAPL',
+            price_per_unit=Decimal('100'), units=10, transaction_type='buy'
+        )
+        for amount in ('1000', '500'):
+            Transaction.objects.create(
+                user=self.user, account=self.account, investment=investment,
+                amount=Decimal(amount), transaction_type='buy'
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def test_async_lists_match_sync_views(self):
+        """
+        Test that the async views return the same data as their sync versions.
+        """
+        pairs = (
+            ('user-transactions', 'async-user-transactions', {'account_pk': self.account.pk}),
+            ('investment-list', 'async-investments', {}),
+        )
+        for sync_name, async_name, kwargs in pairs:
+            expected = self.client.get(reverse(sync_name, kwargs=kwargs))
+            response = self.client.get(reverse(async_name, kwargs=kwargs))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, expected.data)
+            self.assertEqual(response['ETag'], expected['ETag'])
+
+        response = self.client.get(
+            reverse('async-transactions', kwargs={'account_pk': self.account.pk}), {'fields': 'id,units'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([set(row) for row in response.data], [{'id', 'units'}] * 2)
+
+    def test_async_permissions_and_validators(self):
+        """
+        Test that async views enforce account permissions and answer 304.
+        """
+        url = reverse('async-user-transactions', kwargs={'account_pk': self.account.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        missing = reverse('async-user-transactions', kwargs={'account_pk': self.account.pk + 100})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_market_data_is_cached(self):
+        """
+        Test that the async market data view fetches once and serves the cache after.
+        """
+        url = reverse('async-market-data', kwargs={'data_type': 'intraday'})
+        with patch('transactions.views.fetch_market_data', return_value={'price': 101.5}) as fetch:
+            first = self.client.get(url, {'symbol': 'AAPL'})
+            second = self.client.get(url, {'symbol': 'aapl'})
+        self.assertEqual(json.loads(first.content), {'price': 101.5})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(fetch.call_count, 1)
+
+class BenchmarkTest(SingleDatabaseTestCase):
+    """
+    Test suite for the API benchmark helpers.
+    """
+
+    def test_market_data_stub_serves_quotes_and_history(self):
+        """
+        Test that market data calls are answered by the local stub.
+        """
+        with MarketDataStub({'AAPL': 123.45}) as stub, override_settings(ALPHA_VANTAGE_BASE_URL=stub.url):
+            self.assertEqual(fetch_market_data('AAPL'), {'price': 123.45})
+            self.assertEqual(len(fetch_price_history('AAPL')['prices']), 250)
+
+    def test_compare_flags_regressions(self):
+        """
+        Test that slower, lower throughput or chattier scenarios are reported.
+        """
+        before = {'rps': 100, 'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 12, 'queries_per_request': 3}
+        baseline = {'scenarios': {'steady': before, 'slow': before, 'chatty': before}}
+        results = {
+            'steady': dict(before, p95_ms=11, rps=95),
+            'slow': dict(before, p95_ms=20, rps=50),
+            'chatty': dict(before, queries_per_request=4),
+            'new': before,
+        }
+        comparison = compare(results, baseline, tolerance=0.25)
+        self.assertEqual(comparison['steady']['regressions'], [])
+        self.assertEqual(comparison['slow']['regressions'], ['p95_ms', 'rps'])
+        self.assertEqual(comparison['chatty']['regressions'], ['queries_per_request'])
+        self.assertNotIn('new', comparison)
+
+class QueryBudgetTest(QueryBudgetAssertions, SingleDatabaseTestCase):
+    """
+    Test suite holding the main endpoints to their query budgets on a seeded dataset.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with open(settings.BASE_DIR / 'stock_prices.json', encoding='utf-8') as file:
+            cls.symbols = json.load(file)['stocks']
+        cls.fixture = seed(60, 20, 3000, cls.symbols, random.Random(0))
+        analyze()
+
+    def setUp(self):
+        cache.clear()
+        entry = self.fixture['accounts'][0]
+        self.account, self.user = entry['account'], entry['members'][0]
+
+    def test_endpoints_stay_within_budget(self):
+        """
+        Test that every budgeted endpoint stays within its query budget.
+        """
+        with MarketDataStub(self.symbols) as stub, override_settings(ALPHA_VANTAGE_BASE_URL=stub.url):
+            for user, method, path, data in budget_requests(self.fixture):
+                with self.subTest(method=method, path=path, data=data):
+                    self.client.force_authenticate(user=user)
+                    self.client.force_login(user)
+                    response = self.assertWithinQueryBudget(method, path, data)
+                    self.assertLess(response.status_code, 400)
+
+    def test_overruns_and_undeclared_endpoints_are_reported(self):
+        """
+        Test that exceeding a budget is reported and endpoints without one are refused.
+        """
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-transactions', kwargs={'account_pk': self.account.pk})
+        with patch.object(UserTransactionsView, 'query_budgets', {'get': QueryBudget(1)}):
+            _, violations, queries = check_request(self.client, 'get', url)
+        self.assertEqual(violations, [f'{len(queries)} queries, budget 1'])
+        with self.assertRaises(LookupError):
+            check_request(self.client, 'get', reverse('cache-stats'))
+
+    def test_seq_scans_are_found_in_nested_plans(self):
+        """
+        Test that sequential scans are collected from every level of a plan.
+        """
+        plan = {'Node Type': 'Hash Join', 'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'transactions_transaction'},
+            {'Node Type': 'Hash', 'Plans': [{'Node Type': 'Index Scan', 'Relation Name': 'accounts_account'}]},
+        ]}
+        self.assertEqual(seq_scans(plan), {'transactions_transaction'})
+
+class ProfilingTest(SingleDatabaseTestCase):
+    """
+    Test suite for request profiling and the metrics endpoint.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass', is_staff=True)
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.user)
+        AccountPermissions.objects.create(
+            user=self.user, account=self.account, permission=AccountPermissions.FULL_ACCESS
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.user)['access']}")
+
+    def timings(self, response):
+        return {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+
+    def test_server_timing_reports_request_phases(self):
+        """
+        Test that the Server-Timing header times auth, permissions, queries and rendering.
+        """
+        response = self.client.get(reverse('transactions-list', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'auth', 'permissions', 'db', 'render', 'total'})
+        self.assertRegex(timings['db'], r'^db;dur=[0-9.]+;desc="[0-9]+ queries"$')
+
+    def test_server_timing_reports_market_data_calls_and_cache(self):
+        """
+        Test that upstream market data calls and their cache lookups are reported.
+        """
+        url = reverse('market-data', kwargs={'data_type': 'intraday'})
+        with MarketDataStub({'AAPL': 150.0}) as stub, override_settings(ALPHA_VANTAGE_BASE_URL=stub.url):
+            first = self.timings(self.client.get(url, {'symbol': 'AAPL'}))
+            second = self.timings(self.client.get(url, {'symbol': 'AAPL'}))
+        self.assertIn('desc="1 calls"', first['market_data'])
+        self.assertEqual(first['cache'], 'cache;desc="market-data:miss"')
+        self.assertNotIn('market_data', second)
+        self.assertEqual(second['cache'], 'cache;desc="market-data:hit"')
+
+    def test_metrics_are_exposed_per_route(self):
+        """
+        Test that /metrics reports request histograms by route and honours the token.
+        """
+        self.client.get(reverse('transactions-list', kwargs={'account_pk': self.account.pk}))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        route = 'transactions-list'
+        self.assertIn(f'investmanager_request_duration_seconds_bucket{{route="{route}",method="GET",le="+Inf"}}', body)
+        self.assertIn(f'investmanager_request_phase_seconds_count{{route="{route}",method="GET",phase="db"}}', body)
+        self.assertIn(f'investmanager_requests_total{{route="{route}",method="GET",status="200"}}', body)
+
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_timings_and_metrics_are_hidden_from_other_users(self):
+        """
+        Test that non-staff users get no Server-Timing header and no metrics.
+        """
+        member = User.objects.create_user(username='member', password='testpass')
+        self.account.users.add(member)
+        AccountPermissions.objects.create(user=member, account=self.account, permission=AccountPermissions.VIEW_ONLY)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(member)['access']}")
+
+        response = self.client.get(reverse('transactions-list', kwargs={'account_pk': self.account.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_sum_snapshots_of_other_processes(self):
+        """
+        Test that snapshots written by other worker processes are added to the output.
+        """
+        self.client.get(reverse('transactions-list', kwargs={'account_pk': self.account.pk}))
+        route = ('transactions-list', 'GET', '200')
+        own = registry.snapshot()['investmanager_requests_total'][route]
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            registry.flush(force=True)
+            os.rename(registry.snapshot_path(), registry.snapshot_path(pid='other'))
+            collected = registry.collect()
+        self.assertEqual(collected['investmanager_requests_total'][route], own * 2)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_profiling_can_be_disabled(self):
+        """
+        Test that no Server-Timing header is added when profiling is off.
+        """
+        response = self.client.get(reverse('transactions-list', kwargs={'account_pk': self.account.pk}))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+class RequestCaptureTest(SingleDatabaseTestCase):
+    """
+    Test suite for the sampling profiler and request captures.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        settings_override = override_settings(PROFILE_DIR=self.profile_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.staff = User.objects.create_user(username='staffuser', password='testpass', is_staff=True)
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.account = Account.objects.create(name='Test Account')
+        self.account.users.add(self.staff, self.user)
+        for user in (self.staff, self.user):
+            AccountPermissions.objects.create(user=user, account=self.account, permission=AccountPermissions.FULL_ACCESS)
+        self.url = reverse('user-transactions', kwargs={'account_pk': self.account.pk})
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(user)['access']}")
+
+    def test_staff_header_captures_request(self):
+        """
+        Test that the profiling header captures staff requests with their SQL.
+        """
+        self.authenticate(self.staff)
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        capture = RequestCapture.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((capture.reason, capture.route, capture.user), ('header', 'user-transactions', self.staff))
+        self.assertTrue(capture.queries)
+        self.assertIn('db', capture.timings)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_capture_records_sql_without_profiling(self):
+        """
+        Test that captures keep their SQL and timings when request profiling is off.
+        """
+        self.authenticate(self.staff)
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertFalse(response.has_header('Server-Timing'))
+        capture = RequestCapture.objects.get(pk=response['X-Profile-Id'])
+        self.assertTrue(any('transactions_transaction' in query['sql'] for query in capture.queries))
+        self.assertIn('db', capture.timings)
+
+    def test_storing_capture_is_not_timed(self):
+        """
+        Test that storing a capture adds no queries to the request's timings.
+        """
+        self.authenticate(self.staff)
+        self.client.get(self.url)
+        plain = self.client.get(self.url)
+        captured = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertTrue(captured.has_header('X-Profile-Id'))
+        queries = [
+            re.search(r'desc="([0-9]+) queries"', response['Server-Timing']).group(1)
+            for response in (plain, captured)
+        ]
+        self.assertEqual(queries[0], queries[1])
+        capture = RequestCapture.objects.get(pk=captured['X-Profile-Id'])
+        self.assertFalse(any('transactions_requestcapture' in query['sql'] for query in capture.queries))
+
+    def test_header_is_ignored_for_other_users(self):
+        """
+        Test that non-staff users cannot trigger the profiler.
+        """
+        self.authenticate(self.user)
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertFalse(RequestCapture.objects.exists())
+
+    def test_slow_requests_are_captured(self):
+        """
+        Test that requests over the threshold are captured and the oldest captures pruned.
+        """
+        self.authenticate(self.user)
+        with override_settings(SLOW_REQUEST_THRESHOLD=1e-9, PROFILE_MAX_CAPTURES=1):
+            self.client.get(self.url)
+            self.client.get(self.url)
+        capture = RequestCapture.objects.get()
+        self.assertEqual(capture.reason, 'slow')
+        self.assertTrue(any('transactions_transaction' in query['sql'] for query in capture.queries))
+
+        with override_settings(SLOW_REQUEST_THRESHOLD=60):
+            self.client.get(self.url)
+        self.assertEqual(RequestCapture.objects.count(), 1)
+
+    def test_sampler_records_folded_stacks(self):
+        """
+        Test that watched threads are sampled and their stacks browsable from the admin.
+        """
+        def spin():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+        with override_settings(PROFILER_INTERVAL=0.001):
+            watch = sampler.watch()
+            spin()
+            sampler.unwatch(watch)
+        self.assertGreater(watch.samples, 0)
+        frames = [label for label, _, _ in top_frames(folded(watch.stacks))]
+        self.assertTrue(any(label.startswith('spin (transactions/test_transactions.py:') for label in frames))
+
+        request = APIClient().get(self.url).wsgi_request
+        capture = save_capture(request, HttpResponse(), 'sampled', 0.1, watch=watch)
+        with open(capture.stacks_path, encoding='utf-8') as file:
+            self.assertRegex(file.readline(), r'^[^ ].*;spin \(.*\) [0-9]+\n$')
+
+        admin_user = User.objects.create_superuser('admin', password='adminpass')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:transactions_requestcapture_change', args=[capture.pk]))
+        self.assertContains(response, 'spin (transactions/test_transactions.py:')
+        response = self.client.get(reverse('admin:transactions_requestcapture_stacks', args=[capture.pk]))
+        self.assertEqual(b''.join(response.streaming_content).decode(), folded(watch.stacks))
+
+        capture.delete()
+        self.assertFalse(os.path.exists(capture.stacks_path))
@@ -5,7 +5,17 @@ from .views import (
      UserTransactionsAdminView,
     SimulatedInvestmentTransactionView,
     PerformanceView,InvestmentViewSet,
-    UserTransactionsView
+    UserTransactionsView,
+    GainsView,
+    NavView,
+    RiskView,
+    ProjectionView,
+    BacktestViewSet,
+    CacheStatsView,
+    AsyncTransactionListView,
+    AsyncUserTransactionsView,
+    AsyncInvestmentListView,
+    AsyncPerformanceView
     )
 
 
@@ -15,6 +25,7 @@ r'accounts/(?P<account_pk>\d+)/transactions',
  TransactionViewSet,
  basename='transactions')
 router.register(r'investments', InvestmentViewSet, basename='investment')
+router.register(r'backtests', BacktestViewSet, basename='backtest')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -33,6 +44,40 @@ urlpatterns = [
         UserTransactionsView.as_view(),
         name='user-transactions'
         ),
+    path(
+        'accounts/<int:account_pk>/gains/',
+        GainsView.as_view(),
+        name='account-gains'
+        ),
+    path(
+        'accounts/<int:account_pk>/nav/',
+        NavView.as_view(),
+        name='account-nav'
+        ),
+    path(
+        'accounts/<int:account_pk>/risk/',
+        RiskView.as_view(),
+        name='account-risk'
+        ),
+    path(
+        'accounts/<int:account_pk>/projection/',
+        ProjectionView.as_view(),
+        name='account-projection'
+        ),
     path('market-data/<str:data_type>/',  PerformanceView.as_view(),
          name='market-data'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path(
+        'async/accounts/<int:account_pk>/transactions/',
+        AsyncTransactionListView.as_view(),
+        name='async-transactions'
+        ),
+    path(
+        'async/user-transactions/<int:account_pk>/',
+        AsyncUserTransactionsView.as_view(),
+        name='async-user-transactions'
+        ),
+    path('async/investments/', AsyncInvestmentListView.as_view(), name='async-investments'),
+    path('async/market-data/<str:data_type>/', AsyncPerformanceView.as_view(),
+         name='async-market-data'),
 ]
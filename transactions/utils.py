@@ -1,22 +1,27 @@
 import os
 import json
+import logging
 from decimal import Decimal
 import requests
 from dotenv import load_dotenv
+from django.conf import settings
+from InvestmentManagerAPI.profiling import timed
 from requests.exceptions import HTTPError, ConnectionError, Timeout
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
-ALPHA_VANTAGE_BASE_URL = os.getenv('ALPHA_VANTAGE_BASE_URL')
 JSON_FILE_PATH = os.getenv('JSON_FILE_PATH', 'stock_prices.json')
 
+@timed('market_data')
 def fetch_market_data(symbol):
     """
     Fetch real-time or simulated market data for a given symbol.
     """
-    base_url = 'https://www.alphavantage.co/query'
+    base_url = settings.ALPHA_VANTAGE_BASE_URL
     params = {
         'apikey': ALPHA_VANTAGE_API_KEY,
         'function': 'GLOBAL_QUOTE',
@@ -29,7 +34,7 @@ def fetch_market_data(symbol):
         if 'Global Quote' in data and '05. price' in data['Global Quote']:
             return {'price': float(data['Global Quote']['05. price'])}
     except (HTTPError, ConnectionError, Timeout) as e:
-        print(f"Alpha Vantage error: {e}")
+        logger.warning("Alpha Vantage error for %s: %s", symbol, e)
     try:
         with open(JSON_FILE_PATH, 'r',encoding='utf-8') as file:
             market_data = json.load(file)
@@ -43,9 +48,57 @@ def fetch_market_data(symbol):
     except json.JSONDecodeError:
         return {'error': 'Error decoding JSON file'}
 
+@timed('market_data')
+def fetch_price_history(symbol):
+    """
+    Fetch daily closing prices for a given symbol.
+
+    Falls back to the single day stored in the JSON file when Alpha Vantage
+    is unavailable.
+    """
+    base_url = settings.ALPHA_VANTAGE_BASE_URL
+    params = {
+        'apikey': ALPHA_VANTAGE_API_KEY,
+        'function': 'TIME_SERIES_DAILY',
+        'symbol': symbol,
+        'outputsize': 'full'
+    }
+    try:
+        response = requests.get(base_url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        series = data.get('Time Series (Daily)')
+        if series:
+            return {'prices': {day: float(values['4. close']) for day, values in series.items()}}
+    except (HTTPError, ConnectionError, Timeout) as e:
+        logger.warning("Alpha Vantage error for %s: %s", symbol, e)
+    try:
+        with open(JSON_FILE_PATH, 'r',encoding='utf-8') as file:
+            market_data = json.load(file)
+            stocks = market_data.get('stocks', {})
+            if symbol in stocks and 'date' in market_data:
+                return {'prices': {market_data['date']: stocks[symbol]}}
+            else:
+                return {'error': 'Price data not found in JSON file'}
+    except FileNotFoundError:
+        return {'error': 'JSON file not found'}
+    except json.JSONDecodeError:
+        return {'error': 'Error decoding JSON file'}
+
 def calculate_investment_value(amount, price_per_unit):
     """
     Calculate the value of an investment.
     """
     return Decimal(amount) * Decimal(price_per_unit)
 
+def apply_order(units_held, transaction_type, units):
+    """
+    Return the units held after a buy or sell, enforcing the simulation rules.
+    """
+    if transaction_type == 'buy':
+        return units_held + units
+    if transaction_type == 'sell':
+        if units_held < units:
+            raise ValueError("Not enough units to sell.")
+        return units_held - units
+    raise ValueError("Invalid transaction type")
@@ -0,0 +1,81 @@
+from decimal import Decimal
+from itertools import product
+import numpy as np
+from django.conf import settings
+from .backtest import run_backtest
+from .models import BacktestResult, DailyPrice
+from .prices import price_matrix
+from .simulation import get_executor
+from .valuation import to_decimal
+
+def expand_sweep(params, sweep):
+    """
+    Expand a mapping of parameter names to candidate values into parameter sets.
+
+    Raises:
+        ValueError: If the sweep is malformed or exceeds BACKTEST_MAX_RUNS.
+    """
+    params = dict(params or {})
+    if not sweep:
+        return [params]
+    if not isinstance(sweep, dict) or not all(isinstance(values, list) and values for values in sweep.values()):
+        raise ValueError('Sweep must map parameter names to non-empty lists of values')
+    names = list(sweep)
+    runs = [dict(params, **dict(zip(names, values))) for values in product(*sweep.values())]
+    if len(runs) > settings.BACKTEST_MAX_RUNS:
+        raise ValueError(f'A sweep may not exceed {settings.BACKTEST_MAX_RUNS} runs')
+    return runs
+
+def backtest_prices(symbols, start, end):
+    """
+    Load the trading days and forward-filled price matrix for a date range.
+    """
+    dates = list(
+        DailyPrice.objects.filter(symbol__in=symbols, date__range=(start, end))
+        .order_by('date')
+        .values_list('date', flat=True)
+        .distinct()
+    )
+    return dates, np.nan_to_num(price_matrix(symbols, dates))
+
+def run_backtests(user, strategy, symbols, start, end, initial_cash, params_list):
+    """
+    Replay a strategy for every parameter set and store the summaries.
+
+    Prices are loaded once and shared by every run. Sweeps with more than
+    one run are spread across the process pool; live tables are never written.
+
+    Returns:
+        list[BacktestResult]: The stored results in parameter order.
+    """
+    dates, prices = backtest_prices(symbols, start, end)
+    if len(dates) < 2:
+        raise ValueError('At least two days of price history are required in the date range')
+
+    arguments = [(strategy, prices, params, float(initial_cash)) for params in params_list]
+    if len(arguments) > 1:
+        summaries = list(get_executor(settings.SIMULATION_WORKERS).map(run_backtest, *zip(*arguments)))
+    else:
+        summaries = [run_backtest(*arguments[0])]
+
+    results = [
+        BacktestResult(
+            user=user,
+            strategy=strategy,
+            symbols=list(symbols),
+            params=summary['params'],
+            start_date=dates[0],
+            end_date=dates[-1],
+            initial_cash=Decimal(initial_cash),
+            contributed=to_decimal(summary['contributed']),
+            final_value=to_decimal(summary['final_value']),
+            total_return=summary['total_return'],
+            cagr=summary['cagr'],
+            volatility=summary['volatility'],
+            max_drawdown=summary['max_drawdown'],
+            trades=summary['trades'],
+            rejected_orders=summary['rejected_orders'],
+        )
+        for summary in summaries
+    ]
+    return BacktestResult.objects.bulk_create(results)
@@ -1,24 +1,38 @@
 from django.core.exceptions import PermissionDenied
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.db import IntegrityError, transaction
 from decimal import Decimal
 from rest_framework.exceptions import ValidationError
-from accounts.models import Account, AccountPermissions
+from accounts.models import AccountPermissions
+from accounts.permissions import get_access
 from .models import Transaction, SimulatedInvestment
-from .utils import fetch_market_data
+from .utils import apply_order, fetch_market_data
+from .lots import open_lot, close_lots
+from .prices import record_daily_price
+from InvestmentManagerAPI.sharding import account_shard, use_shard
 
-@transaction.atomic
-def process_transaction(user, account_pk, transaction_type, units, symbol):
+def process_transaction(user, account_pk, transaction_type, units, symbol, access=None):
     """
     Process a buy/sell transaction, including permission checks and investment updates.
+    An access already resolved for the request can be passed to skip the lookup.
+    The order runs in one database transaction on the account's shard.
     """
-    account = get_object_or_404(Account, pk=account_pk, users=user)
-    permission = AccountPermissions.objects.filter(user=user, account=account).first()
+    access = access or get_access(user, account_pk)
+    shard = account_shard(access.account)
+    with use_shard(shard), transaction.atomic(using=shard):
+        return execute_order(user, access, transaction_type, units, symbol)
+
+def execute_order(user, access, transaction_type, units, symbol):
+    """
+    Check the access to the account, then record the order and update the holding.
+    """
+    if not access.is_member:
+        raise Http404('No Account matches the given query.')
     
-    if permission is None:
+    if access.permission is None:
         raise PermissionDenied("You do not have permission to access this account")
 
-    if permission.permission == AccountPermissions.VIEW_ONLY:
+    if access.permission == AccountPermissions.VIEW_ONLY:
         raise PermissionDenied("You only have view permissions for this account")
 
     market_data = fetch_market_data(symbol)
@@ -34,32 +48,34 @@ def process_transaction(user, account_pk, transaction_type, units, symbol):
     except (ValueError, TypeError) as exc:
         raise ValidationError("Price data is invalid") from exc
 
-    investment= SimulatedInvestment.objects.get_or_create(
-        account=account,
+    investment, _ = SimulatedInvestment.objects.get_or_create(
+        account_id=access.account_id,
         symbol=symbol,
         defaults={'name': symbol, 'units': Decimal(0), 'price_per_unit': price_per_unit}
     )
 
     investment_value = Decimal(units) * price_per_unit  # Calculate value for transaction
 
-    if transaction_type == 'buy':
-        investment.units += Decimal(units)
-    elif transaction_type == 'sell':
-        if investment.units < Decimal(units):
-            raise ValueError("Not enough units to sell.")
-        investment.units -= Decimal(units)
-    
-    investment.save()  
+    investment.units = apply_order(investment.units, transaction_type, Decimal(units))
 
     transaction_record = Transaction(
         user=user,
-        account=account,
+        account_id=access.account_id,
         investment=investment,
         amount=investment_value,
+        executed_price=price_per_unit,
         transaction_type=transaction_type
     )
     transaction_record.save() 
 
+    if transaction_type == 'buy':
+        open_lot(investment, units, price_per_unit, transaction_record)
+    else:
+        close_lots(investment, units, price_per_unit)
+
+    investment.save()  
+    record_daily_price(symbol, price_per_unit)
+
     return {
         'investment': investment,
         'investment_value': investment_value
@@ -67,42 +83,47 @@ def process_transaction(user, account_pk, transaction_type, units, symbol):
 def create_transaction(user, account, investment, amount, transaction_type):
     """
     Creates a transaction with proper validation and checks.
+    The writes run in one database transaction on the account's shard.
     """
-    account_permission = AccountPermissions.objects.filter(user=user, account=account).first()
+    access = get_access(user, account.pk)
+    permission = access.permission
 
-    if not account_permission:
+    if not permission:
         raise PermissionDenied("You do not have permission to access this account.")
     
-    if account_permission.permission == AccountPermissions.VIEW_ONLY:
+    if permission == AccountPermissions.VIEW_ONLY:
         raise PermissionDenied("You only have view-only access to this account.")
     
-    if account_permission.permission == AccountPermissions.POST_ONLY and transaction_type == 'buy':
+    if permission == AccountPermissions.POST_ONLY and transaction_type == 'buy':
         raise PermissionDenied("You do not have permission to perform this action.")
 
     if investment:
+        shard = account_shard(access.account)
         try:
-            price_per_unit = Decimal(investment.price_per_unit)
-            amount = Decimal(amount)
-
-            if transaction_type == 'buy':
-                investment.units += amount / price_per_unit
-            elif transaction_type == 'sell':
-                if investment.units < amount / price_per_unit:
-                    raise ValueError("Not enough units to sell.")
-                investment.units -= amount / price_per_unit
-            else:
-                raise ValueError("Invalid transaction type")
-
-            investment.save()
-
-            new_transaction = Transaction(
-                user=user,
-                account=account,
-                investment=investment,
-                amount=amount,
-                transaction_type=transaction_type
-            )
-            new_transaction.save()
+            with use_shard(shard), transaction.atomic(using=shard):
+                price_per_unit = Decimal(investment.price_per_unit)
+                amount = Decimal(amount)
+
+                units = amount / price_per_unit
+
+                investment.units = apply_order(investment.units, transaction_type, units)
+
+                new_transaction = Transaction(
+                    user=user,
+                    account=account,
+                    investment=investment,
+                    amount=amount,
+                    executed_price=price_per_unit,
+                    transaction_type=transaction_type
+                )
+                new_transaction.save()
+
+                if transaction_type == 'buy':
+                    open_lot(investment, units, price_per_unit, new_transaction)
+                else:
+                    close_lots(investment, units, price_per_unit)
+
+                investment.save()
         except ValueError as exc:
             raise ValidationError("Invalid value provided") from exc
         except IntegrityError as exc:
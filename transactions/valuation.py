@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+from itertools import chain
+from accounts.models import Account
+from InvestmentManagerAPI.sharding import fan_out, sharding_enabled, shards_for
+from .models import SimulatedInvestment
+
+CENTS = Decimal('0.01')
+
+def to_decimal(value, places=CENTS):
+    """
+    Convert a float produced by the engine back into a Decimal for the API.
+    """
+    return Decimal(repr(float(value))).quantize(places, rounding=ROUND_HALF_UP)
+
+@dataclass
+class Holdings:
+    """
+    Column-oriented snapshot of simulated investment holdings.
+
+    Symbols and accounts are stored once and referenced by index so that
+    every per-holding column is a contiguous NumPy array.
+    """
+    ids: np.ndarray
+    names: list
+    symbols: np.ndarray
+    symbol_index: np.ndarray
+    accounts: np.ndarray
+    account_names: list
+    account_index: np.ndarray
+    units: np.ndarray
+    cost: np.ndarray
+    stored_prices: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    def price_vector(self, prices=None):
+        """
+        Build a price per symbol, preferring explicit quotes over stored prices.
+        """
+        vector = np.zeros(len(self.symbols), dtype=np.float64)
+        vector[self.symbol_index] = self.stored_prices
+        if prices:
+            for position, symbol in enumerate(self.symbols):
+                if symbol in prices:
+                    vector[position] = float(prices[symbol])
+        return vector
+
+def load_holdings(queryset=None, account_ids=None):
+    """
+    Load holdings for a set of accounts into NumPy arrays using a single query.
+
+    With several shards the holdings are read from each shard holding the
+    accounts and account names from the primary.
+    """
+    if queryset is None:
+        queryset = SimulatedInvestment.objects.all()
+    if account_ids is not None:
+        queryset = queryset.filter(account_id__in=account_ids)
+
+    if sharding_enabled():
+        rows = sharded_holding_rows(queryset, account_ids)
+    else:
+        rows = list(
+            queryset.order_by('transaction_date', 'id')
+            .values_list(
+                'id', 'name', 'symbol', 'account_id', 'account__name',
+                'units', 'price_per_unit', 'cost_basis'
+            )
+        )
+    columns = list(zip(*rows)) if rows else [()] * 8
+
+    symbols, symbol_index = np.unique(np.array(columns[2], dtype=str), return_inverse=True)
+    accounts, account_index = np.unique(np.array(columns[3], dtype=np.int64), return_inverse=True)
+    account_names = dict(zip(columns[3], columns[4]))
+
+    return Holdings(
+        ids=np.array(columns[0], dtype=np.int64),
+        names=list(columns[1]),
+        symbols=symbols,
+        symbol_index=symbol_index.astype(np.intp),
+        accounts=accounts,
+        account_names=[account_names[account_id] for account_id in accounts.tolist()],
+        account_index=account_index.astype(np.intp),
+        units=np.array(columns[5], dtype=np.float64),
+        cost=np.array(columns[7], dtype=np.float64),
+        stored_prices=np.array(columns[6], dtype=np.float64),
+    )
+
+def sharded_holding_rows(queryset, account_ids=None):
+    """
+    Read holding rows from the shards, without joining the account table they do not hold.
+    """
+    aliases = shards_for(account_ids) if account_ids is not None else None
+    rows = sorted(
+        chain.from_iterable(fan_out(
+            lambda alias: list(queryset.using(alias).values_list(
+                'transaction_date', 'id', 'name', 'symbol', 'account_id',
+                'units', 'price_per_unit', 'cost_basis'
+            )),
+            aliases,
+        )),
+        key=lambda row: (row[0], row[1]),
+    )
+    names = dict(Account.objects.filter(pk__in={row[4] for row in rows}).values_list('pk', 'name'))
+    return [(*row[1:5], names.get(row[4], ''), *row[5:]) for row in rows]
+
+@dataclass
+class Valuation:
+    """
+    Result of valuing a set of holdings against a price vector.
+    """
+    holdings: Holdings
+    prices: np.ndarray
+    market_value: np.ndarray
+    unrealized_pnl: np.ndarray
+    weights: np.ndarray
+    converted_value: np.ndarray
+    account_totals: np.ndarray
+    fx_rate: float
+
+    @property
+    def total_value(self):
+        """
+        Total market value of every holding.
+        """
+        return to_decimal(self.market_value.sum())
+
+    @property
+    def total_converted_value(self):
+        """
+        Total market value of every holding after currency conversion.
+        """
+        return to_decimal(self.converted_value.sum())
+
+    def rows(self):
+        """
+        Yield one dict per holding with values converted back to Decimal.
+        """
+        holdings = self.holdings
+        unit_prices = self.prices[holdings.symbol_index]
+        for position in range(len(holdings)):
+            yield {
+                'id': int(holdings.ids[position]),
+                'account': holdings.account_names[holdings.account_index[position]],
+                'name': holdings.names[position],
+                'symbol': str(holdings.symbols[holdings.symbol_index[position]]),
+                'units': to_decimal(holdings.units[position]),
+                'price_per_unit': to_decimal(unit_prices[position]),
+                'cost': to_decimal(holdings.cost[position]),
+                'total_value': to_decimal(self.market_value[position]),
+                'converted_value': to_decimal(self.converted_value[position]),
+                'unrealized_pnl': to_decimal(self.unrealized_pnl[position]),
+                'weight': to_decimal(self.weights[position], Decimal('0.0001')),
+            }
+
+def value_holdings(holdings, prices=None, fx_rate=1):
+    """
+    Compute market value, unrealized P&L, weights and converted value in one pass.
+
+    Args:
+        holdings (Holdings): The holdings returned by load_holdings.
+        prices (dict[str, Any], optional): Quotes overriding the stored prices.
+        fx_rate (Any): Rate applied to convert the market value.
+
+    Returns:
+        Valuation: Arrays aligned with the holdings.
+    """
+    price_vector = holdings.price_vector(prices)
+    market_value = holdings.units * price_vector[holdings.symbol_index]
+    unrealized_pnl = market_value - holdings.cost
+
+    account_totals = np.bincount(
+        holdings.account_index, weights=market_value, minlength=len(holdings.accounts)
+    )
+    holding_totals = account_totals[holdings.account_index]
+    weights = np.divide(
+        market_value, holding_totals,
+        out=np.zeros_like(market_value), where=holding_totals != 0
+    )
+    fx_rate = float(fx_rate)
+
+    return Valuation(
+        holdings=holdings,
+        prices=price_vector,
+        market_value=market_value,
+        unrealized_pnl=unrealized_pnl,
+        weights=weights,
+        converted_value=market_value * fx_rate,
+        account_totals=account_totals,
+        fx_rate=fx_rate,
+    )
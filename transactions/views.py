@@ -1,8 +1,12 @@
 from decimal import Decimal,InvalidOperation
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.exceptions import PermissionDenied,ValidationError
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils import timezone
 from django.utils.dateparse import parse_date
 
 from rest_framework import viewsets
@@ -12,26 +16,70 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from accounts.models import AccountPermissions,Account,User
+from accounts.fieldsets import prune_queryset
+from accounts.permissions import CanViewAccount, aresolve_access, resolve_access
 from .filters import TransactionFilter
-from .models import Transaction,SimulatedInvestment
+from .models import Transaction,SimulatedInvestment,BacktestResult
 from .utils_permissions import process_transaction
 from .serializers import (
     TransactionSerializer,
-    InvestmentSerializer
+    InvestmentSerializer,
+    BacktestRequestSerializer,
+    BacktestResultSerializer
     )
 from .utils import fetch_market_data
+from .valuation import load_holdings, to_decimal, value_holdings
+from .lots import gains_report
+from .nav import nav_series
+from .analytics import account_risk
+from .projections import project_account
+from .utils_backtest import expand_sweep, run_backtests
+from .conditional import (
+    ConditionalListMixin, aaccounts_validators, account_validators, accounts_validators, not_modified,
+    representation, set_validators,
+)
+from .response_cache import CachedListMixin, acached_response, cached_response, hit_ratios
+from .fx import convert, convert_fields, convert_many, rate, reporting_currency
+from itertools import chain
+from InvestmentManagerAPI.async_views import AsyncAPIView
+from InvestmentManagerAPI.db_router import ReplicaReadMixin
+from InvestmentManagerAPI.query_budget import QueryBudget
+from InvestmentManagerAPI.sharding import AccountShardMixin, fan_out
 
 # Create your views here.
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(AccountShardMixin, ReplicaReadMixin, ConditionalListMixin, viewsets.ModelViewSet):
     """
     A unified viewset for handling both account and investment transactions.
 
     - Requires user authentication.
     - Handles permissions for both account and investment transactions.
+    - Answers unchanged list requests with 304 Not Modified.
+    - Reads from the replicas on safe requests.
+    - Routes the account's transactions to its shard.
     """
+    query_budgets = {'list': QueryBudget(3, indexed=('transactions_transaction',))}
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_access(self):
+        """
+        Resolve the user's access to the account, 404 without a permission.
+        """
+        access = resolve_access(self.request, self.kwargs.get('account_pk'))
+        if not access.exists or access.permission is None:
+            raise Http404('No AccountPermissions matches the given query.')
+        return access
+
+    def get_validators(self):
+        """
+        Validators from the account change counter, the user, their permission
+        and the representation.
+        """
+        access = self.get_access()
+        return account_validators(
+            access.account, self.request.user.pk, access.permission, representation(self.request)
+        )
+
     def get_queryset(self):
         """
         Fetches transactions based on the user's permissions for the account or investment.
@@ -40,15 +88,15 @@ class TransactionViewSet(viewsets.ModelViewSet):
         - If the user has 'FULL_ACCESS', they can view all transactions.
         """
         user = self.request.user
-        account_id = self.kwargs.get('account_pk')
-        account = get_object_or_404(Account, pk=account_id)
-        permission = get_object_or_404(AccountPermissions, user=user, account=account)
+        access = self.get_access()
 
-        if permission.permission == AccountPermissions.VIEW_ONLY:
+        if access.permission == AccountPermissions.VIEW_ONLY:
             return Transaction.objects.none()
-        elif permission.permission == AccountPermissions.POST_ONLY:
-            return Transaction.objects.filter(user=user, account=account)
-        return Transaction.objects.filter(account=account)
+        elif access.permission == AccountPermissions.POST_ONLY:
+            queryset = Transaction.objects.filter(user=user, account_id=access.account_id)
+        else:
+            queryset = Transaction.objects.filter(account_id=access.account_id)
+        return prune_queryset(queryset, self.get_serializer_class(), self.request)
 
     def perform_create(self, serializer):
         """
@@ -60,34 +108,194 @@ class TransactionViewSet(viewsets.ModelViewSet):
         investment.update_price()
         super().perform_create(serializer)
         
-class TransactionListView(APIView):
+class TransactionListView(AccountShardMixin, ReplicaReadMixin, APIView):
     """
     API view to list transactions for the authenticated user.
     """
-    permission_classes = [IsAuthenticated]
+    query_budgets = {'get': QueryBudget(3, indexed=('transactions_transaction',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+    account_membership_required = False
+    account_permission_message = 'You do not have permission to view transactions for this account'
 
     def get(self, request, account_pk):
         """
         Retrieves all transactions for the given account and user.
         """
-        account = get_object_or_404(Account, pk=account_pk)
-        permission = AccountPermissions.objects.filter(user=request.user, account=account).first()
-        if permission is None or permission.permission == AccountPermissions.POST_ONLY:
-            return Response(
-                {'error': 'You do not have permission to view transactions for this account'
-                 },
-                status=403
-                )
-
-        transactions = Transaction.objects.filter(account=account, user=request.user)
-        serializer = TransactionSerializer(transactions, many=True)
+        transactions = prune_queryset(
+            Transaction.objects.filter(account_id=account_pk, user=request.user),
+            TransactionSerializer,
+            request,
+        )
+        serializer = TransactionSerializer(transactions, many=True, context={'request': request})
         return Response(serializer.data, status=200)
 
+class GainsView(AccountShardMixin, ReplicaReadMixin, APIView):
+    """
+    API view to report realized and unrealized gains for an account.
+    """
+    query_budgets = {'get': QueryBudget(4, indexed=('transactions_simulatedinvestment',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+    account_permission_message = 'You do not have permission to view gains for this account.'
+
+    def get(self, request, account_pk):
+        """
+        Retrieves running realized gains and unrealized gains of open lots.
+        Users with POST_ONLY permission cannot view gains.
+        """
+        account = resolve_access(request, account_pk).account
+
+        try:
+            currency = reporting_currency(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        report = gains_report(account)
+        convert_fields(
+            [report, *report['holdings']],
+            ['realized_gain', 'unrealized_gain', 'price_per_unit', 'cost_basis', 'market_value'],
+            currency,
+        )
+        return Response({**report, 'currency': currency})
+
+class NavView(AccountShardMixin, ReplicaReadMixin, APIView):
+    """
+    API view returning the daily net asset value of an account.
+    """
+    query_budgets = {'get': QueryBudget(12, indexed=('transactions_dailynav',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+
+    def get(self, request, account_pk):
+        """
+        Retrieves the NAV series, optionally limited by start_date and end_date
+        and reported in the requested currency.
+        Users with POST_ONLY permission cannot view the series.
+        """
+        account = resolve_access(request, account_pk).account
+
+        dates = {}
+        for param in ('start_date', 'end_date'):
+            value = request.GET.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                dates[param] = None
+            if value and dates[param] is None:
+                return Response({'error': f'Invalid {param}, use YYYY-MM-DD'}, status=400)
+        start, end = dates['start_date'], dates['end_date'] or timezone.localdate()
+        if start and (end - start).days >= settings.NAV_MAX_DAYS:
+            return Response({'error': f'The range may span at most {settings.NAV_MAX_DAYS} days.'}, status=400)
+        try:
+            currency = reporting_currency(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        series = nav_series(account, start=dates['start_date'], end=dates['end_date'])
+        convert_fields(series, ['nav'], currency)
+        return Response({'account': account.name, 'currency': currency, 'series': series})
+
+class RiskView(AccountShardMixin, ReplicaReadMixin, APIView):
+    """
+    API view returning risk analytics for the holdings of an account.
+    """
+    query_budgets = {'get': QueryBudget(4, indexed=('transactions_simulatedinvestment',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+
+    def get(self, request, account_pk):
+        """
+        Retrieves volatility, VaR, drawdown, beta and the correlation matrix.
+        Accepts window (trading days), confidence, benchmark and currency parameters.
+        """
+        account = resolve_access(request, account_pk).account
+
+        try:
+            window = int(request.GET.get('window', 252))
+            confidence = float(request.GET.get('confidence', 0.95))
+        except ValueError:
+            return Response({'error': 'Invalid window or confidence format'}, status=400)
+        if not 2 <= window <= 2520:
+            return Response({'error': 'Window must be between 2 and 2520 days'}, status=400)
+        if not 0.5 <= confidence < 1:
+            return Response({'error': 'Confidence must be between 0.5 and 1'}, status=400)
+        try:
+            currency = reporting_currency(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        risk = account_risk(
+            account,
+            window=window,
+            confidence=confidence,
+            benchmark=request.GET.get('benchmark'),
+        )
+        convert_fields([risk], ['market_value', 'historical_var', 'parametric_var'], currency)
+        return Response({**risk, 'currency': currency})
+
+class ProjectionView(AccountShardMixin, ReplicaReadMixin, APIView):
+    """
+    API view returning Monte Carlo projections of an account's holdings.
+    """
+    permission_classes = [IsAuthenticated, CanViewAccount]
+    max_paths = 200000
+    max_years = 50
+
+    def get(self, request, account_pk):
+        """
+        Retrieves percentile bands of the simulated value per year and the
+        probability of reaching an optional target value, both in the
+        requested currency.
+        """
+        account = resolve_access(request, account_pk).account
+
+        try:
+            paths = int(request.GET.get('paths', 10000))
+            years = int(request.GET.get('years', 10))
+            window = int(request.GET.get('window', 252))
+            seed = request.GET.get('seed')
+            seed = int(seed) if seed is not None else None
+            target = request.GET.get('target')
+            target = Decimal(target) if target is not None else None
+        except (InvalidOperation, ValueError):
+            return Response({'error': 'Invalid paths, years, window, seed or target format'}, status=400)
+        if target is not None and not target.is_finite():
+            return Response({'error': 'Invalid paths, years, window, seed or target format'}, status=400)
+        if not 1 <= paths <= self.max_paths:
+            return Response({'error': f'Paths must be between 1 and {self.max_paths}'}, status=400)
+        if not 1 <= years <= self.max_years:
+            return Response({'error': f'Years must be between 1 and {self.max_years}'}, status=400)
+        if not 2 <= window <= 2520:
+            return Response({'error': 'Window must be between 2 and 2520 days'}, status=400)
+        if seed is not None and seed < 0:
+            return Response({'error': 'Seed must be a positive integer'}, status=400)
+        try:
+            currency = reporting_currency(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        base_target = convert(target, currency, settings.FX_BASE_CURRENCY) if target is not None else None
+        projection = project_account(
+            account, paths=paths, years=years, seed=seed, target=base_target, window=window
+        )
+        if currency != settings.FX_BASE_CURRENCY:
+            projection = {
+                **projection,
+                'start_value': convert(projection['start_value'], settings.FX_BASE_CURRENCY, currency),
+                'target': target,
+                'percentiles': {
+                    percentile: [
+                        to_decimal(value)
+                        for value in convert_many(band, settings.FX_BASE_CURRENCY, currency)
+                    ]
+                    for percentile, band in projection['percentiles'].items()
+                },
+            }
+        return Response({**projection, 'currency': currency})
+
 class UserTransactionsAdminView(APIView):
     """
     An API view for admin users to retrieve transactions 
     and the total balance for a specific user.
     """
+    query_budgets = {'get': QueryBudget(10, indexed=('transactions_transaction',))}
     permission_classes = [IsAuthenticated, IsAdminUser]
     serializer_class = TransactionSerializer
     filter_backends = [DjangoFilterBackend]
@@ -96,6 +304,9 @@ class UserTransactionsAdminView(APIView):
     def get(self, request, username):
         """
         Retrieves transactions for a specific user, optionally filtering by date range.
+        Investments are also reported in the requested currency.
+        Reports are cached until an account of the user changes.
+        Transactions are gathered from every shard in parallel.
         """
         user = get_object_or_404(User, username=username)
         transactions = Transaction.objects.filter(user=user)
@@ -103,54 +314,87 @@ class UserTransactionsAdminView(APIView):
         if not filterset.is_valid():
             return Response(filterset.errors, status=400)
         
-        transactions = filterset.qs
+        try:
+            currency = reporting_currency(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        traded = set(chain.from_iterable(fan_out(
+            lambda alias: list(transactions.using(alias).order_by().values_list('account_id', flat=True).distinct())
+        )))
+        accounts = Account.objects.filter(
+            Q(pk__in=user.investor_accounts.values('pk'))
+            | Q(pk__in=traded)
+        )
+        etag, _ = accounts_validators(accounts, user.pk)
+        data = cached_response(
+            'admin-transactions',
+            [etag, request.GET.urlencode(), currency, rate(settings.FX_BASE_CURRENCY, currency)],
+            lambda: self.build_report(user, filterset.qs, currency),
+        )
+        return Response(data)
+
+    def build_report(self, user, transactions, currency):
+        """
+        Serialize the transactions and value the investments of a user.
+        """
+        transactions = sorted(
+            chain.from_iterable(fan_out(lambda alias: list(transactions.using(alias)))),
+            key=lambda record: (record.transaction_date, record.pk),
+        )
         serializer = self.serializer_class(transactions, many=True)
 
-        usd_to_kes_rate = Decimal('140.00')
-        investments = SimulatedInvestment.objects.filter(account__users=user)
-        total_investments = sum([Decimal(inv.total_value) for inv in investments])
-        total_investments_in_kes = total_investments * usd_to_kes_rate
+        holdings = load_holdings(account_ids=list(user.investor_accounts.values_list('pk', flat=True)))
+        valuation = value_holdings(holdings, fx_rate=rate(settings.FX_BASE_CURRENCY, currency))
+        total_investments = valuation.total_value
+        value_kes = convert_many(valuation.market_value, settings.FX_BASE_CURRENCY, 'KES')
+        total_investments_in_kes = to_decimal(value_kes.sum())
 
-        investment_data = []
-        for investment in investments:
-            total_value_kes = Decimal(investment.total_value) * usd_to_kes_rate
-            investment_data.append({
+        investment_data = [
+            {
                 'user': user.username,
-                'account': investment.account.name,
-                'name': investment.name,
-                'symbol': investment.symbol,
-                'units': investment.units,
-                'price_per_unit': investment.price_per_unit,
-                'total_value': investment.total_value,
-                'total_value_kes': total_value_kes,
-            })
+                'account': row['account'],
+                'name': row['name'],
+                'symbol': row['symbol'],
+                'units': row['units'],
+                'price_per_unit': row['price_per_unit'],
+                'total_value': row['total_value'],
+                'total_value_kes': to_decimal(value_kes[position]),
+                'converted_value': row['converted_value'],
+                'unrealized_pnl': row['unrealized_pnl'],
+                'weight': row['weight'],
+            }
+            for position, row in enumerate(valuation.rows())
+        ]
 
         data = {
+            'currency': currency,
             'total_investments': total_investments,
             'total_investments_in_kes': total_investments_in_kes,
+            'total_investments_converted': valuation.total_converted_value,
             'transactions': serializer.data,
             'investments': investment_data,
         }
 
-        return Response(data)
-class UserTransactionsView(APIView):
+        return data
+class UserTransactionsView(AccountShardMixin, ReplicaReadMixin, APIView):
     """
     API view for non-admin users to retrieve their transactions, enforcing POST_ONLY permissions.
     """
-    permission_classes = [IsAuthenticated]
+    query_budgets = {'get': QueryBudget(3, indexed=('transactions_transaction',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+    account_permission_message = 'You do not have permission to view transactions for this account.'
 
     def get(self, request, account_pk):
         """
         Retrieves transactions for the current user and checks permissions for the account.
         Users with POST_ONLY permission cannot view transactions.
         """
-        account = get_object_or_404(Account, pk=account_pk, users=request.user)
-        permission = AccountPermissions.objects.filter(user=request.user, account=account).first()
-
-        if permission.permission == AccountPermissions.POST_ONLY:
-            return Response(
-                {'error': 'You do not have permission to view transactions for this account.'
-                 }, status=403)
+        account = resolve_access(request, account_pk).account
+        etag, last_modified = account_validators(account, request.user.pk, representation(request))
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
 
         transactions = Transaction.objects.filter(user=request.user, account=account)
         transaction_data = [
@@ -162,12 +406,13 @@ class UserTransactionsView(APIView):
             for transaction in transactions
         ]
 
-        return Response({'transactions': transaction_data})
+        return set_validators(Response({'transactions': transaction_data}), etag, last_modified)
 
 class SimulatedInvestmentTransactionView(APIView):
     """
     API view to simulate buying and selling investments based on market data.
     """
+    query_budgets = {'post': QueryBudget(17)}
     permission_classes = [IsAuthenticated]
 
     def get_permissions(self):
@@ -200,15 +445,23 @@ class SimulatedInvestmentTransactionView(APIView):
         if not symbol:
             return Response({'error': 'Symbol is required'}, status=400)
 
-        account = get_object_or_404(Account, pk=account_pk, users=request.user)
+        try:
+            currency = reporting_currency(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        access = resolve_access(request, account_pk)
+        if not access.is_member:
+            raise Http404('No Account matches the given query.')
 
         try:
             result = process_transaction(
                 user=request.user,
-                account_pk=account.pk,
+                account_pk=access.account_id,
                 transaction_type=transaction_type,
                 units=units,
-                symbol=symbol
+                symbol=symbol,
+                access=access
             )
         except PermissionDenied as e:
             return Response({'error': str(e)}, status=403)
@@ -218,22 +471,38 @@ class SimulatedInvestmentTransactionView(APIView):
             return Response({'error': str(e)}, status=400)
 
         investment_value = result.get('investment_value')
-        usd_to_kes_rate = Decimal('140.00')
-        investment_value_kes = investment_value * usd_to_kes_rate if investment_value else None
+        base = settings.FX_BASE_CURRENCY
+        investment_value_kes = convert(investment_value, base, 'KES') if investment_value else None
+        converted_value = convert(investment_value, base, currency) if investment_value else None
 
         return Response({
             'message': f'Successful {transaction_type} transacion of {units} units of {symbol}',
-            'investment_value': f'{investment_value:.2f} USD' if investment_value else None,
-            'investment_value_kes': f'{investment_value_kes:.2f} KES' if investment_value_kes else None
+            'investment_value': f'{investment_value:.2f} {base}' if investment_value else None,
+            'investment_value_kes': f'{investment_value_kes:.2f} KES' if investment_value_kes else None,
+            'investment_value_converted': f'{converted_value:.2f} {currency}' if converted_value else None
         }, status=200)
 
 
-class InvestmentViewSet(viewsets.ModelViewSet):
+class InvestmentViewSet(ReplicaReadMixin, ConditionalListMixin, CachedListMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing SimulatedInvestment instances.
+    Unchanged list requests are answered with 304 Not Modified,
+    lists are served from the response cache and reads use the replicas.
     """
+    query_budgets = {'list': QueryBudget(4)}
     serializer_class = InvestmentSerializer
     permission_classes = [IsAuthenticated]
+    cache_name = 'investments'
+
+    def get_validators(self):
+        """
+        Validators from the change counters of every account the user can see
+        and the representation.
+        """
+        user = self.request.user
+        if user.is_staff:
+            return accounts_validators(Account.objects.all(), 'staff', representation(self.request))
+        return accounts_validators(Account.objects.filter(users=user), user.pk, representation(self.request))
 
     def get_queryset(self):
         """
@@ -241,11 +510,12 @@ class InvestmentViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user.is_staff:
-            return SimulatedInvestment.objects.all()
+            queryset = SimulatedInvestment.objects.all()
         else:
-            return SimulatedInvestment.objects.filter(
+            queryset = SimulatedInvestment.objects.filter(
                 account__users=user
             )
+        return prune_queryset(queryset, self.get_serializer_class(), self.request)
             
 class PerformanceView(APIView):
     """
@@ -253,16 +523,192 @@ class PerformanceView(APIView):
     
     This view retrieves real-time or simulated intraday market data for a given stock symbol
     using the Alpha Vantage API. The symbol is passed as a query parameter in the request.
+    Successful quotes are cached for MARKET_DATA_CACHE_TIMEOUT seconds.
      """
-    def get(self, request):
+    query_budgets = {'get': QueryBudget(1)}
+    def get(self, request, data_type=None):
+        """
+        Handle GET requests to fetch stock market data from the Alpha Vantage API.
+        """
+        symbol = request.GET.get('symbol', 'AAPL')
+        data = cached_response(
+            'market-data',
+            [symbol.upper()],
+            lambda: fetch_market_data(symbol),
+            timeout=settings.MARKET_DATA_CACHE_TIMEOUT,
+            cache_if=lambda result: 'error' not in result,
+        )
+
+        if 'error' in data:
+            return JsonResponse({"error": data['error']}, status=500)
+
+        return JsonResponse(data)
+
+class AsyncTransactionListView(AsyncAPIView):
+    """
+    Async TransactionListView, served on the event loop under ASGI.
+    """
+    query_budgets = {'get': QueryBudget(3, indexed=('transactions_transaction',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+    account_membership_required = False
+    account_permission_message = 'You do not have permission to view transactions for this account'
+
+    async def get(self, request, account_pk):
+        """
+        Retrieves all transactions for the given account and user.
+        """
+        alias = await self.aread_alias(account_pk)
+        transactions = prune_queryset(
+            Transaction.objects.using(alias).filter(account_id=account_pk, user=request.user),
+            TransactionSerializer,
+            request,
+        )
+        rows = [transaction async for transaction in transactions.aiterator(chunk_size=500)]
+        serializer = TransactionSerializer(rows, many=True, context={'request': request})
+        return Response(serializer.data, status=200)
+
+class AsyncUserTransactionsView(AsyncAPIView):
+    """
+    Async UserTransactionsView, served on the event loop under ASGI.
+    """
+    query_budgets = {'get': QueryBudget(3, indexed=('transactions_transaction',))}
+    permission_classes = [IsAuthenticated, CanViewAccount]
+    account_permission_message = 'You do not have permission to view transactions for this account.'
+
+    async def get(self, request, account_pk):
+        """
+        Retrieves transactions for the current user and checks permissions for the account.
+        """
+        account = await (await aresolve_access(request, account_pk)).aget_account()
+        etag, last_modified = account_validators(account, request.user.pk, representation(request))
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        alias = await self.aread_alias(account.pk)
+        transactions = Transaction.objects.using(alias).filter(user=request.user, account_id=account.pk)
+        transaction_data = [
+            {
+                'amount': transaction.amount,
+                'transaction_type': transaction.transaction_type,
+                'date': transaction.transaction_date,
+            }
+            async for transaction in transactions.aiterator(chunk_size=500)
+        ]
+
+        return set_validators(Response({'transactions': transaction_data}), etag, last_modified)
+
+class AsyncInvestmentListView(AsyncAPIView):
+    """
+    Async InvestmentViewSet.list, served on the event loop under ASGI with
+    the same validators and response cache.
+    """
+    query_budgets = {'get': QueryBudget(4)}
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        """
+        Return the investments of every account the user can see.
+        """
+        user = request.user
+        alias = await self.aread_alias()
+        if user.is_staff:
+            accounts, queryset, part = Account.objects.all(), SimulatedInvestment.objects.all(), 'staff'
+        else:
+            accounts = Account.objects.filter(users=user)
+            queryset = SimulatedInvestment.objects.filter(account__users=user)
+            part = user.pk
+        etag, last_modified = await aaccounts_validators(accounts.using(alias), part, representation(request))
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        async def compute():
+            investments = prune_queryset(queryset.using(alias), InvestmentSerializer, request)
+            rows = [investment async for investment in investments.aiterator(chunk_size=500)]
+            return InvestmentSerializer(rows, many=True, context={'request': request}).data
+
+        data = await acached_response('investments', [etag, request.get_full_path()], compute)
+        return set_validators(Response(data), etag, last_modified)
+
+class AsyncPerformanceView(AsyncAPIView):
+    """
+    Async PerformanceView; cache hits stay on the event loop and Alpha
+    Vantage calls run in a worker thread.
+    """
+    query_budgets = {'get': QueryBudget(1)}
+    async def get(self, request, data_type=None):
         """
         Handle GET requests to fetch stock market data from the Alpha Vantage API.
         """
         symbol = request.GET.get('symbol', 'AAPL')
-        data = fetch_market_data(symbol)
+        data = await acached_response(
+            'market-data',
+            [symbol.upper()],
+            lambda: sync_to_async(fetch_market_data, thread_sensitive=False)(symbol),
+            timeout=settings.MARKET_DATA_CACHE_TIMEOUT,
+            cache_if=lambda result: 'error' not in result,
+        )
 
         if 'error' in data:
             return JsonResponse({"error": data['error']}, status=500)
 
         return JsonResponse(data)
-    
\ No newline at end of file
+
+class CacheStatsView(APIView):
+    """
+    API view for admin users to monitor the response cache.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        """
+        Retrieves hits, misses and the hit ratio of every cached view.
+        """
+        return Response({'backend': settings.CACHES['default']['BACKEND'], 'views': hit_ratios()})
+
+class BacktestViewSet(viewsets.ModelViewSet):
+    """
+    A viewset for running strategy backtests and comparing stored results.
+
+    Backtests replay historical prices with the simulation's buy/sell rules
+    and never touch live holdings or transactions.
+    """
+    query_budgets = {'list': QueryBudget(2, indexed=('transactions_backtestresult',))}
+    serializer_class = BacktestResultSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        """
+        Return the backtests of the current user, optionally by strategy.
+        """
+        queryset = BacktestResult.objects.filter(user=self.request.user)
+        strategy = self.request.GET.get('strategy')
+        if strategy:
+            queryset = queryset.filter(strategy=strategy)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        Run a backtest, or one per combination of sweep values, and store the results.
+        """
+        serializer = BacktestRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            params_list = expand_sweep(data['params'], data['sweep'])
+            results = run_backtests(
+                user=request.user,
+                strategy=data['strategy'],
+                symbols=data['symbols'],
+                start=data['start_date'],
+                end=data['end_date'],
+                initial_cash=data['initial_cash'],
+                params_list=params_list,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        return Response(BacktestResultSerializer(results, many=True).data, status=201)